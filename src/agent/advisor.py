@@ -0,0 +1,250 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Literal, Optional, Tuple
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+SYSTEM_PROMPT = "You are a DeFi strategy advisor specialized in yield optimization."
+
+# Fixed instructions for structured mode; the per-tick user message is only the metrics as JSON
+STRUCTURED_SYSTEM_PROMPT = (
+    "DeFi vault advisor. Input: market metrics JSON (APY in %). Pick AAVE, STRATEGY_1 (Aave-Sonic-Beefy), "
+    "STRATEGY_2 (Sonic-Beefy farm) or HOLD; allocate_amount <= max_allocation; reasoning under 20 words."
+)
+
+# Metric changes smaller than these steps count as unchanged conditions
+DEFAULT_QUANTIZATION = {
+    'aave_apy': 0.25,
+    'sonic_apy': 0.25,
+    'health_factor': 0.05,
+    'utilization': 0.02,
+    'current_allocation': 1000,
+}
+
+
+class StrategyRecommendation(BaseModel):
+    """Typed recommendation returned in structured mode"""
+    model_config = ConfigDict(frozen=True, extra='forbid')
+
+    strategy: Literal['AAVE', 'STRATEGY_1', 'STRATEGY_2', 'HOLD']
+    allocate_amount: int = Field(ge=0)
+    risk: Literal['low', 'medium', 'high']
+    reasoning: str
+
+
+# Strict JSON schema for response_format: the model can only return a StrategyRecommendation
+RECOMMENDATION_SCHEMA = {
+    'name': 'strategy_recommendation',
+    'strict': True,
+    'schema': {
+        'type': 'object',
+        'properties': {
+            'strategy': {'type': 'string', 'enum': ['AAVE', 'STRATEGY_1', 'STRATEGY_2', 'HOLD']},
+            'allocate_amount': {'type': 'integer'},
+            'risk': {'type': 'string', 'enum': ['low', 'medium', 'high']},
+            'reasoning': {'type': 'string'},
+        },
+        'required': ['strategy', 'allocate_amount', 'risk', 'reasoning'],
+        'additionalProperties': False,
+    },
+}
+
+
+def compact_prompt(metrics: Dict) -> str:
+    """Per-request user message for structured mode"""
+    return json.dumps(
+        {name: round(value, 4) if isinstance(value, float) else value for name, value in metrics.items()},
+        separators=(',', ':')
+    )
+
+
+def parse_recommendation(text: str) -> StrategyRecommendation:
+    """Validate a structured-mode response; raises ValueError if it does not match the schema"""
+    try:
+        return StrategyRecommendation.model_validate_json(text)
+    except ValidationError as e:
+        raise ValueError(f"Malformed recommendation: {e.error_count()} validation errors") from e
+
+
+@dataclass
+class Advice:
+    text: str
+    cached: bool
+    latency: float
+    recommendation: Optional[StrategyRecommendation] = None
+
+
+class StrategyAdvisor:
+    """Async LLM strategy advisor with a latency budget, a response cache and request coalescing
+
+    In structured mode the model answers a compact JSON prompt under a strict
+    JSON schema and the response is parsed into a StrategyRecommendation; a
+    response that does not validate is treated as a failed request.
+
+    Recommendations are cached under the quantized market metrics, so unchanged
+    conditions reuse the last answer. Concurrent requests for the same key share
+    one completion. A request that misses the budget returns None (the caller
+    falls back to its rule-based logic) but keeps running, and its answer is
+    cached for the next tick. Nothing on the emergency path calls this.
+    """
+
+    def __init__(self, api_key: str = None, model: str = "gpt-4o", base_url: str = None,
+                 budget: float = 5.0, request_timeout: float = 30.0, cache_ttl: float = 600.0,
+                 max_entries: int = 128, quantization: Dict[str, float] = None, temperature: float = 0.3,
+                 structured: bool = True, max_tokens: int = None):
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.model = model
+        self.base_url = base_url or os.getenv('OPENAI_BASE_URL')
+        self.budget = budget
+        self.request_timeout = request_timeout
+        self.cache_ttl = cache_ttl
+        self.max_entries = max_entries
+        self.quantization = {**DEFAULT_QUANTIZATION, **(quantization or {})}
+        self.temperature = temperature
+        self.structured = structured
+        self.max_tokens = max_tokens
+        self.logger = logging.getLogger('StrategyAdvisor')
+
+        self._client = None
+        # key -> (monotonic time stored, text, parsed recommendation)
+        self._cache: OrderedDict = OrderedDict()
+        self._inflight: Dict[Tuple, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Imported on first use; the SDK alone costs ~0.5 s at startup
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.request_timeout,
+                max_retries=0
+            )
+        return self._client
+
+    def cache_key(self, metrics: Dict, *labels) -> Tuple:
+        """Quantize metrics so small moves map to the same key"""
+        quantized = []
+        for name, value in sorted(metrics.items()):
+            step = self.quantization.get(name)
+            if step and isinstance(value, (int, float)):
+                value = round(value / step)
+            quantized.append((name, value))
+        return tuple(quantized) + labels
+
+    def _cached(self, key: Tuple) -> Optional[Tuple[str, Optional[StrategyRecommendation]]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        stored_at, text, recommendation = entry
+        if time.monotonic() - stored_at > self.cache_ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return text, recommendation
+
+    def _store(self, key: Tuple, result: Tuple[str, Optional[StrategyRecommendation]]):
+        self._cache[key] = (time.monotonic(), *result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def request_kwargs(self, prompt: str) -> Dict:
+        """chat.completions.create arguments for a prompt in the current mode"""
+        kwargs = {
+            'model': self.model,
+            'messages': [
+                {"role": "system", "content": STRUCTURED_SYSTEM_PROMPT if self.structured else SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            'temperature': self.temperature,
+        }
+        if self.structured:
+            kwargs['response_format'] = {'type': 'json_schema', 'json_schema': RECOMMENDATION_SCHEMA}
+        if self.max_tokens:
+            kwargs['max_tokens'] = self.max_tokens
+        return kwargs
+
+    async def _complete(self, prompt: str) -> Tuple[str, Optional[StrategyRecommendation]]:
+        response = await self.client.chat.completions.create(**self.request_kwargs(prompt))
+        text = response.choices[0].message.content
+        return text, parse_recommendation(text) if self.structured else None
+
+    def _request(self, key: Tuple, prompt: str) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+
+        self.misses += 1
+        task = asyncio.ensure_future(self._complete(prompt))
+        self._inflight[key] = task
+
+        def finished(task: asyncio.Task):
+            self._inflight.pop(key, None)
+            if task.cancelled():
+                return
+            if task.exception() is not None:
+                self.errors += 1
+                self.logger.error(f"LLM request failed: {task.exception()}")
+                return
+            self._store(key, task.result())
+
+        task.add_done_callback(finished)
+        return task
+
+    async def recommend(self, key: Tuple, prompt: str, budget: float = None) -> Optional[Advice]:
+        """Recommendation for the conditions under key, or None if there is none within budget"""
+        if not self.enabled:
+            return None
+
+        start = time.perf_counter()
+        cached = self._cached(key)
+        if cached is not None:
+            self.hits += 1
+            return Advice(cached[0], True, time.perf_counter() - start, cached[1])
+
+        task = self._request(key, prompt)
+        try:
+            # Shielded so a timeout leaves the request running to fill the cache
+            text, recommendation = await asyncio.wait_for(asyncio.shield(task), timeout=budget or self.budget)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.logger.warning(f"LLM recommendation exceeded its {budget or self.budget}s budget")
+            return None
+        except Exception:
+            # Counted and logged by the task's done callback
+            return None
+        return Advice(text, False, time.perf_counter() - start, recommendation)
+
+    async def close(self):
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self._client is not None:
+            await self._client.close()
+
+    def stats(self) -> Dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'entries': len(self._cache),
+            'inflight': len(self._inflight),
+        }
@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from web3 import AsyncWeb3, Web3
+from web3.providers.persistent import WebSocketProvider
+from src.rpc.contracts import registry
+
+# Pool events that move a position's health factor
+WATCHED_EVENTS = ['ReserveDataUpdated', 'Supply', 'Withdraw', 'Borrow', 'Repay', 'LiquidationCall']
+
+
+class EmergencyWatcher:
+    """Watches new heads and Aave Pool events over a websocket and reacts within one block
+
+    The health factor is re-read only when a Pool event touches the watched user or
+    reserves, plus once every `heartbeat_blocks` to catch oracle price moves.
+    start() runs it on its own thread and event loop, so blocking jobs on the
+    caller's loop cannot hold back a head or the emergency handler.
+    """
+
+    def __init__(self, ws_url: str, user_address: str, threshold: float,
+                 on_emergency: Callable[[float, int], Awaitable],
+                 pool_address: str = "0x794a61358D6845594F94dc1DB02A252b5b4814aD",
+                 reserves: List[str] = None, heartbeat_blocks: int = 20,
+                 cooldown_blocks: int = 5, reconnect_delay: float = 1.0):
+        self.ws_url = ws_url
+        self.user_address = Web3.to_checksum_address(user_address)
+        self.threshold = threshold
+        self.on_emergency = on_emergency
+        self.pool_address = Web3.to_checksum_address(pool_address)
+        self.reserves = {Web3.to_checksum_address(r) for r in reserves or []}
+        self.heartbeat_blocks = heartbeat_blocks
+        self.cooldown_blocks = cooldown_blocks
+        self.reconnect_delay = reconnect_delay
+        self.logger = logging.getLogger('EmergencyWatcher')
+
+        self.aave_pool_abi = registry.abi('AavePool')
+
+        self.health_factor: Optional[float] = None
+        self.latest_block: Optional[int] = None
+        self._checked_block = -1
+        self._dirty = True
+        self._changed_at: Optional[int] = None
+        self._last_trigger_block: Optional[int] = None
+        self._stopping = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+        self.heads = 0
+        self.events = 0
+        self.relevant_events = 0
+        self.checks = 0
+        self.triggers: List[Dict] = []
+
+    async def run(self):
+        """Keep a subscription open until stop() is called, reconnecting on errors"""
+        self._loop = asyncio.get_running_loop()
+        self._stopping.clear()
+        while not self._stopping.is_set():
+            try:
+                await self._watch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Websocket watcher error: {e}")
+            # State may have changed while disconnected
+            self._dirty = True
+            if not self._stopping.is_set():
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.reconnect_delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self) -> threading.Thread:
+        """Run the watcher on a thread with its own event loop until stop() is called"""
+        self._thread = threading.Thread(target=asyncio.run, args=(self.run(),), name='emergency-watcher', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        """Safe to call from any thread"""
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(self._stopping.set)
+        else:
+            self._stopping.set()
+
+    async def _watch(self):
+        async with AsyncWeb3(WebSocketProvider(self.ws_url)) as w3:
+            pool = w3.eth.contract(address=self.pool_address, abi=self.aave_pool_abi)
+            events = {pool.events[name].topic: pool.events[name]() for name in WATCHED_EVENTS}
+
+            await w3.eth.subscribe('newHeads')
+            await w3.eth.subscribe('logs', {'address': self.pool_address, 'topics': [list(events)]})
+            self.logger.info(f"Watching heads and Aave Pool events for {self.user_address}")
+
+            stop = asyncio.create_task(self._stopping.wait())
+            try:
+                stream = w3.socket.process_subscriptions().__aiter__()
+                while True:
+                    message = asyncio.create_task(stream.__anext__())
+                    done, _ = await asyncio.wait({message, stop}, return_when=asyncio.FIRST_COMPLETED)
+                    if stop in done:
+                        message.cancel()
+                        return
+                    result = message.result()['result']
+                    if 'topics' in result:
+                        await self._on_log(pool, events, result)
+                    else:
+                        await self._on_head(pool, result)
+            finally:
+                stop.cancel()
+
+    async def _on_head(self, pool, head: Dict):
+        self.heads += 1
+        block_number = head['number']
+        self.latest_block = block_number
+        if self._dirty or block_number - self._checked_block >= self.heartbeat_blocks:
+            await self._check(pool, block_number)
+
+    async def _on_log(self, pool, events: Dict, log: Dict):
+        self.events += 1
+        topic = Web3.to_hex(log['topics'][0])
+        event = events.get(topic)
+        if event is None:
+            return
+        if log.get('removed'):
+            # Reorged out; the next head re-reads the state
+            self._dirty = True
+            return
+        try:
+            args = event.process_log(log)['args']
+        except Exception as e:
+            self.logger.warning(f"Could not decode Pool log: {e}")
+            return
+        if not self._is_relevant(args):
+            return
+
+        self.relevant_events += 1
+        block_number = log['blockNumber']
+        if self._changed_at is None:
+            self._changed_at = block_number
+        self._dirty = True
+        await self._check(pool, block_number)
+
+    def _is_relevant(self, args: Dict) -> bool:
+        for key in ('user', 'onBehalfOf'):
+            if args.get(key) and Web3.to_checksum_address(args[key]) == self.user_address:
+                return True
+        reserve = args.get('reserve')
+        return bool(reserve and (not self.reserves or Web3.to_checksum_address(reserve) in self.reserves))
+
+    async def _check(self, pool, block_number: int):
+        if block_number <= self._checked_block and not self._dirty:
+            return
+        try:
+            user_data = await pool.functions.getUserAccountData(self.user_address).call(
+                block_identifier=block_number
+            )
+        except Exception as e:
+            self.logger.error(f"Error reading health factor at block {block_number}: {e}")
+            return
+
+        self.checks += 1
+        self._checked_block = max(self._checked_block, block_number)
+        self._dirty = False
+        self.health_factor = user_data[5] / 1e18
+        changed_at, self._changed_at = self._changed_at, None
+
+        if self.health_factor >= self.threshold:
+            self._last_trigger_block = None
+            return
+        if self._last_trigger_block is not None and block_number - self._last_trigger_block < self.cooldown_blocks:
+            return
+
+        self._last_trigger_block = block_number
+        self.triggers.append({
+            'block_number': block_number,
+            'health_factor': self.health_factor,
+            'blocks_after_change': block_number - changed_at if changed_at is not None else None,
+            'time': time.time()
+        })
+        self.logger.warning(
+            f"Health factor {self.health_factor:.4f} below {self.threshold} at block {block_number}"
+        )
+        try:
+            await self.on_emergency(self.health_factor, block_number)
+        except Exception as e:
+            self.logger.error(f"Emergency handler failed: {e}")
+
+    def stats(self) -> Dict:
+        return {
+            'latest_block': self.latest_block,
+            'health_factor': self.health_factor,
+            'heads': self.heads,
+            'events': self.events,
+            'relevant_events': self.relevant_events,
+            'checks': self.checks,
+            'triggers': len(self.triggers)
+        }
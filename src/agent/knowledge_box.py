@@ -1,100 +1,107 @@
-import pandas as pd
 from datetime import datetime, timedelta
-import json
 import os
 import logging
 from typing import Dict, List
+from src.agent.knowledge_store import create_store, migrate_json_files
+from src.agent.pattern_index import PatternIndex
 
 class KnowledgeBox:
-    def __init__(self, storage_path="data/knowledge"):
+    def __init__(self, storage_path="data/knowledge", backend="jsonl"):
         self.storage_path = storage_path
         os.makedirs(storage_path, exist_ok=True)
         
-        # Initialize different knowledge categories
-        self.categories = {
-            'market_patterns': self._load_knowledge('market_patterns.json'),
-            'yield_patterns': self._load_knowledge('yield_patterns.json'),
-            'risk_events': self._load_knowledge('risk_events.json'),
-            'strategy_outcomes': self._load_knowledge('strategy_outcomes.json')
-        }
+        # Append-only, time-indexed storage for the knowledge categories
+        self.store = create_store(storage_path, backend)
+        migrate_json_files(storage_path, self.store)
+        
         self.logger = logging.getLogger('KnowledgeBox')
         self.market_patterns = []
         self.strategy_outcomes = []
+        
+        # Feature matrices for vectorized similarity search, kept in step with the store
+        self.indexes = {}
+        for category in ('market_patterns', 'yield_patterns'):
+            records = self.store.all(category)
+            self.indexes[category] = PatternIndex(capacity=max(1024, len(records)))
+            self.indexes[category].extend(
+                [datetime.fromisoformat(r['timestamp']).timestamp() for r in records],
+                [r.get('pattern') or {} for r in records],
+                records
+            )
 
-    def _load_knowledge(self, filename):
-        """Load knowledge from storage"""
-        try:
-            with open(f"{self.storage_path}/{filename}", 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return []
-
-    def _save_knowledge(self, category, data):
-        """Save knowledge to storage"""
-        filename = f"{category}.json"
-        with open(f"{self.storage_path}/{filename}", 'w') as f:
-            json.dump(data, f, indent=2)
+    def _append_pattern(self, category, pattern):
+        now = datetime.now()
+        record = {
+            'timestamp': now.isoformat(),
+            'pattern': pattern,
+            'result': None
+        }
+        self.store.append(category, record)
+        self.indexes[category].append(now.timestamp(), pattern, record)
+        return record
 
     def add_market_pattern(self, pattern: Dict):
         """Add a new market pattern to the knowledge base"""
         try:
             self.market_patterns.append({
-                'timestamp': pd.Timestamp.now(),
+                'timestamp': datetime.now(),
                 'data': pattern
             })
+            self._append_pattern('market_patterns', pattern)
         except Exception as e:
             self.logger.error(f"Error adding market pattern: {e}")
 
     def add_yield_pattern(self, pattern):
         """Record yield pattern observation"""
-        self.categories['yield_patterns'].append({
-            'timestamp': datetime.now().isoformat(),
-            'pattern': pattern,
-            'result': None
-        })
-        self._save_knowledge('yield_patterns', self.categories['yield_patterns'])
+        self._append_pattern('yield_patterns', pattern)
 
     def record_risk_event(self, event):
         """Record risk-related events"""
-        self.categories['risk_events'].append({
+        self.store.append('risk_events', {
             'timestamp': datetime.now().isoformat(),
             'event': event,
             'impact': None
         })
-        self._save_knowledge('risk_events', self.categories['risk_events'])
 
     def record_strategy_outcome(self, strategy, outcome):
         """Record the outcome of a strategy decision"""
-        self.categories['strategy_outcomes'].append({
+        self.store.append('strategy_outcomes', {
             'timestamp': datetime.now().isoformat(),
             'strategy': strategy,
             'outcome': outcome
         })
-        self._save_knowledge('strategy_outcomes', self.categories['strategy_outcomes'])
 
-    def find_similar_patterns(self, current_data, category='market_patterns', lookback_days=30):
-        """Find similar historical patterns"""
-        patterns = self.categories[category]
+    def find_similar_patterns(self, current_data, category='market_patterns', lookback_days=30,
+                              top_k=10, metric='euclidean', threshold=0.8):
+        """Find the top_k most similar historical patterns"""
         lookback_date = datetime.now() - timedelta(days=lookback_days)
         
-        recent_patterns = [
-            p for p in patterns 
-            if datetime.fromisoformat(p['timestamp']) > lookback_date
-        ]
+        index = self.indexes.get(category)
+        if index is not None:
+            # One vectorized pass over the feature matrix
+            matches = index.query(
+                current_data,
+                k=top_k,
+                since=lookback_date.timestamp(),
+                metric=metric,
+                threshold=threshold
+            )
+            return [record for _, record in matches]
+        
+        # Time-range lookup on the store's index instead of parsing every timestamp
+        recent_patterns = self.store.range(category, start=lookback_date)
         
-        # Implement pattern matching logic here
         similar_patterns = []
         for pattern in recent_patterns:
-            similarity_score = self._calculate_similarity(current_data, pattern['pattern'])
-            if similarity_score > 0.8:  # 80% similarity threshold
+            similarity_score = self._calculate_similarity(current_data, pattern.get('pattern') or {})
+            if similarity_score > threshold:
                 similar_patterns.append(pattern)
                 
-        return similar_patterns
+        return similar_patterns[-top_k:]
 
     def _calculate_similarity(self, pattern1, pattern2):
         """Calculate similarity between two patterns"""
-        # Mock implementation - replace with actual similarity calculation
-        return 0.9  # Example similarity score 
+        return PatternIndex.similarity(pattern1, pattern2)
 
     def get_recent_patterns(self, n: int = 10) -> List[Dict]:
         """Get n most recent patterns"""
@@ -0,0 +1,212 @@
+import bisect
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional
+
+CATEGORIES = ['market_patterns', 'yield_patterns', 'risk_events', 'strategy_outcomes']
+
+
+def _epoch(timestamp: str) -> float:
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+class KnowledgeStore(ABC):
+    """Append-only storage for knowledge records, indexed by timestamp"""
+
+    @abstractmethod
+    def append(self, category: str, record: Dict):
+        """Append a record carrying an ISO-8601 'timestamp'"""
+        pass
+
+    @abstractmethod
+    def range(self, category: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict]:
+        """Get records with start <= timestamp <= end, oldest first"""
+        pass
+
+    @abstractmethod
+    def count(self, category: str) -> int:
+        """Get the number of records in a category"""
+        pass
+
+    def all(self, category: str) -> List[Dict]:
+        return self.range(category)
+
+    def close(self):
+        pass
+
+
+class JsonLinesStore(KnowledgeStore):
+    """One JSON-lines file per category with an in-memory sorted time index"""
+
+    def __init__(self, storage_path: str):
+        self.storage_path = storage_path
+        self.logger = logging.getLogger('JsonLinesStore')
+        self._lock = threading.Lock()
+        self._records: Dict[str, List[Dict]] = {}
+        self._times: Dict[str, List[float]] = {}
+        self._files = {}
+
+        os.makedirs(storage_path, exist_ok=True)
+        for category in CATEGORIES:
+            self._load(category)
+
+    def _path(self, category: str) -> str:
+        return f"{self.storage_path}/{category}.jsonl"
+
+    def _load(self, category: str):
+        records, times = [], []
+        try:
+            with open(self._path(category), 'r') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash mid-write can leave a torn last line
+                        self.logger.warning(f"Skipping corrupt line in {category}.jsonl")
+                        continue
+                    self._insert(records, times, record)
+        except FileNotFoundError:
+            pass
+        self._records[category] = records
+        self._times[category] = times
+
+    @staticmethod
+    def _insert(records: List[Dict], times: List[float], record: Dict):
+        ts = _epoch(record['timestamp'])
+        if not times or ts >= times[-1]:
+            times.append(ts)
+            records.append(record)
+        else:
+            index = bisect.bisect_right(times, ts)
+            times.insert(index, ts)
+            records.insert(index, record)
+
+    def append(self, category: str, record: Dict):
+        with self._lock:
+            f = self._files.get(category)
+            if f is None:
+                f = self._files[category] = open(self._path(category), 'a')
+            f.write(json.dumps(record, default=str) + '\n')
+            f.flush()
+            self._insert(
+                self._records.setdefault(category, []),
+                self._times.setdefault(category, []),
+                record
+            )
+
+    def range(self, category: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict]:
+        with self._lock:
+            records = self._records.get(category, [])
+            times = self._times.get(category, [])
+            lo = bisect.bisect_left(times, start.timestamp()) if start else 0
+            hi = bisect.bisect_right(times, end.timestamp()) if end else len(times)
+            return records[lo:hi]
+
+    def count(self, category: str) -> int:
+        return len(self._records.get(category, []))
+
+    def close(self):
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
+
+
+class SQLiteStore(KnowledgeStore):
+    """Single SQLite database in WAL mode with a (category, ts) index"""
+
+    def __init__(self, storage_path: str, filename: str = "knowledge.db"):
+        os.makedirs(storage_path, exist_ok=True)
+        self.logger = logging.getLogger('SQLiteStore')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"{storage_path}/{filename}", check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS knowledge ("
+            "id INTEGER PRIMARY KEY, category TEXT NOT NULL, ts REAL NOT NULL, record TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS knowledge_category_ts ON knowledge (category, ts)")
+        self._conn.commit()
+
+    def append(self, category: str, record: Dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO knowledge (category, ts, record) VALUES (?, ?, ?)",
+                (category, _epoch(record['timestamp']), json.dumps(record, default=str))
+            )
+            self._conn.commit()
+
+    def range(self, category: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict]:
+        query = "SELECT record FROM knowledge WHERE category = ?"
+        params = [category]
+        if start:
+            query += " AND ts >= ?"
+            params.append(start.timestamp())
+        if end:
+            query += " AND ts <= ?"
+            params.append(end.timestamp())
+        query += " ORDER BY ts, id"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self, category: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM knowledge WHERE category = ?", (category,)
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+BACKENDS = {
+    'jsonl': JsonLinesStore,
+    'sqlite': SQLiteStore,
+}
+
+
+def create_store(storage_path: str, backend: str = 'jsonl') -> KnowledgeStore:
+    """Build the configured storage backend"""
+    try:
+        return BACKENDS[backend](storage_path)
+    except KeyError:
+        raise ValueError(f"Unknown knowledge backend '{backend}', expected one of {list(BACKENDS)}")
+
+
+def migrate_json_files(storage_path: str, store: KnowledgeStore) -> Dict[str, int]:
+    """One-shot import of legacy <category>.json files into the store
+
+    Each migrated file is renamed to <category>.json.migrated so the import never runs twice.
+    """
+    logger = logging.getLogger('KnowledgeStore')
+    migrated = {}
+    for category in CATEGORIES:
+        path = f"{storage_path}/{category}.json"
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, 'r') as f:
+                records = json.load(f)
+        except json.JSONDecodeError as e:
+            logger.error(f"Could not migrate {path}: {e}")
+            continue
+
+        records = [r for r in records if isinstance(r, dict) and 'timestamp' in r]
+        records.sort(key=lambda r: _epoch(r['timestamp']))
+        for record in records:
+            store.append(category, record)
+
+        os.rename(path, f"{path}.migrated")
+        migrated[category] = len(records)
+        logger.info(f"Migrated {len(records)} {category} records from {path}")
+    return migrated
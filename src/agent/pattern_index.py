@@ -0,0 +1,140 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+FEATURES = ['aave_apy', 'sonic_apy', 'health_factor', 'utilization', 'tvl', 'trend']
+
+# Keys each feature may appear under, either flat or nested under 'metrics'/'aave'/'sonic'
+FEATURE_KEYS = {
+    'aave_apy': [('aave_apy',), ('aave', 'net_apy'), ('aave', 'supply_apy')],
+    'sonic_apy': [('sonic_apy',), ('sonic', 'apy')],
+    'health_factor': [('health_factor',), ('aave', 'health_factor')],
+    'utilization': [('utilization',), ('utilization_rate',), ('aave', 'utilization')],
+    'tvl': [('tvl',), ('aave', 'tvl')],
+    'trend': [('trend',), ('aave_trend',)],
+}
+
+
+def encode_features(data: Dict) -> np.ndarray:
+    """Encode a market or yield pattern as a fixed-width feature vector"""
+    if isinstance(data.get('metrics'), dict):
+        data = {**data, **data['metrics']}
+
+    vector = np.zeros(len(FEATURES), dtype=np.float64)
+    for i, feature in enumerate(FEATURES):
+        for path in FEATURE_KEYS[feature]:
+            value = data
+            for key in path:
+                value = value.get(key) if isinstance(value, dict) else None
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                vector[i] = value
+                break
+    return np.nan_to_num(vector, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+class PatternIndex:
+    """Contiguous feature matrix with vectorized top-k similarity search"""
+
+    def __init__(self, capacity: int = 1024):
+        self._matrix = np.empty((capacity, len(FEATURES)), dtype=np.float64)
+        self._times = np.empty(capacity, dtype=np.float64)
+        self._records: List[Dict] = []
+        self._size = 0
+        self._sorted = True
+
+        # Running sums for z-scoring without rescanning the matrix
+        self._sum = np.zeros(len(FEATURES), dtype=np.float64)
+        self._sum_sq = np.zeros(len(FEATURES), dtype=np.float64)
+
+    def __len__(self):
+        return self._size
+
+    def append(self, timestamp: float, pattern: Dict, record: Dict):
+        """Add one pattern in amortized O(1)"""
+        self.extend([timestamp], [pattern], [record])
+
+    def extend(self, timestamps: List[float], patterns: List[Dict], records: List[Dict]):
+        """Add many patterns with a single resize"""
+        count = len(timestamps)
+        if count == 0:
+            return
+        self._reserve(self._size + count)
+
+        vectors = np.vstack([encode_features(pattern) for pattern in patterns])
+        start, end = self._size, self._size + count
+        self._matrix[start:end] = vectors
+        self._times[start:end] = timestamps
+        self._records.extend(records)
+
+        if self._sorted:
+            previous = self._times[start - 1:end] if start else self._times[start:end]
+            self._sorted = bool(np.all(np.diff(previous) >= 0))
+
+        self._sum += vectors.sum(axis=0)
+        self._sum_sq += np.square(vectors).sum(axis=0)
+        self._size = end
+
+    def _reserve(self, size: int):
+        capacity = len(self._times)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        matrix = np.empty((capacity, len(FEATURES)), dtype=np.float64)
+        times = np.empty(capacity, dtype=np.float64)
+        matrix[:self._size] = self._matrix[:self._size]
+        times[:self._size] = self._times[:self._size]
+        self._matrix, self._times = matrix, times
+
+    def _scale(self) -> Tuple[np.ndarray, np.ndarray]:
+        mean = self._sum / self._size
+        std = np.sqrt(np.maximum(self._sum_sq / self._size - np.square(mean), 0.0))
+        std[std == 0] = 1.0
+        return mean, std
+
+    def query(self, pattern: Dict, k: int = 10, since: Optional[float] = None,
+              metric: str = 'euclidean', threshold: float = 0.0) -> List[Tuple[float, Dict]]:
+        """Get up to k (similarity, record) pairs, most similar first
+
+        Features are z-scored with the index's running mean and variance. 'cosine'
+        scores lie in [-1, 1]; 'euclidean' maps distance d to 1 / (1 + d / sqrt(n_features)).
+        """
+        if self._size == 0:
+            return []
+
+        if since is None:
+            rows = np.arange(self._size)
+        elif self._sorted:
+            rows = np.arange(np.searchsorted(self._times[:self._size], since, side='left'), self._size)
+        else:
+            rows = np.flatnonzero(self._times[:self._size] >= since)
+        if rows.size == 0:
+            return []
+
+        mean, std = self._scale()
+        candidates = (self._matrix[rows] - mean) / std
+        target = (encode_features(pattern) - mean) / std
+
+        if metric == 'cosine':
+            norms = np.linalg.norm(candidates, axis=1) * np.linalg.norm(target)
+            scores = np.divide(candidates @ target, norms, out=np.zeros(rows.size), where=norms > 0)
+        elif metric == 'euclidean':
+            distances = np.linalg.norm(candidates - target, axis=1)
+            scores = 1.0 / (1.0 + distances / np.sqrt(len(FEATURES)))
+        else:
+            raise ValueError(f"Unknown similarity metric '{metric}'")
+
+        k = min(k, rows.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (float(scores[i]), self._records[rows[i]])
+            for i in top
+            if scores[i] >= threshold
+        ]
+
+    @staticmethod
+    def similarity(pattern1: Dict, pattern2: Dict) -> float:
+        """Cosine similarity of two patterns' raw feature vectors"""
+        a, b = encode_features(pattern1), encode_features(pattern2)
+        norm = np.linalg.norm(a) * np.linalg.norm(b)
+        return float(a @ b / norm) if norm > 0 else 0.0
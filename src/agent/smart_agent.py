@@ -1,17 +1,23 @@
 from src.data_providers.market_data import MarketDataAggregator
 from src.data_providers.aave_provider import AaveDataProvider
 from src.data_providers.protocol_data.aggregator import ProtocolDataAggregator
-from src.vault.super_vault_manager import SuperVaultManager, StrategyType
-import pandas as pd
+from src.vault.super_vault_manager import ALLOCATION_STRATEGY, SuperVaultManager, StrategyType
+from src.vault.plan_executor import ExecutionPlan, PlanExecutor
+from src.rpc.contracts import registry
+from src.rpc.snapshot import MarketSnapshot
 import logging
 from src.agent.knowledge_box import KnowledgeBox  # Add this import
-import yaml
+from src.agent.advisor import StrategyAdvisor, StrategyRecommendation, compact_prompt
+from src.agent.timeseries import RollingMetricStore
+from src.config import Config, load_config
+from src.instrumentation import metrics as instrumentation
 from enum import Enum
 from web3 import Web3
 from eth_abi.abi import encode
-import json
-from openai import OpenAI  # Add this import at the top
-import os
+import asyncio
+import re
+import threading
+from datetime import datetime
 
 class StrategyType(Enum):
     AAVE = 0
@@ -19,78 +25,185 @@ class StrategyType(Enum):
     STRATEGY_2 = 2
 
 class SmartAgent:
-    def __init__(self, sonic_web3, arb_web3, vault_manager: SuperVaultManager):
+    def __init__(self, sonic_web3, arb_web3, vault_manager: SuperVaultManager, probe: bool = True,
+                 config: Config = None):
         self.logger = logging.getLogger('SmartAgent')
         self.sonic_web3 = sonic_web3
         self.arb_web3 = arb_web3
         
-        # Load configuration
-        with open("configs/config.yaml", "r") as f:
-            self.config = yaml.safe_load(f)
+        # Shared config; strategy thresholds are read per decision so hot reloads apply
+        self.config = config or load_config()
             
         self.vault_manager = vault_manager
-        self.market_data = MarketDataAggregator(self.arb_web3)  # Aave data from Arbitrum
-        self.aave = AaveDataProvider(self.arb_web3)  # Aave interactions on Arbitrum
+        
+        # Compiles a cycle's vault actions into one multicall transaction where the vault supports it
+        self.plan_executor = PlanExecutor(
+            vault_manager,
+            batching=self.config.execution.batching,
+            report_gas=self.config.execution.report_gas
+        )
+        
+        # Set by the orchestrator when rpc.mode is "async"
+        self.async_rpc = None
+        
+        # (strategy, TransactionHandle) pairs submitted but not yet confirmed; the emergency
+        # job appends from a worker thread, so every access holds _pending_lock
+        self.pending_transactions = []
+        self._pending_lock = threading.Lock()
+        # Latest emergency withdrawal per strategy; no new one is sent until its receipt resolves.
+        # The emergency job and the EmergencyWatcher run on separate threads, so sends hold _emergency_lock
+        self._emergency_handles = {}
+        self._emergency_lock = threading.Lock()
+        
+        # One block-scoped snapshot per chain so repeated reads in a cycle hit the RPC once
+        self.arb_snapshot = MarketSnapshot(self.arb_web3, 'arbitrum')
+        self.aave = AaveDataProvider(self.arb_web3, snapshot=self.arb_snapshot)  # Aave interactions on Arbitrum
+        # The emergency job runs on its own thread and re-pins every few seconds, so it
+        # gets its own snapshot rather than moving the one a decision cycle is reading
+        self.emergency_snapshot = MarketSnapshot(self.arb_web3, 'arbitrum')
+        self.emergency_aave = AaveDataProvider(self.arb_web3, snapshot=self.emergency_snapshot)
+        self.market_data = MarketDataAggregator(self.arb_web3, self.aave)  # Aave data from Arbitrum
         self.protocol_data = ProtocolDataAggregator(self.arb_web3)
         
-        # Initialize historical data storage
-        self.historical_data = pd.DataFrame()
+        # Initialize historical data storage: one sample per new Arbitrum block
+        history_config = self.config.history
+        self.historical_data = RollingMetricStore(
+            columns=['aave_apy', 'sonic_apy', 'health_factor', 'utilization'],
+            capacity=history_config.capacity,
+            window=history_config.window,
+            ewma_alpha=history_config.ewma_alpha
+        )
+        self._last_recorded_block = None
         
         # Initialize knowledge box
-        self.knowledge = KnowledgeBox()
+        self.knowledge = KnowledgeBox(self.config.knowledge.storage_path, self.config.knowledge.backend)
         
         # Initialize contract addresses
         self.SUPER_VAULT = "0x4BdE0740740b8dBb5f6Eb8c9ccB4Fc01171e953C"
         self.STRATEGY_1 = "0xa1057829b37d1b510785881B2E87cC87fb4cccD3"
         self.STRATEGY_2 = "0xC4012a3D99BC96637A03BF91A2e7361B1412FD17"
         
-        # Initialize SuperVault contract with Sonic web3 instead of Arbitrum
-        with open("src/abis/SuperVault.json", "r") as f:
-            abi_data = json.load(f)
-            self.vault_abi = abi_data if isinstance(abi_data, list) else abi_data.get('abi', [])
-        self.vault_contract = self.sonic_web3.eth.contract(
-            address=Web3.to_checksum_address(self.SUPER_VAULT),
-            abi=self.vault_abi
-        )
+        # Initialize SuperVault contract with Sonic web3 instead of Arbitrum; shared with the vault manager
+        self.vault_abi = registry.abi('SuperVault')
+        self.vault_contract = registry.contract(self.sonic_web3, 'SuperVault', self.SUPER_VAULT, 'sonic')
 
-        # Initialize OpenAI client
-        self.openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        if not os.getenv('OPENAI_API_KEY'):
-            self.logger.warning("OpenAI API key not found. AI features will be disabled.")
+        # Async LLM advisor; its client (and the OpenAI SDK import) is created on first use
+        advisor_config = self.config.advisor
+        self.advisor = StrategyAdvisor(
+            model=advisor_config.model,
+            base_url=advisor_config.base_url,
+            budget=advisor_config.budget,
+            request_timeout=advisor_config.request_timeout,
+            cache_ttl=advisor_config.cache_ttl,
+            quantization=advisor_config.quantization,
+            structured=advisor_config.structured,
+            max_tokens=advisor_config.max_tokens
+        )
+        if not advisor_config.enabled or not self.advisor.enabled:
+            self.logger.warning("OpenAI API key not found or advisor disabled. AI features will be disabled.")
 
-        # Validate strategy parameters
-        if not self._validate_strategy_params():
-            self.logger.warning("Invalid strategy parameters")
+        # The orchestrator passes probe=False and runs the probes concurrently after construction
+        if probe:
+            self.probe()
 
+    def probe(self):
+        """Connectivity check: read the agent's ETH balance on Arbitrum"""
         agent_balance = self.arb_web3.eth.get_balance("0x1655D65B58aB4a2646AA61693663B1685A20b319")
         print(f"Agent ETH Balance: {self.arb_web3.from_wei(agent_balance, 'ether')} ETH")
+        return agent_balance
+
+    def _snapshots(self):
+        """Get the snapshots that back this agent's reads"""
+        snapshots = [self.arb_snapshot]
+        if getattr(self.vault_manager, 'snapshot', None):
+            snapshots.append(self.vault_manager.snapshot)
+        return snapshots
+
+    def begin_cycle(self):
+        """Pin the per-chain snapshots to the latest blocks for a new decision cycle"""
+        for snapshot in self._snapshots():
+            try:
+                snapshot.refresh()
+            except Exception as e:
+                self.logger.error(f"Error refreshing {snapshot.chain} snapshot: {e}")
+                
+        self.prefetch_cycle_reads()
 
-    def _validate_strategy_params(self):
-        """Validate strategy configuration parameters"""
+    async def begin_cycle_async(self):
+        """Async-mode begin_cycle: Sonic and Arbitrum reads are gathered concurrently"""
         try:
-            required_params = {
-                'min_apy': 0.05,
-                'max_allocation_percentage': 0.8,
-                'rebalance_threshold': 0.05
-            }
+            blocks = await self.async_rpc.block_numbers('sonic', 'arbitrum')
+            self.arb_snapshot.pin(blocks['arbitrum'])
+            if getattr(self.vault_manager, 'snapshot', None):
+                self.vault_manager.snapshot.pin(blocks['sonic'])
+        except Exception as e:
+            self.logger.error(f"Error refreshing snapshots: {e}")
             
-            strategy_config = self.config.get('strategy', {})
-            for param, default in required_params.items():
-                if param not in strategy_config:
-                    strategy_config[param] = default
-                    self.logger.info(f"Using default value for {param}: {default}")
-                    
-            return True
+        sonic_web3, arb_web3 = await asyncio.gather(
+            self.async_rpc.get('sonic'),
+            self.async_rpc.get('arbitrum')
+        )
+        results = await asyncio.gather(
+            self.vault_manager.get_vault_state_async(
+                sonic_web3,
+                pool_tokens=self._cycle_pool_tokens(),
+                strategy_types=[StrategyType.AAVE.value]
+            ),
+            self.aave.get_batched_data_async(arb_web3, user_address=self.config.agent.address),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.error(f"Error prefetching cycle reads: {result}")
+
+    async def prepare_cycle(self):
+        """Start a decision cycle in whichever RPC mode the agent runs in"""
+        if self.async_rpc:
+            await self.begin_cycle_async()
+        else:
+            self.begin_cycle()
+
+    def _cycle_pool_tokens(self):
+        return [
+            (StrategyType.AAVE.value, self.aave.get_lending_token_address()),
+            (StrategyType.STRATEGY_1.value, self.aave.get_lending_token_address()),
+            (StrategyType.STRATEGY_2.value, self.config.contracts.sonic['wrapped_sonic'])
+        ]
+
+    def prefetch_cycle_reads(self):
+        """Batch the cycle's view calls into one multicall per chain"""
+        try:
+            self.vault_manager.get_vault_state(
+                pool_tokens=self._cycle_pool_tokens(),
+                strategy_types=[StrategyType.AAVE.value]
+            )
+        except Exception as e:
+            self.logger.error(f"Error prefetching vault reads: {e}")
             
+        try:
+            self.aave.get_batched_data(user_address=self.config.agent.address)
         except Exception as e:
-            self.logger.error(f"Error validating strategy parameters: {e}")
-            return False
+            self.logger.error(f"Error prefetching Aave reads: {e}")
+
+    def snapshot_stats(self):
+        """Get read and deduplication counts for the current cycle"""
+        return [snapshot.stats() for snapshot in self._snapshots()]
 
+    def cache_stats(self):
+        """Get hit/miss counters for the vault and Aave read caches"""
+        stats = {'aave': self.aave.cache.stats()}
+        if getattr(self.vault_manager, 'cache', None):
+            stats['vault'] = self.vault_manager.cache.stats()
+        return stats
+
+    @instrumentation.traced()
     async def analyze_market_conditions(self):
         """Analyze current market conditions"""
         try:
-            aave_data = self.aave.get_optimal_position()
-            market_data = self.market_data.get_market_data()
+            with instrumentation.span('fetch_aave'):
+                aave_data = self.aave.get_optimal_position()
+            with instrumentation.span('fetch_market_data'):
+                market_data = self.market_data.get_market_data()
             
             # Ensure we have valid data
             if not aave_data or not market_data:
@@ -108,13 +221,17 @@ class SmartAgent:
             self.logger.info(f"AAVE data: {aave_data}")
             self.logger.info(f"Market data: {market_data}")
             
+            metrics = {
+                'aave_apy': aave_data['estimated_net_apy'],
+                'health_factor': aave_data['health_factor'],
+                'utilization': aave_data['utilization_rate'],
+                'sonic_apy': market_data.get('sonic', {}).get('apy', 0)
+            }
+            with instrumentation.span('record_snapshot'):
+                self._record_snapshot(metrics, market_data)
+            
             return {
-                'metrics': {
-                    'aave_apy': aave_data['estimated_net_apy'],
-                    'health_factor': aave_data['health_factor'],
-                    'utilization': aave_data['utilization_rate'],
-                    'sonic_apy': market_data.get('sonic', {}).get('apy', 0)
-                },
+                'metrics': metrics,
                 'optimal_allocation': self._calculate_optimal_allocation({
                     'aave_apy': aave_data['estimated_net_apy'],
                     'sonic_apy': market_data.get('sonic', {}).get('apy', 0)
@@ -132,8 +249,9 @@ class SmartAgent:
                 'optimal_allocation': 0
             }
     
-    def execute_strategy(self, strategy):
-        """Execute a given strategy"""
+    @instrumentation.traced()
+    async def execute_strategy(self, strategy):
+        """Submit a given strategy's transactions without waiting for receipts"""
         try:
             self.logger.info(f"Executing strategy: {strategy}")
             
@@ -142,7 +260,8 @@ class SmartAgent:
                 raise ValueError("Invalid strategy parameters")
                 
             # Get current balances
-            total_assets = self.vault_manager.get_total_assets()
+            with instrumentation.span('read_total_assets'):
+                total_assets = self.vault_manager.get_total_assets()
             self.logger.info(f"Current total assets: {total_assets}")
             
             # Check if amount is reasonable
@@ -150,14 +269,19 @@ class SmartAgent:
                 self.logger.warning("Strategy amount exceeds total assets")
                 return False
                 
+            if not self._gas_price_acceptable():
+                return False
+                
             # Convert strategy type to int value if it's an enum
             strategy_type = strategy['type'].value if hasattr(strategy['type'], 'value') else strategy['type']
                 
             # Execute based on strategy type
             if strategy_type in [StrategyType.AAVE.value, StrategyType.STRATEGY_1.value]:
-                success = self._execute_aave_strategy(strategy)
+                with instrumentation.span('submit', strategy='aave'):
+                    success = self._execute_aave_strategy(strategy)
             elif strategy_type == StrategyType.STRATEGY_2.value:
-                success = self._execute_sonic_strategy(strategy)
+                with instrumentation.span('submit', strategy='sonic'):
+                    success = self._execute_sonic_strategy(strategy)
             else:
                 self.logger.error(f"Unknown strategy type: {strategy['type']}")
                 return False
@@ -168,6 +292,72 @@ class SmartAgent:
             self.logger.error(f"Error executing strategy: {e}")
             return False
             
+    def _gas_price_acceptable(self) -> bool:
+        """Rebalances can wait for cheaper gas; emergency withdrawals do not go through here"""
+        gas_price = self.vault_manager.get_gas_price()
+        if gas_price > self.config.strategy.max_gas_price:
+            self.logger.warning(
+                f"Gas price {gas_price} above max_gas_price {self.config.strategy.max_gas_price}, skipping strategy"
+            )
+            return False
+        return True
+
+    @instrumentation.traced()
+    async def execute_plan(self, strategies):
+        """Submit all of a cycle's strategies as one plan without waiting for receipts"""
+        try:
+            plan = ExecutionPlan()
+            for strategy in strategies:
+                try:
+                    self._plan_strategy(plan, strategy)
+                except (KeyError, TypeError, ValueError) as e:
+                    self.logger.error(f"Skipping invalid strategy {strategy}: {e}")
+            if not plan:
+                return False
+                
+            with instrumentation.span('read_total_assets'):
+                total_assets = self.vault_manager.get_total_assets()
+            if plan.total('allocate') > total_assets:
+                self.logger.warning("Planned allocations exceed total assets")
+                return False
+                
+            if not self._gas_price_acceptable():
+                return False
+                
+            with instrumentation.span('submit', strategy='plan'):
+                submitted = self.plan_executor.submit(plan)
+            for actions, simulation in self.plan_executor.last_rejected:
+                self.knowledge.record_strategy_outcome(
+                    strategy={'description': simulation.description, 'amount': sum(action.amount for action in actions)},
+                    outcome={'success': False, 'simulated': True, 'revert_reason': simulation.revert_reason}
+                )
+            for actions, handle in submitted:
+                self._track(
+                    {'description': handle.description, 'allocate_amount': sum(action.amount for action in actions)},
+                    handle
+                )
+            self.logger.info(f"Submitted plan of {len(plan)} actions in {len(submitted)} transaction(s)")
+            return bool(submitted)
+            
+        except Exception as e:
+            self.logger.error(f"Error executing plan: {e}")
+            return False
+            
+    def _plan_strategy(self, plan: ExecutionPlan, strategy):
+        """Add the vault actions _execute_aave_strategy / _execute_sonic_strategy would send"""
+        strategy_type = strategy['type'].value if hasattr(strategy['type'], 'value') else strategy['type']
+        amount = strategy['allocate_amount'] if 'allocate_amount' in strategy else strategy['amount']
+        
+        if strategy.get('action') == 'decrease_allocation':
+            plan.add('withdraw', strategy_type, amount, strategy)
+        elif strategy_type in [StrategyType.AAVE.value, StrategyType.STRATEGY_1.value]:
+            plan.add('allocate', ALLOCATION_STRATEGY, min(float(amount), 10000), strategy)
+        elif strategy_type == StrategyType.STRATEGY_2.value:
+            plan.add('allocate', ALLOCATION_STRATEGY, amount, strategy)
+            plan.add('deposit', 'SONIC', strategy.get('deposit_amount', 0), strategy)
+        else:
+            raise ValueError(f"Unknown strategy type: {strategy['type']}")
+
     def _execute_aave_strategy(self, strategy):
         """Execute Aave strategy"""
         try:
@@ -186,13 +376,15 @@ class SmartAgent:
                 strategy_value = int(strategy_type.value)
                 self.logger.info(f"Executing strategy with value: {strategy_value} and amount: {amount}")
                 
-                result = self.vault_manager.allocate_to_strategy(
+                handle = self.vault_manager.allocate_to_strategy(
                     strategy_value,  # Pass the raw integer value
-                    amount
+                    amount,
+                    wait=False
                 )
 
-                if result:
-                    self.logger.info(f"Successfully executed strategy with amount: {amount}")
+                if handle:
+                    self._track(strategy, handle)
+                    self.logger.info(f"Submitted strategy allocation with amount: {amount}")
                     return True
                 else:
                     self.logger.error("Strategy execution failed")
@@ -209,25 +401,61 @@ class SmartAgent:
     def _execute_sonic_strategy(self, strategy):
         """Execute Sonic strategy"""
         try:
-            # Allocate to Sonic strategy
-            self.vault_manager.allocate_to_strategy(
-                StrategyType.STRATEGY_2,
-                strategy['allocate_amount']
-            )
-            
-            # Deposit to Sonic pool
-            self.vault_manager.deposit_to_pool(
-                'SONIC',
-                strategy['deposit_amount']
-            )
+            # Allocate to Sonic strategy and deposit to the Sonic pool: one multicall, or
+            # two transactions on consecutive nonces when the vault has no multicall
+            plan = ExecutionPlan()
+            plan.add('allocate', ALLOCATION_STRATEGY, strategy['allocate_amount'], strategy)
+            plan.add('deposit', 'SONIC', strategy['deposit_amount'], strategy)
             
-            self.logger.info(f"Successfully executed Sonic strategy with amount: {strategy['allocate_amount']}")
+            for _, handle in self.plan_executor.submit(plan):
+                self._track(strategy, handle)
+            self.logger.info(f"Submitted Sonic strategy with amount: {strategy['allocate_amount']}")
             return True
             
         except Exception as e:
             self.logger.error(f"Error executing Sonic strategy: {e}")
             return False
 
+    def _track(self, strategy, handle):
+        """Remember a submitted transaction until collect_confirmations records its outcome"""
+        with self._pending_lock:
+            self.pending_transactions.append((strategy, handle))
+
+    def collect_confirmations(self):
+        """Record outcomes for submitted transactions whose receipts have resolved"""
+        with self._pending_lock:
+            pending, self.pending_transactions = self.pending_transactions, []
+        confirmed = []
+        still_pending = []
+        for strategy, handle in pending:
+            if not handle.done:
+                still_pending.append((strategy, handle))
+                continue
+                
+            try:
+                receipt = handle.result()
+                outcome = {
+                    'success': receipt['status'] == 1,
+                    'tx_hash': handle.tx_hash.hex(),
+                    'block_number': receipt['blockNumber'],
+                    'gas_used': receipt['gasUsed']
+                }
+                if handle.revert_reason:
+                    outcome['revert_reason'] = handle.revert_reason
+            except Exception as e:
+                outcome = {'success': False, 'tx_hash': handle.tx_hash.hex(), 'error': str(e)}
+                
+            self.knowledge.record_strategy_outcome(
+                strategy={'description': handle.description, 'amount': strategy.get('allocate_amount')},
+                outcome=outcome
+            )
+            confirmed.append(outcome)
+            
+        # Keep anything submitted while the outcomes were being recorded
+        with self._pending_lock:
+            self.pending_transactions = still_pending + self.pending_transactions
+        return confirmed
+
     def _analyze_aave_metrics(self, position):
         """Analyze AAVE-specific metrics"""
         return {
@@ -317,17 +545,42 @@ class SmartAgent:
             
         return min(score, 1.0)
 
+    def _record_snapshot(self, metrics, market_data):
+        """Append the cycle's metrics to history once per Arbitrum block"""
+        block_number = self.arb_snapshot.block_number
+        if block_number is not None and block_number == self._last_recorded_block:
+            return
+        self._last_recorded_block = block_number
+        
+        try:
+            timestamp = market_data.get('timestamp')
+            timestamp = timestamp.timestamp() if timestamp is not None else datetime.now().timestamp()
+            self.historical_data.append(timestamp, metrics)
+            self.knowledge.add_market_pattern({
+                **metrics,
+                'tvl': market_data.get('aave', {}).get('tvl', 0),
+                'trend': self.historical_data.slope('aave_apy') or 0.0
+            })
+        except Exception as e:
+            self.logger.error(f"Error recording market snapshot: {e}")
+
     def _analyze_market_trend(self):
         """Analyze market trends using historical data"""
         if len(self.historical_data) < 2:
-            return "Insufficient historical data"
+            return {
+                'aave_trend': 0.0,
+                'market_direction': 'neutral',
+                'message': "Insufficient historical data"
+            }
             
-        # Calculate moving averages and trends
-        recent_data = self.historical_data.tail(24)  # Last 24 data points
-        aave_trend = recent_data['aave_apy'].diff().mean()
+        # Rolling statistics are maintained incrementally on every append
+        aave_trend = self.historical_data.mean_change('aave_apy')
         
         return {
             'aave_trend': aave_trend,
+            'aave_slope': self.historical_data.slope('aave_apy'),
+            'aave_moving_average': self.historical_data.moving_average('aave_apy'),
+            'aave_ewma': self.historical_data.ewma('aave_apy'),
             'market_direction': 'bullish' if aave_trend > 0 else 'bearish'
         }
     
@@ -396,7 +649,7 @@ class SmartAgent:
         recommendation_data = {
             'recommendations': recommendations,
             'analysis': analysis,
-            'timestamp': pd.Timestamp.now()
+            'timestamp': datetime.now()
         }
         
         # Record strategy recommendation
@@ -407,38 +660,46 @@ class SmartAgent:
         
         return recommendation_data
 
+    @instrumentation.traced()
     async def analyze_strategies(self):
         """Analyze both strategies and return recommendations"""
         try:
             # Get current allocations
-            strategy1_allocation = self.vault_manager.get_pool_balance(
-                StrategyType.STRATEGY_1.value,
-                self.aave.get_lending_token_address()
-            )
-            
-            strategy2_allocation = self.vault_manager.get_pool_balance(
-                StrategyType.STRATEGY_2.value,
-                self.config['contracts']['sonic']['wrapped_sonic']
-            )
-            
-            total_assets = self.vault_manager.get_total_assets()
+            with instrumentation.span('read_allocations'):
+                strategy1_allocation = self.vault_manager.get_pool_balance(
+                    StrategyType.STRATEGY_1.value,
+                    self.aave.get_lending_token_address()
+                )
+                
+                strategy2_allocation = self.vault_manager.get_pool_balance(
+                    StrategyType.STRATEGY_2.value,
+                    self.config.contracts.sonic['wrapped_sonic']
+                )
+                
+                total_assets = self.vault_manager.get_total_assets()
             
-            # Analyze Strategy 1 (AaveSonicBeefy)
-            strategy1_data = self.aave.get_optimal_position()
-            strategy1_apy = strategy1_data['estimated_net_apy']
+            if total_assets == 0:
+                self.logger.info("No assets in vault, nothing to allocate")
+                return []
             
-            # Analyze Strategy 2 (SonicBeefyFarm)
-            strategy2_data = self.market_data.get_sonic_beefy_data()
-            strategy2_apy = strategy2_data['farm_apy']
+            with instrumentation.span('fetch_strategy_data'):
+                # Analyze Strategy 1 (AaveSonicBeefy)
+                strategy1_data = self.aave.get_optimal_position()
+                strategy1_apy = strategy1_data['estimated_net_apy']
+                
+                # Analyze Strategy 2 (SonicBeefyFarm)
+                strategy2_data = self.market_data.get_sonic_beefy_data()
+                strategy2_apy = strategy2_data['farm_apy']
             
             recommendations = []
+            strategy1_target, strategy2_target = self._calculate_target_allocations(strategy1_apy, strategy2_apy)
             
             # Check if rebalance needed for Strategy 1
-            if strategy1_apy > self.config['strategy']['min_apy']:
+            if strategy1_apy > self.config.strategy.min_apy:
                 current_percentage = strategy1_allocation / total_assets
-                target_percentage = self._calculate_target_allocation(strategy1_data)
+                target_percentage = strategy1_target
                 
-                if abs(current_percentage - target_percentage) > self.config['strategy']['rebalance_threshold']:
+                if abs(current_percentage - target_percentage) > self.config.strategy.rebalance_threshold:
                     recommendations.append({
                         'type': StrategyType.STRATEGY_1,
                         'action': 'increase_allocation' if target_percentage > current_percentage else 'decrease_allocation',
@@ -447,11 +708,11 @@ class SmartAgent:
                     })
             
             # Check if rebalance needed for Strategy 2
-            if strategy2_apy > self.config['strategy']['min_apy']:
+            if strategy2_apy > self.config.strategy.min_apy:
                 current_percentage = strategy2_allocation / total_assets
-                target_percentage = self._calculate_target_allocation(strategy2_data)
+                target_percentage = strategy2_target
                 
-                if abs(current_percentage - target_percentage) > self.config['strategy']['rebalance_threshold']:
+                if abs(current_percentage - target_percentage) > self.config.strategy.rebalance_threshold:
                     recommendations.append({
                         'type': StrategyType.STRATEGY_2,
                         'action': 'increase_allocation' if target_percentage > current_percentage else 'decrease_allocation',
@@ -465,6 +726,23 @@ class SmartAgent:
             self.logger.error(f"Error analyzing strategies: {e}")
             return []
 
+    def _calculate_target_allocations(self, strategy1_apy: float, strategy2_apy: float):
+        """Target shares of total assets for Strategy 1 and Strategy 2
+        
+        The higher-yielding strategy (Strategy 1 on a tie) gets
+        max_allocation_percentage, the other one the rest (at most as much);
+        a strategy under min_apy gets nothing.
+        """
+        min_apy = self.config.strategy.min_apy
+        max_allocation = self.config.strategy.max_allocation_percentage
+        shares = (max_allocation, min(1 - max_allocation, max_allocation))
+        if strategy2_apy > strategy1_apy:
+            shares = shares[::-1]
+        return tuple(
+            share if apy > min_apy else 0.0
+            for share, apy in zip(shares, (strategy1_apy, strategy2_apy))
+        )
+
     def _validate_strategy(self, strategy):
         """Validate strategy parameters before execution"""
         try:
@@ -477,7 +755,7 @@ class SmartAgent:
                 
             # Check against vault limits
             total_assets = self.vault_manager.get_total_assets()
-            if strategy['amount'] > total_assets * self.config['strategy']['max_allocation_percentage']:
+            if strategy['amount'] > total_assets * self.config.strategy.max_allocation_percentage:
                 return False
                 
             return True
@@ -507,7 +785,7 @@ class SmartAgent:
             self.logger.info(f"Current allocation: {current_percentage:.2%}")
             self.logger.info(f"Target allocation: {target_percentage:.2%}")
             
-            if abs(current_percentage - target_percentage) > self.config['strategy']['rebalance_threshold']:
+            if abs(current_percentage - target_percentage) > self.config.strategy.rebalance_threshold:
                 new_amount = total_assets * target_percentage
                 return {
                     'action': 'increase_allocation' if new_amount > current_allocation else 'decrease_allocation',
@@ -522,38 +800,71 @@ class SmartAgent:
 
     async def check_emergency_conditions(self):
         """Check for emergency conditions requiring immediate action"""
+        emergency_actions = []
+        
+        # Check Strategy 1 (AaveSonicBeefy) health
+        try:
+            health_factor = self.emergency_aave.get_health_factor(self.STRATEGY_1)
+            if health_factor is not None and health_factor < self.config.strategy.emergency_health_factor:
+                emergency_actions.append(self.health_factor_action())
+        except Exception as e:
+            self.logger.error(f"Emergency health check error: {e}")
+        
+        # Check Strategy 2 (SonicBeefyFarm) validator performance
         try:
-            emergency_actions = []
-            
-            # Check Strategy 1 (AaveSonicBeefy) health
-            strategy1_data = self.aave.get_optimal_position()
-            if strategy1_data['health_factor'] < self.config['strategy']['emergency_health_factor']:
-                emergency_actions.append({
-                    'type': StrategyType.STRATEGY_1,
-                    'action': 'decrease_allocation',
-                    'amount': self.vault_manager.get_pool_balance(
-                        StrategyType.STRATEGY_1.value,
-                        self.aave.get_lending_token_address()
-                    ) * self.config['strategy']['emergency_withdrawal_percentage']
-                })
-            
-            # Check Strategy 2 (SonicBeefyFarm) validator performance
             strategy2_data = self.market_data.get_sonic_beefy_data()
-            if strategy2_data['validator_performance'] < self.config['strategy']['min_validator_performance']:
+            if strategy2_data['validator_performance'] < self.config.strategy.min_validator_performance:
                 emergency_actions.append({
                     'type': StrategyType.STRATEGY_2,
                     'action': 'decrease_allocation',
                     'amount': self.vault_manager.get_pool_balance(
                         StrategyType.STRATEGY_2.value,
-                        self.config['contracts']['sonic']['wrapped_sonic']
-                    ) * self.config['strategy']['emergency_withdrawal_percentage']
+                        self.config.contracts.sonic['wrapped_sonic']
+                    ) * self.config.strategy.emergency_withdrawal_percentage
                 })
+        except Exception as e:
+            self.logger.error(f"Emergency validator check error: {e}")
+        
+        return emergency_actions if emergency_actions else None
+
+    def health_factor_action(self):
+        """Withdrawal that pulls part of Strategy 1 out of Aave"""
+        return {
+            'type': StrategyType.STRATEGY_1,
+            'action': 'decrease_allocation',
+            'amount': self.vault_manager.get_pool_balance(
+                StrategyType.STRATEGY_1.value,
+                self.emergency_aave.get_lending_token_address()
+            ) * self.config.strategy.emergency_withdrawal_percentage
+        }
+
+    async def handle_health_factor_emergency(self, health_factor: float, block_number: int):
+        """Called by the EmergencyWatcher when the health factor drops below the threshold"""
+        self.logger.warning(f"Health factor {health_factor:.4f} at block {block_number}, withdrawing from Strategy 1")
+        return await self.execute_emergency_action(self.health_factor_action())
+
+    async def execute_emergency_action(self, action):
+        """Submit an emergency withdrawal without waiting for the receipt"""
+        try:
+            amount = int(action['amount'])
+            if amount <= 0:
+                self.logger.warning(f"Nothing to withdraw for {action['type']}")
+                return False
             
-            return emergency_actions if emergency_actions else None
+            with self._emergency_lock:
+                previous = self._emergency_handles.get(action['type'])
+                if previous is not None and not previous.done():
+                    self.logger.info(f"Emergency withdrawal from {action['type']} still pending, not sending another")
+                    return False
+                handle = self.vault_manager.withdraw_from_strategy(action['type'], amount, wait=False, urgent=True)
+                self._emergency_handles[action['type']] = handle
+            self._track({**action, 'allocate_amount': amount}, handle)
+            self.logger.info(f"Submitted emergency withdrawal of {amount} from {action['type']}")
+            return True
             
         except Exception as e:
-            self.logger.error(f"Emergency check error: {e}")
-            return None 
+            self.logger.error(f"Error executing emergency action: {e}")
+            return False
 
     async def optimize_allocation(self):
         """Main optimization function that creates complex strategies"""
@@ -598,7 +909,7 @@ class SmartAgent:
                     }
                 }
                 
-                return self.execute_strategy(strategy)
+                return await self.execute_strategy(strategy)
                 
             return False
 
@@ -629,12 +940,12 @@ class SmartAgent:
                 sonic_apy = MAX_REASONABLE_APY
             
             # Get max allocation with a more conservative limit
-            max_allocation = min(total_assets * self.config['strategy']['max_allocation_percentage'], 10000)  # Cap at 10000
+            max_allocation = min(total_assets * self.config.strategy.max_allocation_percentage, 10000)  # Cap at 10000
             
             # Choose best APY
             best_apy = max(aave_apy, sonic_apy)
             
-            if best_apy > self.config['strategy']['min_apy']:
+            if best_apy > self.config.strategy.min_apy:
                 # Start with a small test amount
                 test_amount = min(1000, max_allocation)  # Start with 1000 or less
                 self.logger.info(f"Starting with test allocation: {test_amount} (Best APY: {best_apy}%)")
@@ -653,7 +964,7 @@ class SmartAgent:
             current_allocation = self.vault_manager.get_total_assets()
             target_allocation = current_data['optimal_allocation']
             
-            return abs(current_allocation - target_allocation) > self.config['strategy']['rebalance_threshold']
+            return abs(current_allocation - target_allocation) > self.config.strategy.rebalance_threshold
         except Exception as e:
             self.logger.error(f"Error checking rebalance need: {e}")
             return False 
@@ -661,7 +972,7 @@ class SmartAgent:
     async def get_ai_recommendation(self, market_data):
         """Get AI-powered strategy recommendations"""
         try:
-            if not os.getenv('OPENAI_API_KEY'):
+            if not self.config.advisor.enabled or not self.advisor.enabled:
                 self.logger.warning("OpenAI API key not set. Skipping AI recommendation.")
                 return None
 
@@ -678,8 +989,51 @@ class SmartAgent:
                 "market_trend": self._analyze_market_trend()
             }
 
-            # Create prompt for the AI
-            prompt = f"""
+            # Structured mode sends only the numbers; the instructions live in the fixed system prompt
+            if self.advisor.structured:
+                prompt = compact_prompt({
+                    **context['market_metrics'],
+                    'total_assets': context['current_allocation'],
+                    'max_allocation': int(context['current_allocation'] * self.config.strategy.max_allocation_percentage),
+                    'trend': context['market_trend']['market_direction'],
+                    'risk': context['risk_assessment']['overall_risk_level']
+                })
+            else:
+                prompt = self._free_text_prompt(context)
+
+            # Unchanged (quantized) conditions reuse the last answer; a slow answer falls back to the rules
+            key = self.advisor.cache_key(
+                {**context['market_metrics'], 'current_allocation': context['current_allocation']},
+                context['market_trend']['market_direction'],
+                context['risk_assessment']['overall_risk_level']
+            )
+            advice = await self.advisor.recommend(key, prompt)
+            if advice is None:
+                return None
+            recommendation = advice.recommendation or advice.text
+
+            if advice.cached:
+                self.logger.info("Reusing cached AI recommendation for unchanged market conditions")
+                return recommendation
+
+            # Log the AI recommendation
+            self.logger.info(f"AI Strategy Recommendation ({advice.latency:.1f}s): {recommendation}")
+
+            # Record the recommendation in knowledge box
+            self.knowledge.record_strategy_outcome(
+                strategy={"ai_recommendation": advice.text},
+                outcome={"pending": True}
+            )
+
+            return recommendation
+
+        except Exception as e:
+            self.logger.error(f"Error getting AI recommendation: {e}")
+            return None
+
+    def _free_text_prompt(self, context):
+        """Prompt for the advisor's free-text mode"""
+        return f"""
             As a DeFi strategy advisor, analyze the following market conditions and recommend an optimal strategy:
 
             Market Metrics:
@@ -697,35 +1051,7 @@ class SmartAgent:
             2. Allocation amount
             3. Risk assessment
             4. Reasoning for the recommendation
-            """
-
-            # Get AI response
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a DeFi strategy advisor specialized in yield optimization."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
-            )
-
-            # Parse AI response
-            recommendation = response.choices[0].message.content
-
-            # Log the AI recommendation
-            self.logger.info(f"AI Strategy Recommendation: {recommendation}")
-
-            # Record the recommendation in knowledge box
-            self.knowledge.record_strategy_outcome(
-                strategy={"ai_recommendation": recommendation},
-                outcome={"pending": True}
-            )
-
-            return recommendation
-
-        except Exception as e:
-            self.logger.error(f"Error getting AI recommendation: {e}")
-            return None
+        """
 
     async def execute_optimal_strategy(self):
         """Execute the optimal strategy based on market conditions and AI recommendations"""
@@ -738,11 +1064,17 @@ class SmartAgent:
             if ai_recommendation:
                 self.logger.info("Using AI-powered strategy recommendation")
                 try:
-                    # Parse AI recommendation into strategy format
+                    if isinstance(ai_recommendation, StrategyRecommendation) and ai_recommendation.strategy == 'HOLD':
+                        self.logger.info(f"AI recommends holding: {ai_recommendation.reasoning}")
+                        return False
+                    
+                    # Parse AI recommendation into strategy format and hold it to the vault limits
                     strategy = self._parse_ai_recommendation(ai_recommendation)
-                    if strategy:
+                    if strategy and self._validate_strategy(strategy):
                         self.logger.info(f"Executing AI recommended strategy: {strategy}")
                         return await self.execute_strategy(strategy)
+                    if strategy:
+                        self.logger.warning(f"AI recommended strategy is outside vault limits: {strategy}")
                 except Exception as e:
                     self.logger.error(f"Failed to execute AI strategy: {e}")
                     # Fall through to traditional strategy
@@ -751,7 +1083,7 @@ class SmartAgent:
             self.logger.info("Using traditional strategy logic")
             total_assets = self.vault_manager.get_total_assets()
             
-            if market_data['metrics']['aave_apy'] > self.config['strategy']['min_apy']:
+            if market_data['metrics']['aave_apy'] > self.config.strategy.min_apy:
                 optimal_amount = self._calculate_optimal_allocation(market_data)
                 # strategy = {
                 #     'type': StrategyType.AAVE,
@@ -768,7 +1100,7 @@ class SmartAgent:
                 }
                 return await self.execute_strategy(strategy)
                 
-            elif market_data['metrics']['sonic_apy'] > self.config['strategy']['min_apy']:
+            elif market_data['metrics']['sonic_apy'] > self.config.strategy.min_apy:
                 optimal_amount = self._calculate_optimal_allocation(market_data)
                 strategy = {
                     'type': StrategyType.STRATEGY_2,
@@ -785,34 +1117,24 @@ class SmartAgent:
             self.logger.error(f"Error executing optimal strategy: {e}")
             return False
 
-    def _parse_ai_recommendation(self, ai_recommendation: str) -> dict:
-        """Parse AI recommendation text into a structured strategy"""
+    def _parse_ai_recommendation(self, ai_recommendation) -> dict:
+        """Turn a StrategyRecommendation (or free text in unstructured mode) into a strategy"""
         try:
-            # Look for key strategy components in the AI's response
-            strategy_type = None
-            amount = None
-            
-            # Parse strategy type
-            if "AAVE" in ai_recommendation:
-                strategy_type = StrategyType.AAVE
-            elif "STRATEGY_1" in ai_recommendation:
-                strategy_type = StrategyType.STRATEGY_1
-            elif "STRATEGY_2" in ai_recommendation:
-                strategy_type = StrategyType.STRATEGY_2
-            
-            # Look for amount in the recommendation
-            # This is a simple example; you might want to make this more sophisticated
-            import re
-            amount_match = re.search(r'amount[:\s]+(\d+)', ai_recommendation.lower())
-            if amount_match:
-                amount = int(amount_match.group(1))
+            if isinstance(ai_recommendation, StrategyRecommendation):
+                strategy_type = StrategyType[ai_recommendation.strategy]
+                amount = ai_recommendation.allocate_amount
+            else:
+                strategy_type, amount = self._parse_free_text(ai_recommendation)
             
             if strategy_type and amount:
                 strategy = {
                     'type': strategy_type,
                     'allocate_amount': amount,
                     'deposit_pool': 'AAVE' if strategy_type in [StrategyType.AAVE, StrategyType.STRATEGY_1] else 'SONIC',
-                    'deposit_amount': amount
+                    'deposit_amount': amount,
+                    # Checked by _validate_strategy
+                    'action': 'increase_allocation',
+                    'amount': amount
                 }
                 self.logger.info(f"Successfully parsed AI recommendation into strategy: {strategy}")
                 return strategy
@@ -822,4 +1144,19 @@ class SmartAgent:
             
         except Exception as e:
             self.logger.error(f"Error parsing AI recommendation: {e}")
-            return None 
\ No newline at end of file
+            return None
+
+    def _parse_free_text(self, ai_recommendation: str):
+        """Best-effort strategy type and amount from a free-text recommendation"""
+        # The specific strategy names first: "AAVE" also appears in any APY discussion
+        strategy_type = None
+        for name in ('STRATEGY_1', 'STRATEGY_2', 'AAVE'):
+            if re.search(rf'\b{name}\b', ai_recommendation):
+                strategy_type = StrategyType[name]
+                break
+        
+        amount = None
+        amount_match = re.search(r'amount[^\d\n]{0,20}([\d,]+)', ai_recommendation.lower())
+        if amount_match:
+            amount = int(amount_match.group(1).replace(',', '') or 0)
+        return strategy_type, amount
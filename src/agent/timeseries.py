@@ -0,0 +1,147 @@
+import numpy as np
+from typing import Dict, List, Optional
+
+
+class RollingMetricStore:
+    """Fixed-capacity ring buffer of metric samples with O(1) rolling statistics
+
+    Every sample is written twice, at slot i and i + capacity, so the latest
+    `capacity` samples are always one contiguous slice and export without copying.
+    Missing (NaN) values are left out of the rolling statistics of their column.
+    """
+
+    # Rolling sums drift with float error; recompute them from the buffer this often
+    RESYNC_EVERY = 10_000
+
+    def __init__(self, columns: List[str], capacity: int = 10_080, window: int = 24, ewma_alpha: float = 0.1):
+        if window > capacity:
+            raise ValueError(f"window ({window}) cannot exceed capacity ({capacity})")
+        self.columns = list(columns)
+        self.capacity = capacity
+        self.window = window
+        self.ewma_alpha = ewma_alpha
+        self._column_index = {name: i for i, name in enumerate(self.columns)}
+
+        width = len(self.columns)
+        self._values = np.full((2 * capacity, width), np.nan, dtype=np.float64)
+        self._times = np.full(2 * capacity, np.nan, dtype=np.float64)
+        self._count = 0
+
+        # Incremental per-column sums over the valid values among the last `window` samples;
+        # x is the sample number counted from _origin, which _resync moves up to keep x small
+        self._origin = 0
+        self._valid = np.zeros(width)
+        self._sum = np.zeros(width)
+        self._sum_x = np.zeros(width)
+        self._sum_x2 = np.zeros(width)
+        self._sum_xy = np.zeros(width)
+        self._ewma = np.full(width, np.nan)
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def append(self, timestamp: float, metrics: Dict[str, float]):
+        """Record one sample; columns missing from metrics are stored as NaN"""
+        row = np.full(len(self.columns), np.nan)
+        for name, value in metrics.items():
+            index = self._column_index.get(name)
+            if index is not None and isinstance(value, (int, float)):
+                row[index] = value
+
+        x = self._count
+        if x >= self.window:
+            # Drop the leaving sample before the write below can reuse its slot (window == capacity)
+            self._accumulate(self._values[(x - self.window) % self.capacity], x - self.window, -1)
+        slot = x % self.capacity
+        self._values[slot] = row
+        self._values[slot + self.capacity] = row
+        self._times[slot] = timestamp
+        self._times[slot + self.capacity] = timestamp
+        self._count += 1
+        self._accumulate(row, x, 1)
+
+        self._ewma = np.where(
+            np.isnan(self._ewma),
+            row,
+            np.where(np.isnan(row), self._ewma, self.ewma_alpha * row + (1 - self.ewma_alpha) * self._ewma)
+        )
+
+        if self._count % self.RESYNC_EVERY == 0:
+            self._resync()
+
+    def _accumulate(self, row: np.ndarray, x: int, sign: int):
+        valid = ~np.isnan(row)
+        filled = np.where(valid, row, 0.0)
+        x -= self._origin
+        self._valid += sign * valid
+        self._sum += sign * filled
+        self._sum_x += sign * x * valid
+        self._sum_x2 += sign * x * x * valid
+        self._sum_xy += sign * x * filled
+
+    def _resync(self):
+        n = min(self._count, self.window)
+        block = self._tail(n)
+        valid = ~np.isnan(block)
+        filled = np.where(valid, block, 0.0)
+        xs = np.arange(n, dtype=np.float64)
+        self._origin = self._count - n
+        self._valid = valid.sum(axis=0).astype(np.float64)
+        self._sum = filled.sum(axis=0)
+        self._sum_x = xs @ valid
+        self._sum_x2 = (xs * xs) @ valid
+        self._sum_xy = xs @ filled
+
+    def _tail(self, n: int) -> np.ndarray:
+        """View of the last n samples, oldest first"""
+        end = (self._count - 1) % self.capacity + self.capacity + 1
+        return self._values[end - n:end]
+
+    def latest(self, column: str) -> Optional[float]:
+        if self._count == 0:
+            return None
+        return float(self._tail(1)[0, self._column_index[column]])
+
+    def moving_average(self, column: str) -> Optional[float]:
+        """Mean of the valid values among the last `window` samples"""
+        i = self._column_index[column]
+        if self._valid[i] == 0:
+            return None
+        return float(self._sum[i] / self._valid[i])
+
+    def ewma(self, column: str) -> Optional[float]:
+        value = self._ewma[self._column_index[column]]
+        return None if np.isnan(value) else float(value)
+
+    def slope(self, column: str) -> Optional[float]:
+        """Least-squares slope per sample over the valid values among the last `window` samples"""
+        i = self._column_index[column]
+        n = self._valid[i]
+        if n < 2:
+            return None
+        denominator = n * self._sum_x2[i] - self._sum_x[i] ** 2
+        return float((n * self._sum_xy[i] - self._sum_x[i] * self._sum[i]) / denominator)
+
+    def mean_change(self, column: str) -> Optional[float]:
+        """Average step change over the window, i.e. tail(window).diff().mean()"""
+        n = min(self._count, self.window)
+        if n < 2:
+            return None
+        tail = self._tail(n)[:, self._column_index[column]]
+        return float((tail[-1] - tail[0]) / (n - 1))
+
+    def to_numpy(self) -> np.ndarray:
+        """Zero-copy view of the retained samples, oldest first"""
+        return self._tail(len(self))
+
+    def times(self) -> np.ndarray:
+        """Zero-copy view of the retained samples' timestamps, oldest first"""
+        n = len(self)
+        end = (self._count - 1) % self.capacity + self.capacity + 1 if n else 0
+        return self._times[end - n:end]
+
+    def to_pandas(self):
+        """DataFrame over the retained samples without copying the values"""
+        import pandas as pd
+        index = pd.to_datetime(self.times(), unit='s')
+        return pd.DataFrame(self.to_numpy(), columns=self.columns, index=index, copy=False)
@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+
+# Columns every archive has; rows are ordered by (block, log_index)
+KEY_COLUMNS = {'block': 'int64', 'timestamp': 'int64', 'log_index': 'int32'}
+
+# Dictionary-encoded columns (addresses, event names, hashes) are stored as codes into a per-column table
+DICT = 'dict'
+
+
+class ColumnArchive:
+    """Append-only columnar store of decoded logs: one raw NumPy file per column
+
+    Columns are read back as read-only memory maps, so a backtest over millions
+    of rows touches only the pages of the columns it uses. manifest.json holds
+    the schema, the committed row count, dictionary tables and next_block, the
+    first block not yet archived. It is replaced atomically after the column
+    files are appended; bytes past the committed row count (from a crash
+    mid-append) are truncated on open, which makes an interrupted backfill
+    resumable from next_block.
+    """
+
+    def __init__(self, path: str, columns: Dict[str, str] = None):
+        self.path = path
+        self.logger = logging.getLogger('ColumnArchive')
+        self._lock = threading.Lock()
+        self._maps: Dict[str, np.ndarray] = {}
+
+        os.makedirs(path, exist_ok=True)
+        manifest = self._load_manifest()
+        schema = {**KEY_COLUMNS, **(columns or {})}
+        if manifest is None:
+            if columns is None:
+                raise FileNotFoundError(f"No archive at {path}")
+            self._manifest = {'columns': schema, 'rows': 0, 'next_block': None, 'dictionaries': {}}
+            self._save_manifest()
+        elif columns is not None and manifest['columns'] != schema:
+            raise ValueError(f"Archive {path} has columns {manifest['columns']}, expected {schema}")
+        else:
+            self._manifest = manifest
+        self._codes = {
+            name: {value: code for code, value in enumerate(values)}
+            for name, values in self._manifest['dictionaries'].items()
+        }
+        self._truncate()
+
+    @property
+    def columns(self) -> Dict[str, str]:
+        return self._manifest['columns']
+
+    @property
+    def next_block(self) -> Optional[int]:
+        return self._manifest['next_block']
+
+    def __len__(self):
+        return self._manifest['rows']
+
+    def _manifest_path(self) -> str:
+        return f"{self.path}/manifest.json"
+
+    def _column_path(self, name: str) -> str:
+        return f"{self.path}/{name}.bin"
+
+    def _dtype(self, name: str) -> np.dtype:
+        dtype = self.columns[name]
+        return np.dtype('uint32' if dtype == DICT else dtype)
+
+    def _load_manifest(self) -> Optional[Dict]:
+        try:
+            with open(self._manifest_path(), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _save_manifest(self):
+        tmp = f"{self._manifest_path()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self._manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._manifest_path())
+
+    def _truncate(self):
+        for name in self.columns:
+            path = self._column_path(name)
+            size = self._manifest['rows'] * self._dtype(name).itemsize
+            if not os.path.exists(path):
+                open(path, 'wb').close()
+            elif os.path.getsize(path) != size:
+                self.logger.warning(f"Truncating {path} to {self._manifest['rows']} committed rows")
+                os.truncate(path, size)
+
+    def encode(self, name: str, values: List) -> np.ndarray:
+        """Codes for a dictionary column, adding unseen values to its table"""
+        codes = self._codes.setdefault(name, {})
+        table = self._manifest['dictionaries'].setdefault(name, [])
+        result = np.empty(len(values), dtype=np.uint32)
+        for i, value in enumerate(values):
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(table)
+                table.append(value)
+            result[i] = code
+        return result
+
+    def dictionary(self, name: str) -> List:
+        """Values of a dictionary column, indexed by code"""
+        return self._manifest['dictionaries'].get(name, [])
+
+    def append(self, rows: Dict[str, List], next_block: int):
+        """Append rows (a list per column, dictionary columns as raw values) and commit next_block"""
+        with self._lock:
+            count = len(rows['block']) if rows else 0
+            if count:
+                arrays = {}
+                for name in self.columns:
+                    if self.columns[name] == DICT:
+                        arrays[name] = self.encode(name, rows[name])
+                    else:
+                        arrays[name] = np.asarray(rows[name], dtype=self._dtype(name))
+                    if len(arrays[name]) != count:
+                        raise ValueError(f"Column {name} has {len(arrays[name])} rows, expected {count}")
+                for name, array in arrays.items():
+                    with open(self._column_path(name), 'ab') as f:
+                        f.write(array.tobytes())
+                        f.flush()
+                        os.fsync(f.fileno())
+            self._manifest['rows'] += count
+            self._manifest['next_block'] = next_block
+            self._save_manifest()
+            self._maps.clear()
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only memory map of a column's committed rows"""
+        array = self._maps.get(name)
+        if array is None:
+            rows = len(self)
+            if rows == 0:
+                array = np.empty(0, dtype=self._dtype(name))
+            else:
+                array = np.memmap(self._column_path(name), dtype=self._dtype(name), mode='r', shape=(rows,))
+            self._maps[name] = array
+        return array
+
+    def read(self, columns: List[str] = None, start_block: int = None, end_block: int = None) -> Dict[str, np.ndarray]:
+        """Columns for rows with start_block <= block <= end_block, as views into the memory maps"""
+        blocks = self.column('block')
+        lo = 0 if start_block is None else int(np.searchsorted(blocks, start_block, side='left'))
+        hi = len(blocks) if end_block is None else int(np.searchsorted(blocks, end_block, side='right'))
+        return {name: self.column(name)[lo:hi] for name in (columns or self.columns)}
+
+    def between(self, start_time: int = None, end_time: int = None, columns: List[str] = None) -> Dict[str, np.ndarray]:
+        """Columns for rows with start_time <= timestamp <= end_time (block timestamps never decrease)"""
+        timestamps = self.column('timestamp')
+        lo = 0 if start_time is None else int(np.searchsorted(timestamps, start_time, side='left'))
+        hi = len(timestamps) if end_time is None else int(np.searchsorted(timestamps, end_time, side='right'))
+        return {name: self.column(name)[lo:hi] for name in (columns or self.columns)}
+
+    def to_pandas(self, columns: List[str] = None):
+        """DataFrame indexed by block time, with dictionary columns decoded"""
+        import pandas as pd
+        data = {}
+        for name in columns or self.columns:
+            values = self.column(name)
+            if self.columns[name] == DICT:
+                data[name] = pd.Categorical.from_codes(values.astype(np.int64), categories=self.dictionary(name))
+            else:
+                data[name] = values
+        index = pd.to_datetime(self.column('timestamp'), unit='s')
+        return pd.DataFrame(data, index=index)
+
+    def stats(self) -> Dict:
+        blocks = self.column('block')
+        return {
+            'rows': len(self),
+            'first_block': int(blocks[0]) if len(blocks) else None,
+            'last_block': int(blocks[-1]) if len(blocks) else None,
+            'next_block': self.next_block,
+            'bytes': sum(os.path.getsize(self._column_path(name)) for name in self.columns),
+        }
@@ -0,0 +1,327 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional
+from eth_utils import event_signature_to_log_topic, keccak
+from web3 import AsyncWeb3, Web3
+from web3.types import RPCEndpoint
+from src.backtest.archive import DICT, ColumnArchive
+from src.instrumentation import metrics
+from src.vault.super_vault_manager import pool_name
+
+RAY = 10 ** 27
+
+@lru_cache(maxsize=4096)
+def _address(word: bytes) -> str:
+    """Checksum address in the low 20 bytes of a 32-byte word (a handful of distinct ones per source)"""
+    return Web3.to_checksum_address(word[-20:])
+
+
+def _uint(data: bytes, index: int) -> int:
+    """The index-th 32-byte word of ABI data; every decoded field is static"""
+    return int.from_bytes(data[32 * index:32 * (index + 1)], 'big')
+
+
+# SuperVault events and the strategy types whose pools they name (SuperVault's StrategyType enum)
+VAULT_EVENTS = {
+    event_signature_to_log_topic(signature): signature.split('(')[0]
+    for signature in (
+        'PoolAdded(string,address)',
+        'PoolDeposit(string,address,uint256)',
+        'PoolWithdraw(string,address,uint256)',
+        'StrategyDeployed(uint8,address)',
+        'FundsAllocated(uint8,uint256)',
+        'FundsWithdrawn(uint8,uint256)',
+        'ExecutionResult(bool,bytes)',
+    )
+}
+STRATEGY_TYPES = (0, 1, 2)
+
+# eth_getLogs errors that mean "ask for fewer blocks" rather than "try again"
+RANGE_ERRORS = ('more than', 'too many', 'range', 'limit exceeded', 'response size', 'exceed')
+
+
+@dataclass
+class LogSource:
+    """Logs to archive: an emitting contract, the events to fetch and how to decode them into columns"""
+    name: str
+    address: str
+    topics: List[bytes]
+    columns: Dict[str, str]
+    decode: Callable[[Dict], Optional[Dict]]
+
+
+def aave_reserve_source(pool_address: str) -> LogSource:
+    """Aave v3 ReserveDataUpdated: rates as fractions (ray / 1e27) and liquidity/borrow indexes"""
+    topic = event_signature_to_log_topic('ReserveDataUpdated(address,uint256,uint256,uint256,uint256,uint256)')
+
+    def decode_log(log):
+        data = log['data']
+        return {
+            'reserve': _address(log['topics'][1]),
+            'liquidity_rate': _uint(data, 0) / RAY,
+            'stable_borrow_rate': _uint(data, 1) / RAY,
+            'variable_borrow_rate': _uint(data, 2) / RAY,
+            'liquidity_index': _uint(data, 3) / RAY,
+            'variable_borrow_index': _uint(data, 4) / RAY,
+        }
+
+    return LogSource(
+        name='aave_reserve_data',
+        address=Web3.to_checksum_address(pool_address),
+        topics=[topic],
+        columns={
+            'reserve': DICT,
+            'liquidity_rate': 'float64',
+            'stable_borrow_rate': 'float64',
+            'variable_borrow_rate': 'float64',
+            'liquidity_index': 'float64',
+            'variable_borrow_index': 'float64',
+        },
+        decode=decode_log
+    )
+
+
+def vault_source(vault_address: str, pool_names: Iterable[str] = ()) -> LogSource:
+    """All SuperVault events, one row each
+
+    target is the pool name or strategy pool name; indexed pool names are only
+    logged as hashes, so names not in pool_names (or the strategy pools) are
+    archived as the hash. amount is the event's amount, or 1/0 for an
+    ExecutionResult's success; address is a deployed strategy or added pool.
+    """
+    names = {keccak(text=name): name for name in [*pool_names, *map(pool_name, STRATEGY_TYPES)]}
+
+    def target(topic: bytes) -> str:
+        return names.get(topic, '0x' + topic.hex())
+
+    def decode_log(log):
+        topics = log['topics']
+        event = VAULT_EVENTS.get(topics[0])
+        if event is None:
+            return None
+        data = log['data']
+        row = {'event': event, 'target': '', 'asset': '', 'amount': 0.0, 'address': ''}
+        if event in ('PoolDeposit', 'PoolWithdraw'):
+            row['target'] = target(topics[1])
+            row['asset'] = _address(topics[2])
+            row['amount'] = float(_uint(data, 0))
+        elif event == 'PoolAdded':
+            row['target'] = target(topics[1])
+            row['address'] = _address(data[:32])
+        elif event == 'StrategyDeployed':
+            row['target'] = pool_name(int.from_bytes(topics[1], 'big'))
+            row['address'] = _address(data[:32])
+        elif event in ('FundsAllocated', 'FundsWithdrawn'):
+            row['target'] = pool_name(int.from_bytes(topics[1], 'big'))
+            row['amount'] = float(_uint(data, 0))
+        else:
+            # ExecutionResult(bool success, bytes data): the head word is success
+            row['amount'] = float(_uint(data, 0))
+        return row
+
+    return LogSource(
+        name='vault_events',
+        address=Web3.to_checksum_address(vault_address),
+        topics=list(VAULT_EVENTS),
+        columns={'event': DICT, 'target': DICT, 'asset': DICT, 'amount': 'float64', 'address': DICT},
+        decode=decode_log
+    )
+
+
+class LogBackfill:
+    """Backfills a LogSource over a block range into a ColumnArchive
+
+    The range is cut into chunks fetched concurrently with eth_getLogs. When a
+    node rejects a range (too many results, range too large) or times out, the
+    chunk is split in half and chunk_size shrinks; full-size chunks that succeed
+    grow it again, so the chunk size settles near what the node allows. Block
+    timestamps are fetched only for blocks that have logs, in batched
+    eth_getBlockByNumber requests. Both go to the provider directly: web3's
+    result formatters (AttributeDicts, checksummed addresses) cost more than the
+    request itself over thousands of logs, so only the fields the decoders use
+    are converted.
+
+    Chunks are committed in block order, so the archive stays sorted and its
+    next_block is a resume point: a rerun (or a later run extending the range)
+    starts where the last committed chunk ended. At most `concurrency` chunks
+    are in flight or waiting on an earlier one.
+    """
+
+    def __init__(self, web3: AsyncWeb3, archive_path: str = "data/archive", chunk_size: int = 2000,
+                 min_chunk_size: int = 1, max_chunk_size: int = 10000, concurrency: int = 8,
+                 timestamp_batch: int = 100, max_retries: int = 5, retry_delay: float = 0.5):
+        self.web3 = web3
+        self.archive_path = archive_path
+        self.chunk_size = chunk_size
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.concurrency = concurrency
+        self.timestamp_batch = timestamp_batch
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.logger = logging.getLogger('LogBackfill')
+
+        self.requests = 0
+        self.splits = 0
+        self.retries = 0
+        self.logs = 0
+
+    def archive(self, source: LogSource) -> ColumnArchive:
+        return ColumnArchive(os.path.join(self.archive_path, source.name), source.columns)
+
+    async def run(self, source: LogSource, from_block: int, to_block: int = None) -> Dict:
+        """Archive source's logs from from_block (or the archive's resume point) to to_block (default latest)"""
+        archive = self.archive(source)
+        if to_block is None:
+            to_block = await self.web3.eth.block_number
+        start = max(from_block, archive.next_block or from_block)
+        started = time.perf_counter()
+        rows_before = len(archive)
+
+        if start <= to_block:
+            self.logger.info(f"Backfilling {source.name} blocks {start}-{to_block} in chunks of {self.chunk_size}")
+            await self._run(source, archive, start, to_block)
+
+        stats = {
+            'source': source.name,
+            'from_block': start,
+            'to_block': to_block,
+            'rows': len(archive) - rows_before,
+            'requests': self.requests,
+            'splits': self.splits,
+            'retries': self.retries,
+            'chunk_size': self.chunk_size,
+            'seconds': round(time.perf_counter() - started, 3),
+            'archive': archive.stats(),
+        }
+        self.logger.info(f"Backfilled {source.name}: {stats['rows']} rows up to block {to_block}")
+        return stats
+
+    async def _run(self, source: LogSource, archive: ColumnArchive, start: int, to_block: int):
+        slots = asyncio.Semaphore(self.concurrency)
+        pending: Dict[int, tuple] = {}
+        committed = start
+        tasks = []
+
+        def commit():
+            nonlocal committed
+            while committed in pending:
+                hi, logs, timestamps = pending.pop(committed)
+                archive.append(self._rows(source, logs, timestamps), next_block=hi + 1)
+                metrics.inc('backfill_rows_total', len(logs), source=source.name)
+                committed = hi + 1
+                slots.release()
+
+        async def chunk(lo: int, hi: int):
+            try:
+                logs = await self._fetch(source, lo, hi)
+                timestamps = await self._timestamps({log['blockNumber'] for log in logs})
+            except Exception:
+                slots.release()
+                raise
+            pending[lo] = (hi, logs, timestamps)
+            commit()
+
+        cursor = start
+        try:
+            while cursor <= to_block:
+                await slots.acquire()
+                failed = next((task for task in tasks if task.done() and task.exception()), None)
+                if failed:
+                    raise failed.exception()
+                hi = min(cursor + self.chunk_size - 1, to_block)
+                tasks = [task for task in tasks if not task.done()]
+                tasks.append(asyncio.create_task(chunk(cursor, hi)))
+                cursor = hi + 1
+            await asyncio.gather(*tasks)
+        except BaseException as e:
+            for task in tasks:
+                task.cancel()
+            log = self.logger.warning if isinstance(e, asyncio.CancelledError) else self.logger.error
+            log(f"Backfill of {source.name} stopped; archived up to block {committed - 1}")
+            raise
+
+    async def _fetch(self, source: LogSource, lo: int, hi: int, attempt: int = 0) -> List[Dict]:
+        self.requests += 1
+        metrics.inc('backfill_requests_total', source=source.name)
+        try:
+            logs = await self._request('eth_getLogs', [{
+                'address': source.address,
+                'topics': [['0x' + topic.hex() for topic in source.topics]],
+                'fromBlock': hex(lo),
+                'toBlock': hex(hi),
+            }])
+        except Exception as e:
+            if hi > lo and self._range_error(e):
+                self.splits += 1
+                metrics.inc('backfill_splits_total', source=source.name)
+                self.chunk_size = max(self.min_chunk_size, (hi - lo + 1) // 2)
+                mid = (lo + hi) // 2
+                left, right = await asyncio.gather(
+                    self._fetch(source, lo, mid), self._fetch(source, mid + 1, hi)
+                )
+                return left + right
+            if attempt >= self.max_retries:
+                raise
+            self.retries += 1
+            self.logger.warning(f"eth_getLogs {lo}-{hi} failed, retrying: {e}")
+            await asyncio.sleep(self.retry_delay * 2 ** attempt)
+            return await self._fetch(source, lo, hi, attempt + 1)
+
+        if hi - lo + 1 >= self.chunk_size:
+            self.chunk_size = min(self.max_chunk_size, self.chunk_size + self.chunk_size // 4 + 1)
+        self.logs += len(logs)
+        return [
+            {
+                'blockNumber': int(log['blockNumber'], 16),
+                'logIndex': int(log['logIndex'], 16),
+                'topics': [bytes.fromhex(topic[2:]) for topic in log['topics']],
+                'data': bytes.fromhex(log['data'][2:]),
+            }
+            for log in logs
+        ]
+
+    async def _request(self, method: str, params: List):
+        response = await self.web3.provider.make_request(RPCEndpoint(method), params)
+        if 'error' in response:
+            raise ValueError(response['error'].get('message', response['error']))
+        return response['result']
+
+    @staticmethod
+    def _range_error(error: Exception) -> bool:
+        if isinstance(error, asyncio.TimeoutError):
+            return True
+        message = str(error).lower()
+        return any(pattern in message for pattern in RANGE_ERRORS)
+
+    async def _timestamps(self, blocks) -> Dict[int, int]:
+        timestamps = {}
+        blocks = sorted(blocks)
+        for i in range(0, len(blocks), self.timestamp_batch):
+            group = blocks[i:i + self.timestamp_batch]
+            responses = await self.web3.provider.make_batch_request([
+                (RPCEndpoint('eth_getBlockByNumber'), [hex(block), False]) for block in group
+            ])
+            for block, response in zip(group, responses):
+                if 'error' in response:
+                    raise ValueError(f"Block {block}: {response['error'].get('message', response['error'])}")
+                timestamps[block] = int(response['result']['timestamp'], 16)
+        return timestamps
+
+    @staticmethod
+    def _rows(source: LogSource, logs: List[Dict], timestamps: Dict[int, int]) -> Dict[str, List]:
+        rows = {name: [] for name in ('block', 'timestamp', 'log_index', *source.columns)}
+        for log in sorted(logs, key=lambda log: (log['blockNumber'], log['logIndex'])):
+            decoded = source.decode(log)
+            if decoded is None:
+                continue
+            rows['block'].append(log['blockNumber'])
+            rows['timestamp'].append(timestamps[log['blockNumber']])
+            rows['log_index'].append(log['logIndex'])
+            for name in source.columns:
+                rows[name].append(decoded[name])
+        return rows
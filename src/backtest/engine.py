@@ -0,0 +1,353 @@
+import itertools
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from src.config import StrategyConfig
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+# StrategyConfig fields the decision rules read; results carry them so sweeps can be compared
+PARAMETERS = (
+    'min_apy', 'max_allocation_percentage', 'rebalance_threshold', 'emergency_health_factor',
+    'min_validator_performance', 'emergency_withdrawal_percentage', 'max_gas_price', 'rebalance_interval',
+)
+
+# strategy.arbitrage thresholds, with the values config.yaml ships for those it leaves out
+ARBITRAGE_DEFAULTS = {
+    'min_profit_percentage': 0.02,
+    'vault_percentage': 0.05,
+    'max_slippage': 0.01,
+    'min_amount': 1,
+    'max_amount': 1000,
+    'gas_threshold': 100,
+}
+
+SERIES = ('timestamps', 'aave_apy', 'sonic_apy', 'health_factor', 'validator_performance', 'gas_price', 'sonic_price',
+          'arbitrum_price')
+
+
+@dataclass
+class History:
+    """The metric series the agent decides on, one row per tick
+
+    APYs are fractions (aave_apy is Strategy 1's estimated_net_apy, sonic_apy
+    Strategy 2's farm APY) and gas_price is in wei. sonic_price and
+    arbitrum_price are the asset's price on each chain, for the arbitrage
+    rules. Scalars are broadcast over the ticks, for metrics a source does not
+    record (equal prices mean no arbitrage).
+    """
+    timestamps: np.ndarray
+    aave_apy: np.ndarray
+    sonic_apy: np.ndarray
+    health_factor: np.ndarray
+    validator_performance: np.ndarray
+    gas_price: np.ndarray
+    sonic_price: np.ndarray = 1.0
+    arbitrum_price: np.ndarray = 1.0
+
+    def __post_init__(self):
+        self.timestamps = np.asarray(self.timestamps, dtype=np.float64)
+        for name in SERIES[1:]:
+            value = np.asarray(getattr(self, name), dtype=np.float64)
+            setattr(self, name, np.broadcast_to(value, self.timestamps.shape) if value.ndim == 0 else value)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def save(self, path: str):
+        """Write each series to path as a .npy file"""
+        os.makedirs(path, exist_ok=True)
+        for name in SERIES:
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'History':
+        """Read a saved History; with mmap, as read-only memory maps that processes share through the page cache"""
+        return cls(**{
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None) for name in SERIES
+        })
+
+    @classmethod
+    def from_metric_store(cls, store, validator_performance=1.0, gas_price=1e9) -> 'History':
+        """From the agent's RollingMetricStore (aave_apy, sonic_apy, health_factor columns)"""
+        values = store.to_numpy()
+        column = {name: values[:, i] for i, name in enumerate(store.columns)}
+        return cls(
+            store.times(), np.nan_to_num(column['aave_apy']), np.nan_to_num(column['sonic_apy']),
+            np.nan_to_num(column['health_factor'], nan=np.inf), validator_performance, gas_price
+        )
+
+    @classmethod
+    def from_knowledge(cls, store, start: datetime = None, end: datetime = None, validator_performance=1.0,
+                       gas_price=1e9) -> 'History':
+        """From the market_patterns records of a KnowledgeStore"""
+        records = store.range('market_patterns', start, end)
+        patterns = [record.get('pattern') or {} for record in records]
+        return cls(
+            [datetime.fromisoformat(record['timestamp']).timestamp() for record in records],
+            [pattern.get('aave_apy', 0) for pattern in patterns],
+            [pattern.get('sonic_apy', 0) for pattern in patterns],
+            [pattern.get('health_factor') or np.inf for pattern in patterns],
+            validator_performance,
+            gas_price
+        )
+
+    @classmethod
+    def from_archive(cls, archive, reserve: str, interval: float = 60, start_time: int = None, end_time: int = None,
+                     sonic_apy=0.0, health_factor=np.inf, validator_performance=1.0, gas_price=1e9) -> 'History':
+        """From archived ReserveDataUpdated rows of one reserve, forward-filled onto a regular tick grid"""
+        rows = archive.between(start_time, end_time, ['timestamp', 'reserve', 'liquidity_rate', 'variable_borrow_rate'])
+        mask = rows['reserve'] == archive.dictionary('reserve').index(reserve)
+        times = rows['timestamp'][mask]
+        if len(times) == 0:
+            raise ValueError(f"No archived rows for reserve {reserve}")
+        # Same estimate as AaveDataProvider.get_optimal_position
+        net_apy = rows['liquidity_rate'][mask] - rows['variable_borrow_rate'][mask]
+        grid = np.arange(times[0], (end_time or times[-1]) + 1, interval)
+        latest = np.searchsorted(times, grid, side='right') - 1
+        return cls(grid, net_apy[latest], sonic_apy, health_factor, validator_performance, gas_price)
+
+
+def target_allocations(apy: np.ndarray, min_apy: float, max_allocation: float) -> np.ndarray:
+    """Target share of total assets per strategy and tick, for apy of shape (ticks, 2)
+
+    SmartAgent._calculate_target_allocations over every tick at once: the
+    strategy with the higher APY above min_apy gets max_allocation_percentage,
+    the other one the rest (at most as much) if its APY is also above min_apy.
+    """
+    eligible = apy > min_apy
+    best = np.argmax(apy, axis=1)
+    rows = np.arange(len(apy))
+    target = np.zeros_like(apy)
+    target[rows, best] = np.where(eligible[rows, best], max_allocation, 0.0)
+    other = 1 - best
+    target[rows, other] = np.where(eligible[rows, other], min(1 - max_allocation, max_allocation), 0.0)
+    return target
+
+
+class Backtester:
+    """Replays a History through the agent's rebalance and emergency rules with array operations
+
+    Rules, as in SmartAgent:
+      - analyze_strategies: on each rebalance_interval tick where gas is under
+        max_gas_price, a strategy whose APY is above min_apy and whose share of
+        total assets is more than rebalance_threshold off its target is moved
+        to the target. Withdrawals go first; allocations are limited to idle funds.
+      - check_emergency_conditions: on every tick, a health factor below
+        emergency_health_factor withdraws emergency_withdrawal_percentage of
+        Strategy 1, validator performance below min_validator_performance the
+        same share of Strategy 2 (amounts under one unit are skipped, as the
+        agent's int() does).
+
+    Between two actions the allocation only drifts with each strategy's yield,
+    so it is computed for a whole window of ticks at once from cumulative log
+    growth; the loop runs once per action taken, not once per tick. Gas is paid
+    by the agent's wallet: one transaction per rebalance (a batched plan, see
+    PlanExecutor) or per action, one per emergency withdrawal and two per
+    arbitrage (a leg on each chain, both priced at the series' gas price).
+    """
+
+    def __init__(self, history: History, initial_assets: float = 100_000.0, gas_per_transaction: int = 180_000,
+                 native_price: float = 1.0, batched: bool = True, window: int = 64):
+        self.history = history
+        self.initial_assets = initial_assets
+        self.gas_per_transaction = gas_per_transaction
+        self.native_price = native_price
+        self.batched = batched
+        self.window = window
+        self.logger = logging.getLogger('Backtester')
+
+        self._apy = np.column_stack([history.aave_apy, history.sonic_apy])
+        # Tick i earns the APY seen at tick i - 1 over the time since it
+        elapsed = np.diff(history.timestamps, prepend=history.timestamps[:1]) / SECONDS_PER_YEAR
+        growth = np.log1p(np.maximum(np.vstack([np.zeros((1, 2)), self._apy[:-1]]) * elapsed[:, None], -0.999999))
+        self._cumlog = np.cumsum(growth, axis=0)
+        self._schedules: Dict[float, np.ndarray] = {}
+        cheaper = np.minimum(history.sonic_price, history.arbitrum_price)
+        self._spread = np.abs(history.sonic_price - history.arbitrum_price) / np.where(cheaper > 0, cheaper, np.inf)
+
+    def _schedule(self, interval: float) -> np.ndarray:
+        """Ticks on which the rebalance job runs: the first tick of each interval"""
+        schedule = self._schedules.get(interval)
+        if schedule is None:
+            periods = np.floor(self.history.timestamps / interval)
+            schedule = self._schedules[interval] = np.concatenate([[True], np.diff(periods) > 0])
+        return schedule
+
+    def run(self, params: StrategyConfig) -> Dict:
+        """Backtest one set of strategy parameters"""
+        history = self.history
+        ticks = len(history)
+        apy = self._apy
+        threshold = params.rebalance_threshold
+        withdrawal = params.emergency_withdrawal_percentage
+
+        target = target_allocations(apy, params.min_apy, params.max_allocation_percentage)
+        checked = (self._schedule(params.rebalance_interval) & (history.gas_price <= params.max_gas_price))[:, None] \
+            & (apy > params.min_apy)
+        emergency = np.column_stack([
+            history.health_factor < params.emergency_health_factor,
+            history.validator_performance < params.min_validator_performance,
+        ])
+
+        weights = np.zeros(2)
+        value = self.initial_assets
+        values = np.empty(ticks)
+        allocation_sum = np.zeros(2)
+        origin = 0
+        start = 0
+        window = self.window
+        rebalances = emergencies = transactions = 0
+        gas_cost = turnover = 0.0
+
+        while start < ticks:
+            end = min(ticks, start + window)
+            held = weights * np.exp(self._cumlog[start:end] - self._cumlog[origin])
+            total = (1 - weights.sum()) + held.sum(axis=1)
+            current = held / total[:, None]
+            drifted = checked[start:end] & (np.abs(current - target[start:end]) > threshold)
+            pulled = emergency[start:end] & (current * (value * total * withdrawal)[:, None] >= 1)
+            hit = drifted.any(axis=1) | pulled.any(axis=1)
+            if not hit.any():
+                values[start:end] = value * total
+                allocation_sum += current.sum(axis=0)
+                start = end
+                window *= 2
+                continue
+
+            k = int(np.argmax(hit))
+            tick = start + k
+            values[start:tick + 1] = value * total[:k + 1]
+            allocation_sum += current[:k + 1].sum(axis=0)
+            value *= total[k]
+            weights = current[k].copy()
+            sent = 0
+
+            if pulled[k].any():
+                # The emergency path runs on its own interval, ahead of the rebalance job
+                weights = np.where(pulled[k], weights * (1 - withdrawal), weights)
+                emergencies += 1
+                sent += int(pulled[k].sum())
+                turnover += float((current[k] - weights).sum()) * value
+
+            moved = checked[tick] & (np.abs(weights - target[tick]) > threshold)
+            if moved.any():
+                before = weights.copy()
+                weights = np.where(moved & (target[tick] < weights), target[tick], weights)
+                wanted = np.where(moved & (target[tick] > weights), target[tick] - weights, 0.0)
+                idle = 1 - weights.sum()
+                if wanted.sum() > idle:
+                    wanted *= max(idle, 0.0) / wanted.sum()
+                weights = weights + wanted
+                rebalances += 1
+                sent += 1 if self.batched else int(moved.sum())
+                turnover += float(np.abs(weights - before).sum()) * value
+
+            transactions += sent
+            gas_cost += sent * self.gas_per_transaction * history.gas_price[tick] / 1e18 * self.native_price
+            origin = tick
+            start = tick + 1
+            window = self.window
+
+        arbitrage = {**ARBITRAGE_DEFAULTS, **params.arbitrage}
+        trades, profit, arbitrage_gas = self._arbitrage(arbitrage, values)
+        transactions += 2 * trades
+        gas_cost += arbitrage_gas
+
+        years = max((history.timestamps[-1] - history.timestamps[0]) / SECONDS_PER_YEAR, 1e-12)
+        peak = np.maximum.accumulate(values)
+        vault_return = values[-1] / self.initial_assets - 1
+        net_return = (values[-1] + profit - gas_cost) / self.initial_assets - 1
+        return {
+            **{name: getattr(params, name) for name in PARAMETERS},
+            **{f"arbitrage.{name}": value for name, value in arbitrage.items()},
+            'vault_return': float(vault_return),
+            'net_return': float(net_return),
+            'net_apr': float(net_return / years),
+            'max_drawdown': float(np.max(1 - values / peak)),
+            'rebalances': rebalances,
+            'emergencies': emergencies,
+            'transactions': transactions,
+            'gas_cost': float(gas_cost),
+            'turnover': float(turnover),
+            'strategy_1_share': float(allocation_sum[0] / ticks),
+            'strategy_2_share': float(allocation_sum[1] / ticks),
+            'arbitrage_trades': trades,
+            'arbitrage_profit': float(profit),
+        }
+
+    def _arbitrage(self, thresholds: Dict[str, float], values: np.ndarray) -> Tuple[int, float, float]:
+        """Trades, gross profit and gas of the cross-chain arbitrage rules over the whole series
+
+        A trade takes vault_percentage of the vault's value (capped at
+        max_amount) when the price spread less max_slippage is at least
+        min_profit_percentage, gas is under gas_threshold gwei and the profit
+        covers the two legs' gas. The vault's value is the only state it reads,
+        so every tick is evaluated at once.
+        """
+        edge = self._spread - thresholds['max_slippage']
+        candidates = np.flatnonzero(edge >= thresholds['min_profit_percentage'])
+        if len(candidates) == 0:
+            return 0, 0.0, 0.0
+        edge = edge[candidates]
+        gas_price = self.history.gas_price[candidates]
+        amount = np.minimum(values[candidates] * thresholds['vault_percentage'], thresholds['max_amount'])
+        gas = 2 * self.gas_per_transaction * gas_price / 1e18 * self.native_price
+        trade = (gas_price <= thresholds['gas_threshold'] * 1e9) & (amount >= thresholds['min_amount']) \
+            & (amount * edge > gas)
+        return int(trade.sum()), float((amount * edge)[trade].sum()), float(gas[trade].sum())
+
+
+def configure(base: StrategyConfig, values: Dict[str, float]) -> StrategyConfig:
+    """base with the given fields replaced; 'arbitrage.<name>' sets one of the arbitrage thresholds"""
+    update = {name: value for name, value in values.items() if not name.startswith('arbitrage.')}
+    arbitrage = {name[len('arbitrage.'):]: value for name, value in values.items() if name.startswith('arbitrage.')}
+    if arbitrage:
+        update['arbitrage'] = {**base.arbitrage, **arbitrage}
+    return base.model_copy(update=update)
+
+
+def grid(base: StrategyConfig = None, **axes: Sequence) -> List[StrategyConfig]:
+    """Every combination of the given StrategyConfig field values, e.g. grid(min_apy=[0.02, 0.05])"""
+    base = base or StrategyConfig()
+    names = list(axes)
+    return [
+        configure(base, dict(zip(names, values)))
+        for values in itertools.product(*(axes[name] for name in names))
+    ]
+
+
+def results_table(results: List[Dict], sort_by: str = 'net_return', limit: int = 20) -> str:
+    """Text table of the best results, showing only the parameters that vary"""
+    if not results:
+        return ''
+    parameters = [*PARAMETERS, *(f"arbitrage.{name}" for name in ARBITRAGE_DEFAULTS)]
+    varied = [name for name in parameters if len({result[name] for result in results}) > 1]
+    metrics = ['net_return', 'net_apr', 'max_drawdown', 'rebalances', 'emergencies', 'gas_cost', 'strategy_1_share',
+               'strategy_2_share']
+    if any(result['arbitrage_trades'] for result in results):
+        metrics[5:5] = ['arbitrage_trades', 'arbitrage_profit']
+    columns = varied + metrics
+    rows = sorted(results, key=lambda result: result[sort_by], reverse=True)[:limit]
+
+    def cell(name, value):
+        if name in ('net_return', 'net_apr', 'max_drawdown', 'strategy_1_share', 'strategy_2_share'):
+            return f"{value:.2%}"
+        if isinstance(value, float):
+            return f"{value:.4g}"
+        return str(value)
+
+    cells = [[cell(name, row[name]) for name in columns] for row in rows]
+    widths = [max(len(name), *(len(line[i]) for line in cells)) for i, name in enumerate(columns)]
+    lines = ['  '.join(name.rjust(width) for name, width in zip(columns, widths))]
+    lines += ['  '.join(value.rjust(width) for value, width in zip(line, widths)) for line in cells]
+    return '\n'.join(lines)
+
+
+def to_pandas(results: List[Dict]):
+    """Results as a DataFrame, one row per parameter set"""
+    import pandas as pd
+    return pd.DataFrame(results)
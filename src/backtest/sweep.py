@@ -0,0 +1,207 @@
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from src.backtest.engine import ARBITRAGE_DEFAULTS, PARAMETERS, Backtester, History, configure
+from src.config import StrategyConfig
+
+# Parameters a search space can vary; arbitrage thresholds are named 'arbitrage.<name>'
+SEARCHABLE = (*PARAMETERS, *(f"arbitrage.{name}" for name in ARBITRAGE_DEFAULTS))
+
+
+class SearchSpace:
+    """Values to try per parameter: a list of values, or a {low, high, log} range to sample from
+
+    A space of lists is searched as a grid (every combination); random search
+    draws `samples` points, picking from lists and uniformly (or log-uniformly)
+    from ranges.
+    """
+
+    def __init__(self, axes: Dict[str, Any]):
+        unknown = [name for name in axes if name not in SEARCHABLE]
+        if unknown:
+            raise ValueError(f"Unknown sweep parameters {unknown}, expected some of {list(SEARCHABLE)}")
+        for name, axis in axes.items():
+            if isinstance(axis, dict) and not {'low', 'high'} <= set(axis):
+                raise ValueError(f"Range for {name} needs low and high, got {axis}")
+            if not isinstance(axis, dict) and not axis:
+                raise ValueError(f"No values for {name}")
+        self.axes = axes
+
+    def grid(self) -> List[Dict[str, Any]]:
+        ranges = [name for name, axis in self.axes.items() if isinstance(axis, dict)]
+        if ranges:
+            raise ValueError(f"{ranges} are ranges; a space with ranges can only be sampled")
+        points = [{}]
+        for name, values in self.axes.items():
+            points = [{**point, name: value} for point in points for value in values]
+        return points
+
+    def sample(self, samples: int, seed: int = 0) -> List[Dict[str, Any]]:
+        rng = random.Random(seed)
+
+        def draw(name, axis):
+            if not isinstance(axis, dict):
+                return rng.choice(axis)
+            low, high = axis['low'], axis['high']
+            if axis.get('log'):
+                value = low * (high / low) ** rng.random()
+            else:
+                value = rng.uniform(low, high)
+            return round(value) if name == 'max_gas_price' else value
+
+        return [{name: draw(name, axis) for name, axis in self.axes.items()} for _ in range(samples)]
+
+    def points(self, samples: int = None, seed: int = 0) -> List[Dict[str, Any]]:
+        return self.sample(samples, seed) if samples else self.grid()
+
+
+_worker: Optional[Tuple[Backtester, StrategyConfig]] = None
+
+
+def _init_worker(history_path: str, base: StrategyConfig, options: Dict):
+    global _worker
+    _worker = (Backtester(History.load(history_path), **options), base)
+
+
+def _evaluate(chunk: List[Tuple[int, Dict]]) -> List[Tuple[int, Dict]]:
+    backtester, base = _worker
+    return [(index, backtester.run(configure(base, point))) for index, point in chunk]
+
+
+class SweepRunner:
+    """Backtests every point of a search space across worker processes, checkpointing results as they finish
+
+    run_path holds the sweep:
+      history/       the series as .npy files, memory-mapped by every worker, so
+                     the data is in memory once however many workers there are
+      points.json    the points, in order
+      results.jsonl  one line per evaluated point, appended (and synced) per chunk
+
+    Rerunning on an existing run_path skips points already in results.jsonl, so
+    an interrupted sweep resumes where it stopped; a different set of points
+    is refused rather than mixed into the same results.
+    """
+
+    def __init__(self, run_path: str, base: StrategyConfig = None, workers: int = None, chunk_size: int = 32,
+                 progress_interval: float = 10, **options):
+        self.run_path = run_path
+        self.base = base or StrategyConfig()
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.progress_interval = progress_interval
+        self.options = options
+        self.logger = logging.getLogger('SweepRunner')
+
+    @property
+    def history_path(self) -> str:
+        return os.path.join(self.run_path, 'history')
+
+    def _points_path(self) -> str:
+        return os.path.join(self.run_path, 'points.json')
+
+    def _results_path(self) -> str:
+        return os.path.join(self.run_path, 'results.jsonl')
+
+    def prepare(self, history: History, points: List[Dict[str, Any]]):
+        """Write the history and points, or check they match the sweep already at run_path"""
+        if os.path.exists(self._points_path()):
+            with open(self._points_path(), 'r') as f:
+                saved = json.load(f)
+            if saved != json.loads(json.dumps(points)):
+                raise ValueError(f"Sweep at {self.run_path} has different points; use another run path")
+            saved_history = History.load(self.history_path)
+            if len(saved_history) != len(history) or \
+                    (saved_history.timestamps[[0, -1]] != history.timestamps[[0, -1]]).any():
+                raise ValueError(f"Sweep at {self.run_path} was run on a different history")
+            return
+        os.makedirs(self.run_path, exist_ok=True)
+        history.save(self.history_path)
+        tmp = f"{self._points_path()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(points, f)
+        os.replace(tmp, self._points_path())
+
+    def completed(self) -> Dict[int, Dict]:
+        """Results checkpointed so far, by point index"""
+        results = {}
+        try:
+            with open(self._results_path(), 'rb') as f:
+                lines = f.read().split(b'\n')
+        except FileNotFoundError:
+            return results
+        # The last piece is empty unless a crash tore the final line; drop it so appends start on a new line
+        if lines[-1]:
+            self.logger.warning(f"Dropping a partial result line from {self._results_path()}")
+            os.truncate(self._results_path(), sum(len(line) + 1 for line in lines[:-1]))
+        for line in lines[:-1]:
+            result = json.loads(line)
+            results[result.pop('index')] = result
+        return results
+
+    def run(self, history: History, points: List[Dict[str, Any]]) -> List[Dict]:
+        """Evaluate the points not checkpointed yet; returns every point's result, in order"""
+        self.prepare(history, points)
+        results = self.completed()
+        todo = [(index, point) for index, point in enumerate(points) if index not in results]
+        if results:
+            self.logger.info(f"Resuming sweep at {self.run_path}: {len(results)} of {len(points)} points done")
+        started = time.perf_counter()
+
+        with open(self._results_path(), 'a') as out:
+            done = 0
+            reported = started
+            for chunk_results in self._evaluate(todo):
+                for index, result in chunk_results:
+                    out.write(json.dumps({'index': index, **result}) + '\n')
+                    results[index] = result
+                out.flush()
+                os.fsync(out.fileno())
+                done += len(chunk_results)
+                now = time.perf_counter()
+                if done == len(todo) or now - reported >= self.progress_interval:
+                    reported = now
+                    self.logger.info(f"Sweep {len(results)}/{len(points)} points, {done / (now - started):.1f} points/s")
+        return [results[index] for index in range(len(points))]
+
+    def _evaluate(self, todo: List[Tuple[int, Dict]]) -> Iterator[List[Tuple[int, Dict]]]:
+        chunks = [todo[i:i + self.chunk_size] for i in range(0, len(todo), self.chunk_size)]
+        if self.workers == 1 or len(chunks) < 2:
+            _init_worker(self.history_path, self.base, self.options)
+            for chunk in chunks:
+                yield _evaluate(chunk)
+            return
+
+        # Workers memory-map the saved history instead of receiving a copy; a few chunks each are kept in
+        # flight so finished results are checkpointed while the rest run
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.history_path, self.base, self.options)) as executor:
+            pending = set()
+            queue = iter(chunks)
+            for chunk in queue:
+                pending.add(executor.submit(_evaluate, chunk))
+                if len(pending) >= self.workers * 2:
+                    break
+            try:
+                while pending:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        yield future.result()
+                        chunk = next(queue, None)
+                        if chunk is not None:
+                            pending.add(executor.submit(_evaluate, chunk))
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+
+
+def sweep(history: History, points: List[Dict[str, Any]], base: StrategyConfig = None, workers: int = None,
+          **options) -> List[Dict]:
+    """Backtest each point once with a SweepRunner in a temporary run path; nothing is kept to resume"""
+    with tempfile.TemporaryDirectory(prefix='sweep-') as run_path:
+        return SweepRunner(run_path, base, workers, **options).run(history, points)
@@ -0,0 +1,122 @@
+"""Event loop stalls, LLM requests and fallbacks: blocking OpenAI call vs the async advisor.
+
+    python -m src.benchmarks.advisor --ticks 20 --latency 0.8
+
+A heartbeat task measures how long the event loop is blocked while ticks ask
+for a recommendation. Market metrics drift slightly between ticks, as they do
+between blocks, so most ticks land on an already cached (quantized) key.
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from src.agent.advisor import StrategyAdvisor
+from src.benchmarks.stub_llm import StubLLMServer
+
+
+class Heartbeat:
+    """Largest gap between 10 ms wakeups, i.e. the worst event loop stall"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.max_stall = 0.0
+        self._task = None
+
+    async def _beat(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.max_stall = max(self.max_stall, time.perf_counter() - start - self.interval)
+
+    def __enter__(self):
+        self._task = asyncio.ensure_future(self._beat())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+def market_metrics(tick: int):
+    return {
+        'aave_apy': 4.0 + random.uniform(-0.05, 0.05) + (0.5 if tick >= 10 else 0),
+        'sonic_apy': 3.0 + random.uniform(-0.05, 0.05),
+        'health_factor': 2.0 + random.uniform(-0.01, 0.01),
+        'utilization': 0.8 + random.uniform(-0.005, 0.005),
+        'current_allocation': 50_000,
+    }
+
+
+async def blocking_ticks(stub: StubLLMServer, ticks: int):
+    """The previous path: a synchronous client call inside the coroutine"""
+    from openai import OpenAI
+    client = OpenAI(api_key="stub", base_url=stub.base_url, max_retries=0)
+    durations = []
+    with Heartbeat() as heartbeat:
+        for tick in range(ticks):
+            start = time.perf_counter()
+            client.chat.completions.create(
+                model="gpt-4",
+                messages=[{"role": "user", "content": str(market_metrics(tick))}]
+            )
+            durations.append(time.perf_counter() - start)
+            await asyncio.sleep(0)
+    return durations, heartbeat.max_stall, ticks, 0
+
+
+async def advisor_ticks(stub: StubLLMServer, ticks: int, budget: float):
+    advisor = StrategyAdvisor(api_key="stub", base_url=stub.base_url, budget=budget)
+    durations = []
+    fallbacks = 0
+    try:
+        with Heartbeat() as heartbeat:
+            for tick in range(ticks):
+                metrics = market_metrics(tick)
+                start = time.perf_counter()
+                # Two callers in the same tick (e.g. a rebalance and an optimizer) share one request
+                results = await asyncio.gather(*(
+                    advisor.recommend(advisor.cache_key(metrics, 'neutral', 'low'), str(metrics))
+                    for _ in range(2)
+                ))
+                durations.append(time.perf_counter() - start)
+                fallbacks += sum(1 for advice in results if advice is None)
+                await asyncio.sleep(0.05)
+        return durations, heartbeat.max_stall, stub.request_count, fallbacks
+    finally:
+        print(f"advisor stats (budget {budget}s): {advisor.stats()}")
+        await advisor.close()
+
+
+async def benchmark(ticks: int, latency: float, budget: float):
+    random.seed(7)
+    print(f"{ticks} ticks, {latency * 1000:.0f} ms LLM latency")
+    print(f"{'setup':<26}{'p50 ms':>9}{'max ms':>9}{'max stall ms':>14}{'LLM calls':>11}{'fallbacks':>11}")
+    setups = [
+        ('blocking sync call', lambda stub: blocking_ticks(stub, ticks)),
+        ('advisor', lambda stub: advisor_ticks(stub, ticks, budget)),
+        ('advisor, tight budget', lambda stub: advisor_ticks(stub, ticks, latency / 4)),
+    ]
+    rows = []
+    for name, run in setups:
+        with StubLLMServer(latency=latency) as stub:
+            durations, stall, calls, fallbacks = await run(stub)
+        durations.sort()
+        rows.append(
+            f"{name:<26}{durations[len(durations) // 2] * 1000:>9.1f}{durations[-1] * 1000:>9.1f}"
+            f"{stall * 1000:>14.1f}{calls:>11}{fallbacks:>11}"
+        )
+    print("\n".join(rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.8)
+    parser.add_argument("--budget", type=float, default=5.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(benchmark(args.ticks, args.latency, args.budget))
+
+
+if __name__ == "__main__":
+    main()
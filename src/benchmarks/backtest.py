@@ -0,0 +1,150 @@
+"""Backtest of the agent's rebalance and emergency rules over a synthetic metric series: tick loop vs array engine.
+
+    python -m src.benchmarks.backtest --days 30 --sweep 6
+
+The series has one tick a minute: APYs that random-walk and cross, a few
+health factor and validator performance dips, and gas spikes. The reference
+replays it tick by tick the way the agent would see it (without the RPC);
+the engine must reach the same results. The sweep then backtests a
+--sweep^3 grid over min_apy, rebalance_threshold and
+max_allocation_percentage, in one process and in one per core.
+"""
+import argparse
+import logging
+import os
+import time
+import numpy as np
+from src.backtest.engine import Backtester, History, results_table, target_allocations
+from src.backtest.sweep import SearchSpace, sweep
+from src.config import StrategyConfig
+
+CHECKED = ('vault_return', 'rebalances', 'emergencies', 'transactions', 'gas_cost', 'strategy_1_share')
+
+
+def synthetic_history(days: int, seed: int = 11) -> History:
+    rng = np.random.default_rng(seed)
+    ticks = days * 24 * 60
+    timestamps = 1_700_000_000 + 60 * np.arange(ticks)
+    aave_apy = np.clip(0.06 + np.cumsum(rng.normal(0, 0.0008, ticks)), 0.0, 0.2)
+    sonic_apy = np.clip(0.07 + np.cumsum(rng.normal(0, 0.0008, ticks)), 0.0, 0.2)
+    health_factor = np.full(ticks, 1.6)
+    validator_performance = np.full(ticks, 0.99)
+    for start in rng.integers(0, ticks - 120, days // 10 + 1):
+        health_factor[start:start + 30] = 1.02
+    for start in rng.integers(0, ticks - 120, days // 15 + 1):
+        validator_performance[start:start + 20] = 0.9
+    gas_price = rng.lognormal(np.log(30e9), 0.5, ticks)
+    return History(timestamps, aave_apy, sonic_apy, health_factor, validator_performance, gas_price)
+
+
+def reference(history: History, params: StrategyConfig, initial_assets=100_000.0, gas_per_transaction=180_000):
+    """One tick at a time, in plain Python"""
+    apy = np.column_stack([history.aave_apy, history.sonic_apy])
+    target = target_allocations(apy, params.min_apy, params.max_allocation_percentage).tolist()
+    apy = apy.tolist()
+    times = history.timestamps.tolist()
+    held = [0.0, 0.0]
+    idle = initial_assets
+    rebalances = emergencies = transactions = 0
+    gas_cost = 0.0
+    share = [0.0, 0.0]
+    last_period = None
+    for i, now in enumerate(times):
+        if i:
+            elapsed = (now - times[i - 1]) / (365 * 24 * 3600)
+            held = [h * (1 + apy[i - 1][j] * elapsed) for j, h in enumerate(held)]
+        value = idle + sum(held)
+        current = [h / value for h in held]
+        share = [s + c for s, c in zip(share, current)]
+        sent = 0
+
+        alarms = [history.health_factor[i] < params.emergency_health_factor,
+                  history.validator_performance[i] < params.min_validator_performance]
+        pulled = [alarms[j] and held[j] * params.emergency_withdrawal_percentage >= 1 for j in range(2)]
+        if any(pulled):
+            for j in range(2):
+                if pulled[j]:
+                    idle += held[j] * params.emergency_withdrawal_percentage
+                    held[j] *= 1 - params.emergency_withdrawal_percentage
+                    sent += 1
+            emergencies += 1
+
+        period = now // params.rebalance_interval
+        scheduled, last_period = period != last_period, period
+        if scheduled and history.gas_price[i] <= params.max_gas_price:
+            weights = [h / value for h in held]
+            moved = [apy[i][j] > params.min_apy and abs(weights[j] - target[i][j]) > params.rebalance_threshold
+                     for j in range(2)]
+            if any(moved):
+                for j in range(2):
+                    if moved[j] and target[i][j] < weights[j]:
+                        idle += held[j] - target[i][j] * value
+                        held[j] = target[i][j] * value
+                wanted = [target[i][j] * value - held[j] if moved[j] and target[i][j] * value > held[j] else 0.0
+                          for j in range(2)]
+                scale = min(1.0, idle / sum(wanted)) if sum(wanted) else 0.0
+                for j in range(2):
+                    held[j] += wanted[j] * scale
+                    idle -= wanted[j] * scale
+                rebalances += 1
+                sent += 1
+        transactions += sent
+        gas_cost += sent * gas_per_transaction * history.gas_price[i] / 1e18
+
+    return {
+        'vault_return': (idle + sum(held)) / initial_assets - 1,
+        'rebalances': rebalances,
+        'emergencies': emergencies,
+        'transactions': transactions,
+        'gas_cost': gas_cost,
+        'strategy_1_share': share[0] / len(times),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--sweep", type=int, default=6, help="Values per swept parameter")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    history = synthetic_history(args.days)
+    print(f"{len(history)} ticks ({args.days} days at one a minute)")
+    params = [
+        StrategyConfig(),
+        StrategyConfig(min_apy=0.03, rebalance_threshold=0.02, max_allocation_percentage=0.6, rebalance_interval=600),
+        StrategyConfig(min_apy=0.08, rebalance_threshold=0.1, max_gas_price=35_000_000_000),
+    ]
+    backtester = Backtester(history)
+    print(f"{'parameters':<12}{'tick loop s':>12}{'engine s':>10}{'rebalances':>12}{'emergencies':>13}{'return':>10}")
+    for i, p in enumerate(params):
+        start = time.perf_counter()
+        expected = reference(history, p)
+        looped = time.perf_counter() - start
+        start = time.perf_counter()
+        result = backtester.run(p)
+        vectorized = time.perf_counter() - start
+        for name in CHECKED:
+            assert np.isclose(result[name], expected[name], rtol=1e-9, atol=1e-9), (name, result[name], expected[name])
+        print(f"{'set ' + str(i + 1):<12}{looped:>12.3f}{vectorized:>10.4f}{result['rebalances']:>12}"
+              f"{result['emergencies']:>13}{result['vault_return']:>10.4%}")
+
+    values = np.linspace(0.02, 0.1, args.sweep)
+    points = SearchSpace({
+        'min_apy': values.tolist(),
+        'rebalance_threshold': np.linspace(0.01, 0.2, args.sweep).tolist(),
+        'max_allocation_percentage': np.linspace(0.5, 1.0, args.sweep).tolist(),
+    }).grid()
+    workers = os.cpu_count() or 1
+    timings = {}
+    for count in sorted({1, workers}):
+        start = time.perf_counter()
+        results = sweep(history, points, workers=count)
+        timings[count] = time.perf_counter() - start
+    print(f"sweep of {len(points)} parameter sets: "
+          + ", ".join(f"{count} worker{'s' if count > 1 else ''} {seconds:.2f} s" for count, seconds in timings.items()))
+    print(results_table(results, limit=5))
+
+
+if __name__ == "__main__":
+    main()
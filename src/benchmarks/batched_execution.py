@@ -0,0 +1,142 @@
+"""Transactions, JSON-RPC calls and gas for one cycle: per-strategy sends vs a compiled plan.
+
+    python -m src.benchmarks.batched_execution --strategies 3
+
+The stub vault answers multicall(bytes[]) and estimates gas with a simple model:
+21000 per transaction, 16/4 gas per nonzero/zero calldata byte, a fixed
+execution cost per vault function and 2600 per multicall entry (delegatecall
+plus result copy). Absolute numbers are only as good as the model; the
+difference between setups is the per-transaction overhead a batch avoids.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import time
+from eth_abi import decode, encode
+from eth_utils import function_signature_to_4byte_selector
+from src.benchmarks.fixtures import install_aave, install_vault
+from src.benchmarks.rpc_modes import build_agent
+from src.benchmarks.stub_rpc import StubRPCServer, transaction_data
+
+EXECUTION_GAS = {
+    function_signature_to_4byte_selector("allocateToStrategy(uint8,uint256)"): 65_000,
+    function_signature_to_4byte_selector("withdrawFromStrategy(uint8,uint256)"): 55_000,
+    function_signature_to_4byte_selector("depositToPool(string,uint256)"): 80_000,
+    function_signature_to_4byte_selector("withdrawFromPool(string,uint256)"): 70_000,
+}
+MULTICALL_SELECTOR = function_signature_to_4byte_selector("multicall(bytes[])")
+MULTICALL_ENTRY_GAS = 2_600
+
+
+def execution_gas(data: bytes) -> int:
+    if data[:4] == MULTICALL_SELECTOR:
+        (entries,) = decode(['bytes[]'], data[4:])
+        return sum(MULTICALL_ENTRY_GAS + execution_gas(entry) for entry in entries)
+    return EXECUTION_GAS.get(data[:4], 0)
+
+
+def transaction_gas(data: bytes) -> int:
+    calldata = sum(16 if byte else 4 for byte in data)
+    return 21_000 + calldata + execution_gas(data)
+
+
+class GasMeter:
+    """Sums modeled gas over the transactions a stub receives"""
+
+    def __init__(self, stub: StubRPCServer):
+        self.gas = 0
+        self.transactions = 0
+        send = stub._methods['eth_sendRawTransaction']
+
+        def send_raw_transaction(params):
+            self.gas += transaction_gas(transaction_data(bytes.fromhex(params[0][2:])))
+            self.transactions += 1
+            return send(params)
+
+        stub.on_method('eth_sendRawTransaction', send_raw_transaction)
+        stub.on_method('eth_estimateGas', lambda params: hex(transaction_gas(
+            bytes.fromhex(params[0].get('data', params[0].get('input', '0x'))[2:])
+        )))
+
+
+def install_multicall(stub: StubRPCServer):
+    """Answer multicall(bytes[]) with an empty result per entry"""
+    stub.on_call(
+        "multicall(bytes[])",
+        lambda calldata: encode(['bytes[]'], [[b''] * len(decode(['bytes[]'], calldata)[0])])
+    )
+
+
+def cycle_strategies(count: int):
+    from src.agent.smart_agent import StrategyType
+    strategies = [
+        {'type': StrategyType.AAVE, 'allocate_amount': 4_000},
+        {'type': StrategyType.STRATEGY_2, 'allocate_amount': 3_000, 'deposit_amount': 3_000},
+        {'type': StrategyType.STRATEGY_1, 'allocate_amount': 2_500},
+        {'type': StrategyType.STRATEGY_2, 'allocate_amount': 1_000, 'deposit_amount': 1_000},
+    ]
+    return [strategies[i % len(strategies)] for i in range(count)]
+
+
+async def run(setup: str, count: int):
+    with StubRPCServer(chain_id=146) as sonic_stub, StubRPCServer(chain_id=42161) as arb_stub:
+        install_vault(sonic_stub, total_assets=50_000)
+        install_multicall(sonic_stub)
+        install_aave(arb_stub)
+        meter = GasMeter(sonic_stub)
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent = build_agent(sonic_stub, arb_stub)
+        agent.plan_executor.batching = 'sequential' if setup != 'plan, multicall' else 'multicall'
+        strategies = cycle_strategies(count)
+
+        sonic_stub.reset_counts()
+        start = time.perf_counter()
+        if setup == 'per strategy':
+            # The previous orchestrator loop
+            for strategy in strategies:
+                await agent.execute_strategy(strategy)
+        else:
+            await agent.execute_plan(strategies)
+        elapsed = time.perf_counter() - start
+        rpc_calls = sum(n for method, n in sonic_stub.method_counts.items() if method != 'eth_getTransactionReceipt')
+
+        agent.vault_manager.tx_pipeline.stop()
+        return elapsed, meter.transactions, rpc_calls, meter.gas
+
+
+async def benchmark(count: int):
+    print(f"{count} strategies in one cycle (modeled gas, see module docstring)")
+    print(f"{'setup':<20}{'ms':>8}{'txs':>6}{'RPC calls':>11}{'gas':>10}{'gas saved':>11}")
+    baseline = None
+    for setup in ('per strategy', 'plan, sequential', 'plan, multicall'):
+        elapsed, transactions, rpc_calls, gas = await run(setup, count)
+        baseline = baseline or gas
+        print(f"{setup:<20}{elapsed * 1000:>8.1f}{transactions:>6}{rpc_calls:>11}{gas:>10}"
+              f"{(baseline - gas) / baseline:>11.0%}")
+
+    # The executor's own report, estimated against the stub
+    with StubRPCServer(chain_id=146) as sonic_stub, StubRPCServer(chain_id=42161) as arb_stub:
+        install_vault(sonic_stub, total_assets=50_000)
+        install_multicall(sonic_stub)
+        install_aave(arb_stub)
+        GasMeter(sonic_stub)
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent = build_agent(sonic_stub, arb_stub)
+        agent.plan_executor.report_gas = True
+        await agent.execute_plan(cycle_strategies(count))
+        agent.vault_manager.tx_pipeline.stop()
+        print(f"PlanExecutor gas report (batching auto): {agent.plan_executor.last_report}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--strategies", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    asyncio.run(benchmark(args.strategies))
+
+
+if __name__ == "__main__":
+    main()
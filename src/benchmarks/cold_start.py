@@ -0,0 +1,110 @@
+"""Process start to first tick: probes in the constructors vs deferred concurrent probes.
+
+    python -m src.benchmarks.cold_start --runs 5 --latency 0.05
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+_STARTED = time.perf_counter()
+
+
+def child(mode: str, sonic_url: str, arb_url: str):
+    """Runs in a fresh interpreter so import costs are counted"""
+    import asyncio
+    import contextlib
+    import io
+    import logging
+    # web3 (with eth_account and aiohttp) is timed on its own: every path to a first tick needs it
+    from web3 import Web3
+    web3_imported = time.perf_counter()
+    from eth_account import Account
+    from src.agent.smart_agent import SmartAgent
+    from src.benchmarks.fixtures import scratch_config
+    from src.rpc.snapshot import MarketSnapshot
+    from src.vault.super_vault_manager import SuperVaultManager
+    imported = time.perf_counter()
+
+    logging.disable(logging.CRITICAL)
+    os.environ.setdefault("PRIVATE_KEY", Account.create().key.hex())
+
+    probe = mode == 'eager'
+    with contextlib.redirect_stdout(io.StringIO()):
+        sonic_web3 = Web3(Web3.HTTPProvider(sonic_url))
+        arb_web3 = Web3(Web3.HTTPProvider(arb_url))
+        vault_manager = SuperVaultManager(
+            sonic_web3,
+            "0x4BdE0740740b8dBb5f6Eb8c9ccB4Fc01171e953C",
+            snapshot=MarketSnapshot(sonic_web3, 'sonic'),
+            probe=probe
+        )
+        agent = SmartAgent(sonic_web3, arb_web3, vault_manager, probe=probe, config=scratch_config())
+        constructed = time.perf_counter()
+
+        if not probe:
+            async def run_probes():
+                await asyncio.gather(
+                    asyncio.to_thread(vault_manager.verify_contract),
+                    asyncio.to_thread(agent.probe)
+                )
+            asyncio.run(run_probes())
+    ready = time.perf_counter()
+
+    print(json.dumps({
+        'web3': web3_imported - _STARTED,
+        'imports': imported - web3_imported,
+        'construct': constructed - imported,
+        'probes': ready - constructed,
+        'total': ready - _STARTED,
+    }))
+
+
+def run_child(mode: str, sonic_url: str, arb_url: str):
+    output = subprocess.run(
+        [sys.executable, "-m", "src.benchmarks.cold_start", "--child", mode, sonic_url, arb_url],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def benchmark(runs: int, latency: float):
+    from src.benchmarks.fixtures import install_aave, install_vault
+    from src.benchmarks.stub_rpc import StubRPCServer
+
+    with StubRPCServer(chain_id=146, latency=latency) as sonic_stub, \
+            StubRPCServer(chain_id=42161, latency=latency) as arb_stub:
+        install_vault(sonic_stub)
+        install_aave(arb_stub)
+
+        # Warm the bytecode cache so every measured run is a restart, not a first install
+        run_child('deferred', sonic_stub.url, arb_stub.url)
+
+        print(f"{'mode':<10}{'web3 ms':>9}{'imports ms':>12}{'construct ms':>14}{'probes ms':>12}{'total ms':>11}")
+        results = {}
+        for mode in ('eager', 'deferred'):
+            samples = [run_child(mode, sonic_stub.url, arb_stub.url) for _ in range(runs)]
+            results[mode] = {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+            row = results[mode]
+            print(f"{mode:<10}{row['web3'] * 1000:>9.0f}{row['imports'] * 1000:>12.0f}{row['construct'] * 1000:>14.0f}"
+                  f"{row['probes'] * 1000:>12.0f}{row['total'] * 1000:>11.0f}")
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub RPC latency per request in seconds")
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "SONIC_URL", "ARB_URL"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+    else:
+        benchmark(args.runs, args.latency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Contract construction and call encoding: per-call web3 ABI handling vs the shared registry.
+
+    python -m src.benchmarks.contract_registry --iterations 2000
+"""
+import argparse
+import json
+import time
+from eth_abi import encode
+from eth_utils.abi import get_abi_output_types
+from web3 import Web3
+from web3._utils.abi import map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+from src.rpc.contracts import ContractRegistry
+
+VAULT = "0x4BdE0740740b8dBb5f6Eb8c9ccB4Fc01171e953C"
+POOL = "0x794a61358D6845594F94dc1DB02A252b5b4814aD"
+TOKEN = "0xFF970A61A04b1cA14834A43f5dE4533eBDDB5CC8"
+
+
+def web3_decode(web3, fn, return_data: bytes):
+    """The decode step ContractFunction.call() runs on every response"""
+    output_types = get_abi_output_types(fn.abi)
+    return map_abi_data(BASE_RETURN_NORMALIZERS, output_types, web3.codec.decode(output_types, return_data))
+
+
+def timed(func, iterations: int) -> float:
+    """Mean microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def benchmark(iterations: int):
+    web3 = Web3()
+    registry = ContractRegistry()
+
+    def load_and_build():
+        with open("src/abis/SuperVault.json", "r") as f:
+            abi = json.load(f)
+        return web3.eth.contract(address=VAULT, abi=abi)
+
+    vault = registry.contract(web3, 'SuperVault', VAULT, 'sonic')
+    pool = registry.contract(web3, 'AavePool', POOL, 'arbitrum')
+    calls = {
+        'getPoolBalance': lambda: vault.functions.getPoolBalance("AAVE", TOKEN),
+        'getStrategyAddress': lambda: vault.functions.getStrategyAddress(0),
+        'getUserAccountData': lambda: pool.functions.getUserAccountData(TOKEN),
+    }
+
+    rows = [(
+        'contract object',
+        timed(load_and_build, max(iterations // 10, 1)),
+        timed(lambda: registry.contract(web3, 'SuperVault', VAULT, 'sonic'), iterations)
+    )]
+    for name, build in calls.items():
+        fn = build()
+        assert registry.encode_call(fn) == Web3.to_bytes(hexstr=fn._encode_transaction_data())
+        rows.append((
+            f"encode {name}",
+            timed(lambda: fn._encode_transaction_data(), iterations),
+            timed(lambda: registry.encode_call(fn), iterations)
+        ))
+
+    fn = calls['getUserAccountData']()
+    return_data = encode(['uint256'] * 6, [1, 2, 3, 4, 5, 6])
+    rows.append((
+        'decode getUserAccountData',
+        timed(lambda: web3_decode(web3, fn, return_data), iterations),
+        timed(lambda: registry.decode_output(fn, return_data), iterations)
+    ))
+
+    print(f"{'operation':<30}{'web3 us':>12}{'registry us':>14}{'speedup':>10}")
+    for name, baseline, cached in rows:
+        print(f"{name:<30}{baseline:>12.1f}{cached:>14.1f}{baseline / cached:>9.1f}x")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    benchmark(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Reaction time of the websocket EmergencyWatcher against a local websocket stub.
+
+    python -m src.benchmarks.emergency_watcher --blocks 60 --heartbeat 20
+"""
+import argparse
+import asyncio
+import logging
+import time
+from src.agent.emergency_watcher import EmergencyWatcher
+from src.benchmarks.fixtures import aave_event, install_aave
+from src.benchmarks.stub_rpc import StubRPCServer
+from src.benchmarks.stub_ws import StubWebSocketServer
+
+USER = "0x1655D65B58aB4a2646AA61693663B1685A20b319"
+OTHER_USER = "0x00000000000000000000000000000000000000aa"
+USDC = "0xFF970A61A04b1cA14834A43f5dE4533eBDDB5CC8"
+WETH = "0x82aF49447D8a07e3bd95BD0d56f35241523fBab1"
+
+
+async def mine(ws: StubWebSocketServer, watcher: EmergencyWatcher, logs=None):
+    """Mine a block and wait until the watcher has handled its head"""
+    heads = watcher.heads
+    mined_at = time.perf_counter()
+    block_number = await asyncio.to_thread(ws.mine, logs)
+    while watcher.heads == heads:
+        await asyncio.sleep(0.001)
+    # Logs follow the head on the same socket; give them a moment to drain
+    await asyncio.sleep(0.01)
+    return block_number, mined_at
+
+
+async def scenario(blocks: int, heartbeat: int):
+    with StubRPCServer(chain_id=42161) as rpc, StubWebSocketServer(rpc) as ws:
+        install_aave(rpc, health_factor=2 * 10 ** 18)
+        reactions = []
+
+        async def on_emergency(health_factor, block_number):
+            reactions.append((block_number, time.perf_counter()))
+
+        watcher = EmergencyWatcher(ws.url, USER, 1.05, on_emergency, reserves=[USDC],
+                                   heartbeat_blocks=heartbeat, reconnect_delay=0.1)
+        task = asyncio.create_task(watcher.run())
+        while ws.subscription_count < 2:
+            await asyncio.sleep(0.01)
+
+        results = {}
+
+        # Quiet chain with unrelated activity: only the heartbeat re-reads
+        for i in range(blocks):
+            await mine(ws, watcher, [aave_event('Supply', reserve=WETH, user=OTHER_USER, onBehalfOf=OTHER_USER,
+                                                amount=10 ** 18, referralCode=0)] if i % 3 == 0 else None)
+        results['quiet'] = {'blocks': blocks, 'health_factor_reads': watcher.checks}
+
+        # The user's own borrow pushes the position under the threshold
+        install_aave(rpc, health_factor=10 ** 18)
+        block_number, mined_at = await mine(ws, watcher, [aave_event(
+            'Borrow', reserve=USDC, user=USER, onBehalfOf=USER, amount=10 ** 9,
+            interestRateMode=2, borrowRate=10 ** 25, referralCode=0
+        )])
+        triggered_block, triggered_at = reactions[-1]
+        results['event'] = {
+            'blocks_to_trigger': triggered_block - block_number,
+            'ms_to_trigger': (triggered_at - mined_at) * 1000
+        }
+
+        # Recover, then drop again without any Pool event (an oracle price move)
+        install_aave(rpc, health_factor=2 * 10 ** 18)
+        for _ in range(heartbeat):
+            await mine(ws, watcher)
+        install_aave(rpc, health_factor=10 ** 18)
+        triggers = len(reactions)
+        start_block = rpc.block_number
+        while len(reactions) == triggers and rpc.block_number - start_block <= heartbeat:
+            await mine(ws, watcher)
+        results['price_move'] = {
+            'blocks_to_trigger': reactions[-1][0] - start_block if len(reactions) > triggers else None,
+            'bound': heartbeat
+        }
+        results['stats'] = watcher.stats()
+
+        watcher.stop()
+        await task
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--blocks', type=int, default=60)
+    parser.add_argument('--heartbeat', type=int, default=20)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    results = asyncio.run(scenario(args.blocks, args.heartbeat))
+    quiet = results['quiet']
+    print(f"quiet chain:  {quiet['health_factor_reads']} health factor reads over {quiet['blocks']} blocks")
+    print(f"user borrow:  triggered {results['event']['blocks_to_trigger']} blocks after the event "
+          f"({results['event']['ms_to_trigger']:.1f} ms)")
+    print(f"price move:   triggered {results['price_move']['blocks_to_trigger']} blocks after the drop "
+          f"(heartbeat bound {results['price_move']['bound']})")
+    print(f"watcher:      {results['stats']}")
+
+
+if __name__ == "__main__":
+    main()
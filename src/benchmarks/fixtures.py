@@ -0,0 +1,88 @@
+import atexit
+import json
+import shutil
+import tempfile
+from eth_abi import encode
+from eth_utils import keccak
+from src.benchmarks.stub_rpc import StubRPCServer, returns
+
+AAVE_POOL_ADDRESS = "0x794a61358D6845594F94dc1DB02A252b5b4814aD"
+
+VAULT_ADDRESS = "0x4BdE0740740b8dBb5f6Eb8c9ccB4Fc01171e953C"
+
+STRATEGY_ADDRESS = "0xa1057829b37d1b510785881B2E87cC87fb4cccD3"
+
+
+def scratch_config():
+    """The repo's config with the knowledge store in a temporary directory, removed at exit
+
+    Benchmarks build agents with it so their market patterns never land in data/knowledge.
+    """
+    from src.config import Config, KnowledgeConfig
+
+    base = Config.from_file().settings
+    path = tempfile.mkdtemp(prefix="benchmark-knowledge-")
+    atexit.register(shutil.rmtree, path, True)
+    return Config(base.model_copy(update={
+        'knowledge': KnowledgeConfig(storage_path=path, backend=base.knowledge.backend),
+    }))
+
+
+def install_vault(stub: StubRPCServer, total_assets: int = 50_000, pool_balance: int = 10_000):
+    """Answer SuperVault view calls with fixed balances"""
+    stub.on_call("totalAssets()", returns(['uint256'], [total_assets]))
+    stub.on_call("getPoolBalance(string,address)", returns(['uint256'], [pool_balance]))
+    stub.on_call("getStrategyAddress(uint8)", returns(['address'], [STRATEGY_ADDRESS]))
+    stub.on_call("getPoolList()", returns(['string[]'], [["AAVE", "SONIC"]]))
+    stub.on_call("getPoolAddress(string)", returns(['address'], [STRATEGY_ADDRESS]))
+    stub.on_call("AGENT_ROLE()", returns(['bytes32'], [b'\x01' * 32]))
+    # Agent transactions succeed when simulated
+    for signature in ("allocateToStrategy(uint8,uint256)", "withdrawFromStrategy(uint8,uint256)",
+                      "depositToPool(string,uint256)", "withdrawFromPool(string,uint256)"):
+        stub.on_call(signature, returns([], []))
+    return stub
+
+
+def install_aave(stub: StubRPCServer, liquidity_rate: int = 8 * 10 ** 25, borrow_rate: int = 2 * 10 ** 25,
+                 health_factor: int = 2 * 10 ** 18):
+    """Answer Aave Pool view calls with fixed reserve and account data"""
+    stub.on_call(
+        "getReserveData(address)",
+        returns(['uint256'] * 5, [liquidity_rate, borrow_rate, 0, 10 ** 27, 10 ** 27])
+    )
+    stub.on_call(
+        "getUserAccountData(address)",
+        returns(['uint256'] * 6, [10 ** 20, 10 ** 19, 5 * 10 ** 19, 8_000, 7_500, health_factor])
+    )
+    return stub
+
+
+def _event(abi_path: str, name: str, address: str, args: dict):
+    with open(abi_path, "r") as f:
+        event = next(item for item in json.load(f) if item.get('type') == 'event' and item['name'] == name)
+
+    inputs = event['inputs']
+    signature = f"{name}({','.join(i['type'] for i in inputs)})"
+    topics = ['0x' + keccak(text=signature).hex()]
+    for i in inputs:
+        if not i['indexed']:
+            continue
+        # Indexed strings are logged as their hash
+        topic = keccak(text=args[i['name']]) if i['type'] == 'string' else encode([i['type']], [args[i['name']]])
+        topics.append('0x' + topic.hex())
+    data = [i for i in inputs if not i['indexed']]
+    return {
+        'address': address,
+        'topics': topics,
+        'data': '0x' + encode([i['type'] for i in data], [args[i['name']] for i in data]).hex()
+    }
+
+
+def aave_event(name: str, address: str = AAVE_POOL_ADDRESS, **args):
+    """Build a raw Aave Pool log for StubWebSocketServer.mine()"""
+    return _event("src/abis/AavePool.json", name, address, args)
+
+
+def vault_event(name: str, address: str = VAULT_ADDRESS, **args):
+    """Build a raw SuperVault log for StubRPCServer.add_log()"""
+    return _event("src/abis/SuperVault.json", name, address, args)
@@ -0,0 +1,160 @@
+"""Fee overpayment, stuck transactions and gas limits: gasPrice * 1.2 vs the fee-history gas engine.
+
+    python -m src.benchmarks.gas_engine --blocks 300
+
+The stub serves eth_feeHistory / eth_gasPrice from a synthetic base fee series:
+random congestion, plus a stretch of full blocks in which the base fee rises
+12.5% per block. A transaction is sent every few blocks with fees read --lag
+blocks earlier (the old 5 s gas price cache spans several Sonic blocks), and
+is included in the first block whose base fee it can pay. It pays its
+gasPrice (legacy) or base fee plus tip (type 2), compared against the base fee
+plus the median tip at inclusion. "stuck" counts transactions still unmined after 10 blocks.
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import time
+from eth_account import Account
+from web3 import Web3
+from src.benchmarks.fixtures import install_vault
+from src.benchmarks.stub_rpc import StubRPCServer
+from src.rpc.snapshot import MarketSnapshot
+from src.vault.gas_engine import GasEngine
+
+GWEI = 10 ** 9
+STUCK_AFTER = 10
+
+
+class FeeMarket:
+    """Synthetic per-block base fees, gas used ratios and tip percentiles"""
+
+    def __init__(self, blocks: int, seed: int = 7):
+        rng = random.Random(seed)
+        self.base_fees = [GWEI]
+        self.ratios = []
+        self.tips = []
+        spike = range(blocks // 2, blocks // 2 + 15)
+        for block in range(blocks + STUCK_AFTER + 2):
+            ratio = 1.0 if block in spike else min(max(rng.gauss(0.5, 0.15), 0.0), 1.0)
+            self.ratios.append(ratio)
+            congestion = 3 if block in spike else 1
+            self.tips.append((int(0.1 * GWEI * congestion), int(0.5 * GWEI * congestion)))
+            self.base_fees.append(int(self.base_fees[-1] * (1 + 0.125 * (ratio - 0.5) / 0.5)))
+
+    def install(self, stub: StubRPCServer):
+        stub.requested_blocks = 0
+
+        def fee_history(params):
+            count = int(params[0], 16) if isinstance(params[0], str) else params[0]
+            newest = stub.block_number
+            oldest = max(newest - count + 1, 0)
+            stub.requested_blocks += newest - oldest + 1
+            return {
+                'oldestBlock': hex(oldest),
+                'baseFeePerGas': [hex(fee) for fee in self.base_fees[oldest:newest + 2]],
+                'gasUsedRatio': self.ratios[oldest:newest + 1],
+                'reward': [[hex(tip) for tip in self.tips[block]] for block in range(oldest, newest + 1)],
+            }
+
+        stub.on_method('eth_feeHistory', fee_history)
+        # What a node suggests as gasPrice: next base fee plus a median tip
+        stub.on_method('eth_gasPrice', lambda params: hex(
+            self.base_fees[stub.block_number + 1] + self.tips[stub.block_number][0]
+        ))
+
+
+def simulate(market: FeeMarket, stub: StubRPCServer, fees_for, blocks: int, every: int, lag: int):
+    overpaid = []
+    waits = []
+    stuck = 0
+    for sent_at in range(lag + 1, blocks, every):
+        stub.block_number = sent_at - lag
+        fees = fees_for(sent_at - lag)
+        cap = fees.get('maxFeePerGas', fees.get('gasPrice'))
+        for block in range(sent_at + 1, sent_at + 1 + STUCK_AFTER):
+            base_fee = market.base_fees[block]
+            if cap >= base_fee:
+                paid = fees['gasPrice'] if 'gasPrice' in fees else min(cap, base_fee + fees['maxPriorityFeePerGas'])
+                fair = base_fee + market.tips[block][0]
+                overpaid.append(paid / fair - 1)
+                waits.append(block - sent_at)
+                break
+        else:
+            stuck += 1
+    return overpaid, waits, stuck
+
+
+def fee_benchmark(blocks: int, every: int, lag: int):
+    market = FeeMarket(blocks)
+    print(f"{blocks} blocks, a transaction every {every} blocks with fees {lag} blocks old, "
+          f"full blocks {blocks // 2}-{blocks // 2 + 14}")
+    print(f"{'pricing':<22}{'overpaid p50':>13}{'overpaid max':>13}{'wait blocks':>12}{'stuck':>7}{'fee rpc':>9}"
+          f"{'history blocks':>16}")
+    for name in ('gasPrice * 1.2', 'gas engine'):
+        with StubRPCServer(chain_id=146) as stub:
+            market.install(stub)
+            web3 = Web3(Web3.HTTPProvider(stub.url))
+            snapshot = MarketSnapshot(web3, 'sonic')
+            engine = GasEngine(web3, snapshot=snapshot, refresh_interval=0)
+            if name == 'gas engine':
+                def fees_for(block):
+                    snapshot.pin(block)
+                    return engine.fee_params()
+            else:
+                def fees_for(block):
+                    return {'gasPrice': int(web3.eth.gas_price * 1.2)}
+
+            stub.reset_counts()
+            overpaid, waits, stuck = simulate(market, stub, fees_for, blocks, every, lag)
+            fee_calls = sum(stub.method_counts.get(method, 0) for method in ('eth_feeHistory', 'eth_gasPrice'))
+            print(f"{name:<22}{statistics.median(overpaid):>13.1%}{max(overpaid):>13.1%}"
+                  f"{statistics.fmean(waits):>12.2f}{stuck:>7}{fee_calls:>9}{stub.requested_blocks:>16}")
+
+
+def gas_limit_benchmark(transactions: int):
+    os.environ.setdefault("PRIVATE_KEY", Account.create().key.hex())
+    from src.vault.super_vault_manager import SuperVaultManager
+
+    print(f"\n{transactions} allocateToStrategy transactions, receipts report gasUsed 150000")
+    print(f"{'gas limit':<22}{'estimates':>10}{'limit p50':>11}{'limit last':>12}")
+    for name in ('fixed 1000000', 'learned'):
+        with StubRPCServer(chain_id=146) as stub:
+            install_vault(stub)
+            stub.on_method('eth_estimateGas', lambda params: hex(180_000))
+            web3 = Web3(Web3.HTTPProvider(stub.url))
+            vault_manager = SuperVaultManager(web3, "0x4BdE0740740b8dBb5f6Eb8c9ccB4Fc01171e953C",
+                                              snapshot=MarketSnapshot(web3, 'sonic'))
+            vault_manager.tx_pipeline.poll_interval = 0.01
+            limits = []
+            for _ in range(transactions):
+                handle = vault_manager._build_and_send_transaction(
+                    vault_manager.vault_contract.functions.allocateToStrategy(0, 1000),
+                    wait=False,
+                    gas=1_000_000 if name.startswith('fixed') else None
+                )
+                limits.append(handle.tx['gas'])
+                stub.advance()
+                handle.result(timeout=5)
+                # Let the receipt callback record gasUsed before the next send
+                time.sleep(0.01)
+            vault_manager.tx_pipeline.stop()
+            print(f"{name:<22}{stub.method_counts.get('eth_estimateGas', 0):>10}"
+                  f"{statistics.median(limits):>11.0f}{limits[-1]:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=300)
+    parser.add_argument("--every", type=int, default=3)
+    parser.add_argument("--lag", type=int, default=3)
+    parser.add_argument("--transactions", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    fee_benchmark(args.blocks, args.every, args.lag)
+    gas_limit_benchmark(args.transactions)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Backfill of Aave ReserveDataUpdated and SuperVault logs into the columnar archive, against a stub chain.
+
+    python -m src.benchmarks.log_backfill --blocks 20000 --latency 0.005
+
+The stub chain has --blocks synthetic blocks with a ReserveDataUpdated for
+one of two reserves every other block and a SuperVault event every tenth.
+Like hosted RPC providers it rejects eth_getLogs over 5000 blocks or 1000
+results. Runs compare one request at a time with a fixed chunk size against
+concurrent adaptive chunks, then interrupt a backfill and resume it. Every
+run is checked against the synthetic logs: same rows, in block order, no
+duplicates.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+import numpy as np
+from aiohttp import ClientSession
+from web3 import AsyncWeb3
+from web3.providers import AsyncHTTPProvider
+from src.backtest.archive import ColumnArchive
+from src.backtest.backfill import LogBackfill, aave_reserve_source, vault_source
+from src.benchmarks.fixtures import AAVE_POOL_ADDRESS, VAULT_ADDRESS, aave_event, vault_event
+from src.benchmarks.stub_rpc import StubRPCServer
+
+RESERVES = ["0xFF970A61A04b1cA14834A43f5dE4533eBDDB5CC8", "0x82aF49447D8a07e3bd95BD0d56f35241523fBab1"]
+RAY = 10 ** 27
+
+
+def populate(stub: StubRPCServer, blocks: int, seed: int = 7):
+    """Synthetic logs; returns the expected liquidity rate per Aave row"""
+    rng = random.Random(seed)
+    rates = []
+    for block in range(1, blocks + 1):
+        if block % 2 == 0:
+            rate = rng.uniform(0.01, 0.12)
+            rates.append(rate)
+            stub.add_log(aave_event(
+                'ReserveDataUpdated', reserve=RESERVES[block // 2 % 2], liquidityRate=int(rate * RAY),
+                stableBorrowRate=0, variableBorrowRate=int(rate * 1.4 * RAY),
+                liquidityIndex=RAY + block * 10 ** 20, variableBorrowIndex=RAY + block * 2 * 10 ** 20
+            ), block)
+        if block % 10 == 0:
+            stub.add_log(vault_event(
+                'PoolDeposit', poolName='STRATEGY_2', asset=RESERVES[0], amount=block
+            ) if block % 20 else vault_event('FundsAllocated', strategyType=1, amount=block), block)
+    stub.block_number = blocks
+    return np.array(rates)
+
+
+def committed_block(root: str) -> int:
+    try:
+        with open(os.path.join(root, 'aave_reserve_data', 'manifest.json')) as f:
+            return json.load(f)['next_block'] or 0
+    except FileNotFoundError:
+        return 0
+
+
+async def connect(stub: StubRPCServer, session: ClientSession) -> AsyncWeb3:
+    provider = AsyncHTTPProvider(stub.url)
+    await provider.cache_async_session(session)
+    return AsyncWeb3(provider)
+
+
+def check(root: str, blocks: int, rates: np.ndarray):
+    aave = ColumnArchive(os.path.join(root, 'aave_reserve_data'))
+    vault = ColumnArchive(os.path.join(root, 'vault_events'))
+    aave_blocks = aave.column('block')
+    assert len(aave) == blocks // 2, (len(aave), blocks // 2)
+    assert len(vault) == blocks // 10, (len(vault), blocks // 10)
+    assert np.all(np.diff(aave_blocks) > 0) and np.all(np.diff(vault.column('block')) > 0)
+    assert np.allclose(aave.column('liquidity_rate'), rates)
+    assert aave.dictionary('reserve') == [RESERVES[1], RESERVES[0]]
+    assert set(vault.dictionary('target')) == {'STRATEGY_2', 'STRATEGY_1'}
+    assert aave.next_block == vault.next_block == blocks + 1
+    return aave.stats()['bytes'] + vault.stats()['bytes']
+
+
+async def backfill(stub, session, root, blocks, **options):
+    web3 = await connect(stub, session)
+    stats = []
+    for source in (aave_reserve_source(AAVE_POOL_ADDRESS), vault_source(VAULT_ADDRESS)):
+        stats.append(await LogBackfill(web3, root, **options).run(source, 1, blocks))
+    return stats
+
+
+async def benchmark(blocks: int, latency: float):
+    with StubRPCServer(chain_id=42161, latency=latency) as stub:
+        rates = populate(stub, blocks)
+        stub.max_logs = 1000
+        stub.max_log_range = 5000
+        print(f"{blocks} blocks, {len(stub.logs)} logs, {latency * 1000:.0f} ms per request, "
+              f"provider limits 5000 blocks / 1000 results")
+        print(f"{'setup':<34}{'seconds':>9}{'getLogs':>9}{'splits':>8}{'requests':>10}{'archive KB':>12}")
+
+        async with ClientSession() as session:
+            setups = [
+                ('sequential, fixed 500 blocks', dict(chunk_size=500, max_chunk_size=500, concurrency=1)),
+                ('concurrent 8, adaptive from 5000', dict(chunk_size=5000, concurrency=8)),
+            ]
+            for name, options in setups:
+                root = tempfile.mkdtemp()
+                stub.reset_counts()
+                start = time.perf_counter()
+                stats = await backfill(stub, session, root, blocks, **options)
+                elapsed = time.perf_counter() - start
+                size = check(root, blocks, rates)
+                shutil.rmtree(root)
+                print(f"{name:<34}{elapsed:>9.2f}{stub.method_counts.get('eth_getLogs', 0):>9}"
+                      f"{sum(s['splits'] for s in stats):>8}{stub.request_count:>10}{size / 1024:>12.1f}")
+
+            # Interrupt the Aave backfill part way, then resume both sources from their archives
+            root = tempfile.mkdtemp()
+            web3 = await connect(stub, session)
+            task = asyncio.create_task(
+                LogBackfill(web3, root, chunk_size=500, concurrency=4).run(aave_reserve_source(AAVE_POOL_ADDRESS), 1, blocks)
+            )
+            while committed_block(root) < blocks // 3:
+                await asyncio.sleep(0.005)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            interrupted_at = ColumnArchive(os.path.join(root, 'aave_reserve_data')).next_block
+            stats = await backfill(stub, session, root, blocks, chunk_size=500, concurrency=4)
+            check(root, blocks, rates)
+            shutil.rmtree(root)
+            print(f"interrupted at block {interrupted_at}, resumed from {stats[0]['from_block']}: "
+                  f"{stats[0]['rows']} more rows, archive complete and without duplicates")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=20000)
+    parser.add_argument("--latency", type=float, default=0.005)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    asyncio.run(benchmark(args.blocks, args.latency))
+
+
+if __name__ == "__main__":
+    main()
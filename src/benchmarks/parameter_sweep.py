@@ -0,0 +1,108 @@
+"""Random search over strategy and arbitrage thresholds with the checkpointed sweep runner.
+
+    python -m src.benchmarks.parameter_sweep --points 10000 --days 30
+
+The history is the backtest benchmark's synthetic series plus Sonic and
+Arbitrum prices whose spread occasionally opens. The sweep runs across one
+worker per core, each memory-mapping the saved history. A second sweep over
+the first points is interrupted with SIGINT part way and resumed; its
+results must match the uninterrupted sweep's, with one line per point.
+"""
+import argparse
+import dataclasses
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import time
+import numpy as np
+from src.backtest.engine import results_table
+from src.backtest.sweep import SearchSpace, SweepRunner
+from src.benchmarks.backtest import synthetic_history
+
+SPACE = {
+    'min_apy': {'low': 0.01, 'high': 0.1},
+    'rebalance_threshold': {'low': 0.005, 'high': 0.2, 'log': True},
+    'max_allocation_percentage': {'low': 0.5, 'high': 1.0},
+    'rebalance_interval': [600, 1800, 3600, 14400],
+    'arbitrage.min_profit_percentage': {'low': 0.001, 'high': 0.05, 'log': True},
+    'arbitrage.max_slippage': [0.002, 0.005, 0.01],
+    'arbitrage.vault_percentage': {'low': 0.01, 'high': 0.2},
+}
+
+
+def history_with_prices(days: int, seed: int = 5):
+    history = synthetic_history(days)
+    rng = np.random.default_rng(seed)
+    ticks = len(history)
+    sonic_price = 0.5 * np.exp(np.cumsum(rng.normal(0, 0.0005, ticks)))
+    spread = np.where(rng.random(ticks) < 0.002, rng.normal(0, 0.03, ticks), rng.normal(0, 0.001, ticks))
+    return dataclasses.replace(history, sonic_price=sonic_price, arbitrum_price=sonic_price * (1 + spread))
+
+
+def checkpointed(run_path: str) -> int:
+    try:
+        with open(os.path.join(run_path, 'results.jsonl'), 'rb') as f:
+            return f.read().count(b'\n')
+    except FileNotFoundError:
+        return 0
+
+
+def interrupted_sweep(run_path, history, points, workers):
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    try:
+        SweepRunner(run_path, workers=workers).run(history, points)
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=None, help="Default: one per core")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    history = history_with_prices(args.days)
+    points = SearchSpace(SPACE).points(args.points, seed=1)
+    workers = args.workers or os.cpu_count() or 1
+    root = tempfile.mkdtemp()
+    try:
+        run_path = os.path.join(root, 'full')
+        start = time.perf_counter()
+        results = SweepRunner(run_path, workers=workers).run(history, points)
+        elapsed = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(run_path, 'history', name))
+                   for name in os.listdir(os.path.join(run_path, 'history')))
+        print(f"{len(history)} ticks ({size / 2 ** 20:.1f} MiB history, memory-mapped by {workers} "
+              f"worker{'s' if workers > 1 else ''}), {len(points)} random points: {elapsed:.1f} s, "
+              f"{len(points) / elapsed:.0f} points/s")
+        print(results_table(results, limit=5))
+
+        # Interrupt a sweep over the first points with Ctrl-C, then resume it
+        subset = points[:max(len(points) // 5, 10)]
+        run_path = os.path.join(root, 'interrupted')
+        child = multiprocessing.Process(target=interrupted_sweep, args=(run_path, history, subset, workers))
+        child.start()
+        while checkpointed(run_path) < len(subset) // 3 and child.is_alive():
+            time.sleep(0.01)
+        os.kill(child.pid, signal.SIGINT)
+        child.join()
+        done = checkpointed(run_path)
+        resumed = SweepRunner(run_path, workers=workers).run(history, subset)
+        with open(os.path.join(run_path, 'results.jsonl'), 'r') as f:
+            indexes = [json.loads(line)['index'] for line in f]
+        assert sorted(indexes) == list(range(len(subset))), "missing or duplicated points"
+        assert resumed == results[:len(subset)], "resumed results differ"
+        print(f"interrupted after {done} of {len(subset)} points, resumed {len(subset) - done}: "
+              f"results match the uninterrupted sweep, one line per point")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
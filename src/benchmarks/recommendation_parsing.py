@@ -0,0 +1,131 @@
+"""Prompt size and parse success: free-text regex parsing vs structured JSON recommendations.
+
+    python -m src.benchmarks.recommendation_parsing
+
+Runs the fixture responses in llm_responses.json through the parsers. Entry i
+of each list is the same recommendation, written once as free text and once as
+a structured answer. A parse counts as correct when it yields the intended
+strategy type and amount (or no strategy for a HOLD). It is then checked
+against the vault limits with SmartAgent._validate_strategy.
+"""
+import argparse
+import json
+import logging
+import os
+import re
+from src.agent.advisor import (RECOMMENDATION_SCHEMA, STRUCTURED_SYSTEM_PROMPT, SYSTEM_PROMPT,
+                               compact_prompt, parse_recommendation)
+from src.benchmarks.fixtures import install_aave, install_vault
+from src.benchmarks.rpc_modes import build_agent
+from src.benchmarks.stub_rpc import StubRPCServer
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "llm_responses.json")
+
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except ImportError:
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    if _encoding is None:
+        # ~4 characters per token for English and JSON
+        return (len(text) + 3) // 4
+    return len(_encoding.encode(text))
+
+
+def legacy_parse(text: str):
+    """The parser the structured mode replaced: "AAVE" matched first, amount only right after "amount" """
+    from src.agent.smart_agent import StrategyType
+    strategy_type = None
+    for name in ('AAVE', 'STRATEGY_1', 'STRATEGY_2'):
+        if name in text:
+            strategy_type = StrategyType[name]
+            break
+    amount_match = re.search(r'amount[:\s]+(\d+)', text.lower())
+    amount = int(amount_match.group(1)) if amount_match else None
+    return (strategy_type, amount) if strategy_type and amount else None
+
+
+def as_outcome(strategy):
+    return (strategy['type'], strategy['allocate_amount']) if strategy else None
+
+
+def benchmark():
+    from src.agent.smart_agent import StrategyType
+
+    with open(FIXTURES_PATH, "r") as f:
+        fixtures = json.load(f)
+
+    with StubRPCServer(chain_id=146) as sonic_stub, StubRPCServer(chain_id=42161) as arb_stub:
+        install_vault(sonic_stub, total_assets=50_000)
+        install_aave(arb_stub)
+        agent = build_agent(sonic_stub, arb_stub)
+
+        expected = []
+        for text in fixtures['structured']:
+            answer = parse_recommendation(text)
+            expected.append(None if answer.strategy == 'HOLD' else (StrategyType[answer.strategy], answer.allocate_amount))
+
+        context = {
+            'market_metrics': {'aave_apy': 4.1, 'sonic_apy': 3.0, 'health_factor': 2.0, 'utilization': 0.8},
+            'current_allocation': 50_000,
+            'market_trend': {'market_direction': 'bullish'},
+            'risk_assessment': {'overall_risk_level': 'low'},
+        }
+        free_prompt = SYSTEM_PROMPT + agent._free_text_prompt(context)
+        structured_prompt = STRUCTURED_SYSTEM_PROMPT + compact_prompt({
+            **context['market_metrics'], 'total_assets': 50_000, 'max_allocation': 40_000,
+            'trend': 'bullish', 'risk': 'low'
+        }) + json.dumps(RECOMMENDATION_SCHEMA['schema'], separators=(',', ':'))
+
+        def structured_parse(text):
+            answer = parse_recommendation(text)
+            return None if answer.strategy == 'HOLD' else agent._parse_ai_recommendation(answer)
+
+        modes = {
+            'free text, old regex': (free_prompt, fixtures['free_text'], legacy_parse),
+            'free text, new regex': (free_prompt, fixtures['free_text'],
+                                     lambda text: as_outcome(agent._parse_ai_recommendation(text))),
+            'structured JSON': (structured_prompt, fixtures['structured'], lambda text: as_outcome(structured_parse(text))),
+        }
+
+        print(f"{len(expected)} fixture responses per mode; token counts "
+              f"{'from tiktoken' if _encoding else 'estimated at 4 chars/token'}")
+        print(f"{'mode':<22}{'prompt tok':>11}{'reply tok':>11}{'parsed ok':>11}{'in limits':>11}"
+              f"{'trips/decision':>16}{'tok/decision':>14}")
+        for name, (prompt, responses, parse) in modes.items():
+            correct = 0
+            within_limits = 0
+            for response, intended in zip(responses, expected):
+                try:
+                    outcome = parse(response)
+                except Exception:
+                    outcome = 'error'
+                if outcome != intended:
+                    continue
+                correct += 1
+                if outcome is None or agent._validate_strategy({'action': 'increase_allocation', 'amount': outcome[1]}):
+                    within_limits += 1
+            reply_tokens = sum(count_tokens(r) for r in responses) / len(responses)
+            # A reply that does not parse costs another full round trip
+            trips = len(responses) / correct if correct else float('inf')
+            prompt_tokens = count_tokens(prompt)
+            print(
+                f"{name:<22}{prompt_tokens:>11}{reply_tokens:>11.0f}"
+                f"{correct / len(responses):>11.0%}{within_limits / len(responses):>11.0%}{trips:>16.2f}"
+                f"{(prompt_tokens + reply_tokens) * trips:>14.0f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+    logging.disable(logging.WARNING)
+    benchmark()
+
+
+if __name__ == "__main__":
+    main()
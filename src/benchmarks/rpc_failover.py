@@ -0,0 +1,88 @@
+"""Request latency and errors for one endpoint vs a failover pool with and without hedging.
+
+    python -m src.benchmarks.rpc_failover --requests 300
+
+Three stub endpoints: a usually fast node with a 3% slow tail, a steady but
+slower node, and a third node that starts returning 429s partway through the
+run (a rate-limited public RPC at a busy moment).
+"""
+import argparse
+import logging
+import random
+import statistics
+import time
+from web3 import Web3
+from src.benchmarks.stub_rpc import StubRPCServer
+from src.rpc.failover_provider import FailoverHTTPProvider
+
+
+def tail_latency(fast: float, slow: float, slow_fraction: float):
+    return lambda: slow if random.random() < slow_fraction else fast
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run(web3: Web3, stubs, requests: int):
+    """Issue eth_blockNumber calls; the rate-limited node fails for the second half"""
+    latencies = []
+    errors = 0
+    for i in range(requests):
+        stubs[2].http_status = 429 if i >= requests // 2 else 200
+        start = time.perf_counter()
+        try:
+            web3.eth.block_number
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            errors += 1
+    return latencies, errors
+
+
+def benchmark(requests: int, seed: int):
+    logging.disable(logging.WARNING)
+    random.seed(seed)
+    with StubRPCServer(latency=tail_latency(0.01, 0.3, 0.03)) as jittery, \
+            StubRPCServer(latency=0.04) as steady, \
+            StubRPCServer(latency=0.015) as limited:
+        stubs = [jittery, steady, limited]
+        urls = [stub.url for stub in stubs]
+        setups = {
+            # web3's own retry backoff would add seconds per failed call; count the failures instead
+            'single (rate limited)': Web3(Web3.HTTPProvider(limited.url, exception_retry_configuration=None)),
+            'pool, no hedging': Web3(FailoverHTTPProvider(urls, hedge=False, cooldown=5)),
+            'pool, hedged': Web3(FailoverHTTPProvider(urls, hedge=True, cooldown=5)),
+        }
+
+        print(f"{'setup':<24}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}")
+        results = {}
+        for name, web3 in setups.items():
+            for stub in stubs:
+                stub.http_status = 200
+            latencies, errors = run(web3, stubs, requests)
+            results[name] = (latencies, errors)
+            print(
+                f"{name:<24}{statistics.median(latencies) * 1000:>9.1f}{percentile(latencies, 0.95) * 1000:>9.1f}"
+                f"{percentile(latencies, 0.99) * 1000:>9.1f}{max(latencies) * 1000:>9.1f}{errors:>8}"
+            )
+
+        for name in ('pool, no hedging', 'pool, hedged'):
+            stats = setups[name].provider.stats()
+            print(f"{name}: {stats['hedged']} hedged ({stats['hedge_wins']} won), {stats['failovers']} failovers")
+            for url, info in stats['endpoints'].items():
+                print(f"    {url}: {info['requests']} requests, {info['failures']} failures, "
+                      f"{info['trips']} trips, {info['state']}")
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    benchmark(args.requests, args.seed)
+
+
+if __name__ == "__main__":
+    main()
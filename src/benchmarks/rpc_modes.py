@@ -0,0 +1,96 @@
+"""Per-tick wall time of sync vs async RPC mode against local stub RPC servers.
+
+    python -m src.benchmarks.rpc_modes --ticks 20 --latency 0.05
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+from eth_account import Account
+from web3 import Web3
+from src.benchmarks.fixtures import install_aave, install_vault, scratch_config
+from src.benchmarks.stub_rpc import StubRPCServer
+from src.rpc.async_provider import AsyncRPCPool
+from src.rpc.snapshot import MarketSnapshot
+
+
+def build_agent(sonic_stub: StubRPCServer, arb_stub: StubRPCServer):
+    # The agent needs a signer and an OpenAI key to construct; neither is used here
+    os.environ.setdefault("PRIVATE_KEY", Account.create().key.hex())
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+    from src.agent.smart_agent import SmartAgent
+    from src.vault.super_vault_manager import SuperVaultManager
+
+    sonic_web3 = Web3(Web3.HTTPProvider(sonic_stub.url))
+    arb_web3 = Web3(Web3.HTTPProvider(arb_stub.url))
+    vault_manager = SuperVaultManager(
+        sonic_web3,
+        "0x4BdE0740740b8dBb5f6Eb8c9ccB4Fc01171e953C",
+        snapshot=MarketSnapshot(sonic_web3, 'sonic')
+    )
+    return SmartAgent(sonic_web3, arb_web3, vault_manager, config=scratch_config())
+
+
+async def run_ticks(agent, stubs, ticks: int):
+    durations = []
+    requests = []
+    for _ in range(ticks):
+        for stub in stubs:
+            stub.advance()
+            stub.reset_counts()
+
+        start = time.perf_counter()
+        await agent.prepare_cycle()
+        await agent.analyze_market_conditions()
+        await agent.check_rebalance_needed()
+        durations.append(time.perf_counter() - start)
+        requests.append(sum(stub.request_count for stub in stubs))
+    return durations, requests
+
+
+async def benchmark(ticks: int, latency: float):
+    with StubRPCServer(chain_id=146, latency=latency) as sonic_stub, \
+            StubRPCServer(chain_id=42161, latency=latency) as arb_stub:
+        install_vault(sonic_stub)
+        install_aave(arb_stub)
+        stubs = [sonic_stub, arb_stub]
+        agent = build_agent(sonic_stub, arb_stub)
+
+        results = {}
+        results['sync'] = await run_ticks(agent, stubs, ticks)
+
+        agent.async_rpc = AsyncRPCPool({'sonic': sonic_stub.url, 'arbitrum': arb_stub.url})
+        try:
+            results['async'] = await run_ticks(agent, stubs, ticks)
+        finally:
+            await agent.async_rpc.close()
+            agent.async_rpc = None
+
+    print(f"{ticks} ticks, {latency * 1000:.0f} ms injected latency per request")
+    print(f"{'mode':<8}{'p50 ms':>10}{'mean ms':>10}{'max ms':>10}{'req/tick':>10}")
+    for mode, (durations, requests) in results.items():
+        print(
+            f"{mode:<8}"
+            f"{statistics.median(durations) * 1000:>10.1f}"
+            f"{statistics.mean(durations) * 1000:>10.1f}"
+            f"{max(durations) * 1000:>10.1f}"
+            f"{statistics.mean(requests):>10.1f}"
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every stub request")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(benchmark(args.ticks, args.latency))
+
+
+if __name__ == "__main__":
+    main()
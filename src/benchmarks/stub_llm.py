@@ -0,0 +1,92 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from typing import Callable, Union
+from src.benchmarks.stub_rpc import _StubHTTPServer
+
+# A structured-mode answer (see StrategyRecommendation)
+DEFAULT_REPLY = (
+    '{"strategy":"STRATEGY_1","allocate_amount":1000,"risk":"low",'
+    '"reasoning":"Aave supply APY is above the Sonic farm APY with a healthy position."}'
+)
+
+
+class StubLLMServer:
+    """In-process OpenAI-compatible /v1/chat/completions server with injectable latency"""
+
+    def __init__(self, reply: str = DEFAULT_REPLY, latency: Union[float, Callable[[], float]] = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.reply = reply
+        self.latency = latency
+        self.request_count = 0
+        self.prompts = []
+        self._lock = threading.Lock()
+        self._server = _StubHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _completion(self, request: dict) -> dict:
+        return {
+            'id': f"chatcmpl-stub-{self.request_count}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': self.reply},
+                'finish_reason': 'stop',
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+        }
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if not self.path.endswith('/chat/completions'):
+                    self.send_error(404)
+                    return
+                request = json.loads(body)
+                with stub._lock:
+                    stub.request_count += 1
+                    stub.prompts.append(request['messages'][-1]['content'])
+                latency = stub.latency() if callable(stub.latency) else stub.latency
+                if latency:
+                    time.sleep(latency)
+
+                encoded = json.dumps(stub._completion(request)).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
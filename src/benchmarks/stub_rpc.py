@@ -0,0 +1,357 @@
+import json
+import logging
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Union
+import rlp
+from eth_abi import decode, encode
+from eth_utils import function_signature_to_4byte_selector, keccak
+
+AGGREGATE3_SELECTOR = function_signature_to_4byte_selector("aggregate3((address,bool,bytes)[])")
+
+
+def returns(types: List[str], values: List) -> Callable[[bytes], bytes]:
+    """Build an eth_call handler that always returns the same ABI-encoded values"""
+    encoded = encode(types, values)
+    return lambda calldata: encoded
+
+
+class Revert(Exception):
+    """Raised by a call handler to revert with ABI-encoded revert data"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"execution reverted: {reason}")
+        self.data = function_signature_to_4byte_selector("Error(string)") + encode(['string'], [reason])
+
+
+def transaction_data(raw: bytes) -> bytes:
+    """Calldata of a signed raw transaction"""
+    if raw[0] == 2:
+        # Type 2: [chainId, nonce, tip, maxFee, gas, to, value, data, accessList, v, r, s]
+        return rlp.decode(raw[1:])[7]
+    # Legacy: [nonce, gasPrice, gas, to, value, data, v, r, s]
+    return rlp.decode(raw)[5]
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hang up on hedged requests that lost the race
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubRPCServer:
+    """In-process JSON-RPC server that answers eth_call by function selector"""
+
+    def __init__(self, chain_id: int = 146, latency: Union[float, Callable[[], float]] = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.chain_id = chain_id
+        # Seconds per request, or a function returning them (e.g. to model tail latency)
+        self.latency = latency
+        # Set to e.g. 429 or 503 to make every request fail at the HTTP level
+        self.http_status = 200
+        self.logger = logging.getLogger('StubRPCServer')
+
+        self.block_number = 1
+        self.gas_price = 1_000_000_000
+        # eth_feeHistory: constant base fee and tip unless the method is overridden
+        self.base_fee = 900_000_000
+        self.priority_fee = 100_000_000
+        self.balance = 10 ** 18
+        self.code = "0x6080604052"
+        self.receipt_status = 1
+        self.gas_used = 150_000
+        # Run sent transactions' calldata through the call handlers; a handler that raises makes the receipt status 0
+        self.execute_transactions = False
+        self._statuses: Dict[str, int] = {}
+
+        # tx hash -> block it is mined in; sent transactions are mined by the next advance()
+        self.transactions: Dict[str, int] = {}
+        self.nonce = 0
+
+        # Logs served by eth_getLogs, added with add_log(); blocks from _fork_block on hash differently after reorg()
+        self.logs: List[Dict] = []
+        self.reorgs = 0
+        self._fork_block = None
+        # Provider limits on eth_getLogs: results per response and blocks per query
+        self.max_logs = None
+        self.max_log_range = None
+        # eth_getBlockByNumber timestamps: genesis_timestamp + block_time * number
+        self.genesis_timestamp = 1_700_000_000
+        self.block_time = 1
+
+        self._call_handlers: Dict[bytes, Callable[[bytes], bytes]] = {}
+        self._methods: Dict[str, Callable[[List], object]] = {
+            'eth_chainId': lambda params: hex(self.chain_id),
+            'net_version': lambda params: str(self.chain_id),
+            'eth_blockNumber': lambda params: hex(self.block_number),
+            'eth_gasPrice': lambda params: hex(self.gas_price),
+            'eth_getBalance': lambda params: hex(self.balance),
+            'eth_getCode': lambda params: self.code,
+            'eth_getTransactionCount': lambda params: hex(self.nonce),
+            'eth_sendRawTransaction': self._send_raw_transaction,
+            'eth_getTransactionReceipt': self._get_transaction_receipt,
+            'eth_estimateGas': lambda params: hex(21000),
+            'eth_feeHistory': self._fee_history,
+            'eth_maxPriorityFeePerGas': lambda params: hex(self.priority_fee),
+            'eth_getLogs': self._get_logs,
+            'eth_getBlockByNumber': self._get_block,
+            'eth_call': self._eth_call,
+            'debug_traceCall': self._trace_call,
+        }
+
+        self.request_count = 0
+        self.method_counts: Dict[str, int] = {}
+        self._counter_lock = threading.Lock()
+
+        self._server = _StubHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def on_call(self, signature: str, handler: Callable[[bytes], bytes]):
+        """Answer eth_call for a function signature such as 'totalAssets()'"""
+        self._call_handlers[function_signature_to_4byte_selector(signature)] = handler
+
+    def on_method(self, method: str, handler: Callable[[List], object]):
+        """Answer a raw JSON-RPC method"""
+        self._methods[method] = handler
+
+    def advance(self, blocks: int = 1):
+        """Mine empty blocks"""
+        self.block_number += blocks
+
+    def block_hash(self, block_number: int) -> str:
+        fork = self.reorgs if self._fork_block is not None and block_number >= self._fork_block else 0
+        return '0x' + keccak(text=f"{block_number}:{fork}" if fork else str(block_number)).hex()
+
+    def add_log(self, log: Dict, block_number: int = None):
+        """Record a log (address, topics, data) in a block, by default the current one"""
+        self.logs.append(dict(log, blockNumber=self.block_number if block_number is None else block_number))
+
+    def reorg(self, depth: int):
+        """Replace the last depth blocks: their logs are dropped and their hashes change"""
+        self._fork_block = self.block_number - depth + 1
+        self.reorgs += 1
+        self.logs = [log for log in self.logs if log['blockNumber'] < self._fork_block]
+
+    def reset_counts(self):
+        with self._counter_lock:
+            self.request_count = 0
+            self.method_counts = {}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _send_raw_transaction(self, params: List):
+        tx_hash = '0x' + keccak(hexstr=params[0]).hex()
+        self.transactions[tx_hash] = self.block_number + 1
+        if self.execute_transactions:
+            try:
+                self._dispatch_call(transaction_data(bytes.fromhex(params[0][2:])))
+                self._statuses[tx_hash] = 1
+            except Exception:
+                self._statuses[tx_hash] = 0
+        self.nonce += 1
+        return tx_hash
+
+    def _fee_history(self, params: List):
+        count = min(int(params[0], 16) if isinstance(params[0], str) else params[0], self.block_number)
+        percentiles = params[2] if len(params) > 2 else []
+        return {
+            'oldestBlock': hex(self.block_number - count + 1),
+            'baseFeePerGas': [hex(self.base_fee)] * (count + 1),
+            'gasUsedRatio': [0.5] * count,
+            'reward': [[hex(self.priority_fee)] * len(percentiles) for _ in range(count)],
+        }
+
+    def _get_logs(self, params: List):
+        query = params[0]
+
+        def block(tag, default):
+            if tag is None or tag == 'latest':
+                return default
+            return int(tag, 16) if isinstance(tag, str) else tag
+
+        from_block = block(query.get('fromBlock'), self.block_number)
+        to_block = block(query.get('toBlock'), self.block_number)
+        if self.max_log_range and to_block - from_block + 1 > self.max_log_range:
+            raise ValueError(f"block range too large, max {self.max_log_range} blocks")
+        address = query.get('address') or []
+        addresses = {a.lower() for a in ([address] if isinstance(address, str) else address)}
+        topic = (query.get('topics') or [None])[0]
+        topics = {t.lower() for t in ([topic] if isinstance(topic, str) else topic or [])}
+        result = []
+        for index, log in enumerate(self.logs):
+            if not from_block <= log['blockNumber'] <= to_block:
+                continue
+            if addresses and log['address'].lower() not in addresses:
+                continue
+            if topics and log['topics'][0].lower() not in topics:
+                continue
+            if self.max_logs and len(result) == self.max_logs:
+                raise ValueError(f"query returned more than {self.max_logs} results")
+            result.append({
+                'address': log['address'],
+                'topics': log['topics'],
+                'data': log['data'],
+                'blockNumber': hex(log['blockNumber']),
+                'blockHash': self.block_hash(log['blockNumber']),
+                'transactionHash': '0x' + keccak(text=f"log:{index}").hex(),
+                'transactionIndex': '0x0',
+                'logIndex': hex(index),
+                'removed': False,
+            })
+        return result
+
+    def _get_block(self, params: List):
+        tag = params[0]
+        number = self.block_number if tag in ('latest', 'pending', 'safe', 'finalized') else int(tag, 16)
+        if number > self.block_number:
+            return None
+        return {
+            'number': hex(number),
+            'hash': self.block_hash(number),
+            'parentHash': self.block_hash(number - 1),
+            'timestamp': hex(self.genesis_timestamp + self.block_time * number),
+            'miner': '0x' + '00' * 20,
+            'gasLimit': hex(30_000_000),
+            'gasUsed': '0x0',
+            'baseFeePerGas': hex(self.base_fee),
+            'transactions': [],
+        }
+
+    def _get_transaction_receipt(self, params: List):
+        tx_hash = params[0]
+        mined_in = self.transactions.get(tx_hash)
+        if mined_in is None or mined_in > self.block_number:
+            return None
+        return {
+            'transactionHash': tx_hash,
+            'transactionIndex': '0x0',
+            'blockHash': '0x' + keccak(text=str(mined_in)).hex(),
+            'blockNumber': hex(mined_in),
+            'status': hex(self._statuses.get(tx_hash, self.receipt_status)),
+            'gasUsed': hex(self.gas_used),
+            'cumulativeGasUsed': hex(self.gas_used),
+            'effectiveGasPrice': hex(self.gas_price),
+            'logs': [],
+            'logsBloom': '0x' + '00' * 256,
+            'type': '0x0',
+        }
+
+    def _eth_call(self, params: List):
+        data = bytes.fromhex(params[0].get('data', params[0].get('input', '0x'))[2:])
+        return '0x' + self._dispatch_call(data).hex()
+
+    def _trace_call(self, params: List):
+        """debug_traceCall with the callTracer: the top call frame, with the revert data as output"""
+        call = params[0]
+        frame = {
+            'type': 'CALL',
+            'from': call.get('from'),
+            'to': call.get('to'),
+            'input': call.get('data', call.get('input', '0x')),
+            'gas': hex(30_000_000),
+            'gasUsed': hex(self.gas_used),
+        }
+        try:
+            frame['output'] = self._eth_call(params)
+        except Exception as e:
+            frame['error'] = 'execution reverted'
+            frame['output'] = '0x' + getattr(e, 'data', b'').hex()
+        return frame
+
+    def _dispatch_call(self, data: bytes) -> bytes:
+        selector, calldata = data[:4], data[4:]
+        if selector == AGGREGATE3_SELECTOR:
+            (calls,) = decode(['(address,bool,bytes)[]'], calldata)
+            results = []
+            for target, allow_failure, call_data in calls:
+                try:
+                    results.append((True, self._dispatch_call(call_data)))
+                except Exception:
+                    if not allow_failure:
+                        raise
+                    results.append((False, b''))
+            return encode(['(bool,bytes)[]'], [results])
+
+        handler = self._call_handlers.get(selector)
+        if handler is None:
+            raise ValueError(f"execution reverted: no handler for selector 0x{selector.hex()}")
+        return handler(calldata)
+
+    def _handle(self, request: Dict) -> Dict:
+        method = request.get('method')
+        with self._counter_lock:
+            self.method_counts[method] = self.method_counts.get(method, 0) + 1
+        try:
+            handler = self._methods[method]
+        except KeyError:
+            return {'jsonrpc': '2.0', 'id': request.get('id'),
+                    'error': {'code': -32601, 'message': f"method {method} not found"}}
+        try:
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': handler(request.get('params', []))}
+        except Exception as e:
+            error = {'code': 3, 'message': str(e)}
+            if isinstance(e, Revert):
+                error['data'] = '0x' + e.data.hex()
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': error}
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; Nagle + delayed ACK would add ~40 ms per response
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with stub._counter_lock:
+                    stub.request_count += 1
+                latency = stub.latency() if callable(stub.latency) else stub.latency
+                if latency:
+                    time.sleep(latency)
+                if stub.http_status != 200:
+                    self.send_response(stub.http_status)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                payload = json.loads(body)
+                if isinstance(payload, list):
+                    response = [stub._handle(request) for request in payload]
+                else:
+                    response = stub._handle(payload)
+
+                encoded = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
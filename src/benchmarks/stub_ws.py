@@ -0,0 +1,146 @@
+import asyncio
+import json
+import logging
+import threading
+from typing import Dict, List
+from eth_utils import keccak
+from websockets.asyncio.server import serve
+from src.benchmarks.stub_rpc import StubRPCServer
+
+
+class StubWebSocketServer:
+    """Websocket front end for a StubRPCServer with newHeads and logs subscriptions"""
+
+    def __init__(self, rpc: StubRPCServer, host: str = "127.0.0.1", port: int = 0):
+        self.rpc = rpc
+        self.host = host
+        self.port = port
+        self.logger = logging.getLogger('StubWebSocketServer')
+
+        # subscription id -> (connection, kind, filter)
+        self._subscriptions: Dict[str, tuple] = {}
+        self._next_id = 1
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    @property
+    def subscription_count(self) -> int:
+        return len(self._subscriptions)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def mine(self, logs: List[Dict] = None):
+        """Mine one block, then push its head and any matching logs to subscribers"""
+        self.rpc.advance()
+        block_number = self.rpc.block_number
+        block_hash = '0x' + keccak(text=str(block_number)).hex()
+        head = {
+            'number': hex(block_number),
+            'hash': block_hash,
+            'parentHash': '0x' + keccak(text=str(block_number - 1)).hex(),
+            'timestamp': hex(block_number),
+            'miner': '0x' + '00' * 20,
+            'gasLimit': hex(30_000_000),
+            'gasUsed': '0x0',
+            'baseFeePerGas': hex(self.rpc.gas_price),
+        }
+        logs = [
+            {
+                'address': log['address'],
+                'topics': log['topics'],
+                'data': log.get('data', '0x'),
+                'blockNumber': hex(block_number),
+                'blockHash': block_hash,
+                'transactionHash': '0x' + keccak(text=f"{block_number}:{index}").hex(),
+                'transactionIndex': hex(index),
+                'logIndex': hex(index),
+                'removed': False,
+            }
+            for index, log in enumerate(logs or [])
+        ]
+        asyncio.run_coroutine_threadsafe(self._publish(head, logs), self._loop).result(timeout=5)
+        return block_number
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._run())
+
+    async def _run(self):
+        async with serve(self._connection, self.host, self.port) as server:
+            self._server = server
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await server.wait_closed()
+
+    async def _connection(self, websocket):
+        try:
+            async for raw in websocket:
+                request = json.loads(raw)
+                await websocket.send(json.dumps(self._handle(websocket, request)))
+        finally:
+            for sub_id, (connection, _, _) in list(self._subscriptions.items()):
+                if connection is websocket:
+                    del self._subscriptions[sub_id]
+
+    def _handle(self, websocket, request: Dict) -> Dict:
+        method, params = request.get('method'), request.get('params', [])
+        if method == 'eth_subscribe':
+            sub_id = hex(self._next_id)
+            self._next_id += 1
+            self._subscriptions[sub_id] = (websocket, params[0], params[1] if len(params) > 1 else {})
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': sub_id}
+        if method == 'eth_unsubscribe':
+            found = self._subscriptions.pop(params[0], None) is not None
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': found}
+        return self.rpc._handle(request)
+
+    async def _publish(self, head: Dict, logs: List[Dict]):
+        for sub_id, (connection, kind, filter_params) in list(self._subscriptions.items()):
+            if kind == 'newHeads':
+                payloads = [head]
+            elif kind == 'logs':
+                payloads = [log for log in logs if self._matches(log, filter_params)]
+            else:
+                continue
+            for payload in payloads:
+                await connection.send(json.dumps({
+                    'jsonrpc': '2.0',
+                    'method': 'eth_subscription',
+                    'params': {'subscription': sub_id, 'result': payload}
+                }))
+
+    @staticmethod
+    def _matches(log: Dict, filter_params: Dict) -> bool:
+        address = filter_params.get('address')
+        if address:
+            addresses = address if isinstance(address, list) else [address]
+            if log['address'].lower() not in [a.lower() for a in addresses]:
+                return False
+        for position, wanted in enumerate(filter_params.get('topics') or []):
+            if wanted is None:
+                continue
+            options = wanted if isinstance(wanted, list) else [wanted]
+            if position >= len(log['topics']) or log['topics'][position].lower() not in [o.lower() for o in options]:
+                return False
+        return True
@@ -0,0 +1,252 @@
+"""Offline benchmark suite: orchestrator ticks, knowledge writes and transaction submission.
+
+    python -m src.benchmarks.suite            # run and compare against results.json
+    python -m src.benchmarks.suite --save     # run and record the numbers in results.json
+    python -m src.benchmarks.suite --check    # exit 1 if anything regressed or logged an error
+
+Every scenario runs against in-process stub RPC servers with a fixed latency
+and seed, so JSON-RPC calls per tick are exact and compared strictly. Latency
+is machine-dependent and compared with --tolerance; re-record results.json
+with --save when the hardware or an intended behaviour change moves it.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from eth_account import Account
+from src.benchmarks.fixtures import install_aave, install_vault
+from src.benchmarks.stub_rpc import StubRPCServer
+
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), "results.json")
+
+# Polled by the receipt thread on its own clock, so not attributable to a tick
+BACKGROUND_METHODS = {'eth_getTransactionReceipt'}
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class ErrorCounter(logging.Handler):
+    """Counts ERROR records so a scenario that starts failing shows up in the results"""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.count = 0
+        self.messages: Dict[str, int] = {}
+
+    def emit(self, record: logging.LogRecord):
+        self.count += 1
+        message = f"{record.name}: {record.getMessage()}"[:160]
+        self.messages[message] = self.messages.get(message, 0) + 1
+
+
+def method_counts(stubs: List[StubRPCServer]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for stub in stubs:
+        with stub._counter_lock:
+            for method, count in stub.method_counts.items():
+                counts[method] = counts.get(method, 0) + count
+    return counts
+
+
+async def measure(op: Callable[[], Awaitable], ops: int, stubs: List[StubRPCServer],
+                  errors: ErrorCounter, before: Optional[Callable[[], None]] = None) -> Dict:
+    """Time ops sequential calls of op and count the JSON-RPC calls each one made"""
+    durations = []
+    calls_before = method_counts(stubs)
+    errors_before = errors.count
+    started = time.perf_counter()
+    for _ in range(ops):
+        if before:
+            before()
+        start = time.perf_counter()
+        await op()
+        durations.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+
+    calls_after = method_counts(stubs)
+    methods = {
+        method: round((count - calls_before.get(method, 0)) / ops, 3)
+        for method, count in sorted(calls_after.items())
+        if method not in BACKGROUND_METHODS and count != calls_before.get(method, 0)
+    }
+    return {
+        'ops': ops,
+        'throughput_per_s': round(ops / elapsed, 1),
+        'p50_ms': round(statistics.median(durations) * 1000, 2),
+        'p99_ms': round(percentile(durations, 0.99) * 1000, 2),
+        'rpc_calls_per_op': round(sum(methods.values()), 3),
+        'rpc_methods_per_op': methods,
+        'errors': errors.count - errors_before,
+    }
+
+
+def build_orchestrator(sonic_stub: StubRPCServer, arb_stub: StubRPCServer, knowledge_path: str):
+    """StrategyOrchestrator wired to the stubs through the real config and provider stack"""
+    # Construction needs a signer and an OpenAI key; the key is never used offline
+    os.environ.setdefault("PRIVATE_KEY", Account.create().key.hex())
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+    from src.config import Config, KnowledgeConfig, NetworkConfig
+    from src.main import StrategyOrchestrator
+
+    base = Config.from_file().settings
+    settings = base.model_copy(update={
+        'networks': {
+            'sonic': NetworkConfig(rpc_url=sonic_stub.url, chain_id=sonic_stub.chain_id),
+            'arbitrum': NetworkConfig(rpc_url=arb_stub.url, chain_id=arb_stub.chain_id),
+        },
+        'knowledge': KnowledgeConfig(storage_path=knowledge_path, backend=base.knowledge.backend),
+    })
+    orchestrator = StrategyOrchestrator(config=Config(settings))
+    # Resolve receipts within a tick or two instead of once a second
+    orchestrator.vault_manager.tx_pipeline.poll_interval = 0.02
+    return orchestrator
+
+
+async def benchmark(ticks: int, writes: int, latency: float, seed: int) -> Dict:
+    from src.agent.knowledge_box import KnowledgeBox
+
+    random.seed(seed)
+    errors = ErrorCounter()
+    logging.basicConfig(level=logging.ERROR, handlers=[errors], force=True)
+
+    results = {}
+    with StubRPCServer(chain_id=146, latency=latency) as sonic_stub, \
+            StubRPCServer(chain_id=42161, latency=latency) as arb_stub, \
+            tempfile.TemporaryDirectory() as directory:
+        install_vault(sonic_stub)
+        install_aave(arb_stub)
+        stubs = [sonic_stub, arb_stub]
+
+        def next_block():
+            for stub in stubs:
+                stub.advance()
+
+        orchestrator = build_orchestrator(sonic_stub, arb_stub, os.path.join(directory, "knowledge"))
+        try:
+            await orchestrator.run_probes()
+            # One untimed tick to open connections and fill the immutable read caches
+            next_block()
+            await orchestrator.monitor_balances()
+
+            results['monitor_tick'] = await measure(
+                orchestrator.monitor_balances, ticks, stubs, errors, before=next_block
+            )
+            results['rebalance_tick'] = await measure(
+                orchestrator.check_strategy_execution, ticks, stubs, errors, before=next_block
+            )
+
+            vault_manager = orchestrator.vault_manager
+
+            async def submit():
+                vault_manager.allocate_to_strategy(0, 1000, wait=False)
+
+            results['tx_submit'] = await measure(submit, ticks, stubs, errors)
+        finally:
+            orchestrator.vault_manager.tx_pipeline.stop()
+
+        for backend in ('jsonl', 'sqlite'):
+            knowledge = KnowledgeBox(os.path.join(directory, f"writes-{backend}"), backend)
+            patterns = [
+                {'aave_apy': random.uniform(0, 10), 'sonic_apy': random.uniform(0, 10),
+                 'health_factor': random.uniform(1, 3), 'utilization': random.uniform(0, 1)}
+                for _ in range(writes)
+            ]
+
+            async def write(patterns=iter(patterns), knowledge=knowledge):
+                knowledge.add_market_pattern(next(patterns))
+
+            results[f'knowledge_write_{backend}'] = await measure(write, writes, stubs, errors)
+            knowledge.store.close()
+
+    return {
+        'settings': {'ticks': ticks, 'writes': writes, 'latency': latency, 'seed': seed},
+        'environment': {'python': platform.python_version(), 'machine': platform.machine()},
+        'scenarios': results,
+        '_errors': errors.messages,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Regressions of current against baseline, one message each"""
+    regressions = []
+    for name, result in current['scenarios'].items():
+        # A logged error means the op took an error path, so its numbers measure the wrong thing
+        if result['errors']:
+            regressions.append(f"{name}: {result['errors']} errors logged")
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        if result['rpc_calls_per_op'] > previous['rpc_calls_per_op']:
+            regressions.append(
+                f"{name}: {result['rpc_calls_per_op']} RPC calls per op (was {previous['rpc_calls_per_op']})"
+            )
+        if result['p50_ms'] > previous['p50_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p50 {result['p50_ms']} ms (was {previous['p50_ms']} ms)")
+    return regressions
+
+
+def report(current: Dict, baseline: Optional[Dict]):
+    settings = current['settings']
+    print(f"{settings['ticks']} ticks / {settings['writes']} writes, "
+          f"{settings['latency'] * 1000:.0f} ms stub latency, seed {settings['seed']}")
+    print(f"{'scenario':<24}{'ops/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'rpc/op':>8}{'errors':>8}  {'p50 vs baseline':>15}")
+    for name, result in current['scenarios'].items():
+        previous = (baseline or {}).get('scenarios', {}).get(name)
+        delta = ""
+        if previous and previous['p50_ms']:
+            delta = f"{(result['p50_ms'] / previous['p50_ms'] - 1) * 100:+.0f}%"
+        print(
+            f"{name:<24}{result['throughput_per_s']:>9.1f}{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+            f"{result['rpc_calls_per_op']:>8g}{result['errors']:>8}  {delta:>15}"
+        )
+    for message, count in current['_errors'].items():
+        print(f"  {count}x {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--writes", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.002)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed p50 slowdown as a fraction")
+    parser.add_argument("--results", default=RESULTS_PATH)
+    parser.add_argument("--save", action="store_true", help="record this run in the results file")
+    parser.add_argument("--check", action="store_true", help="exit 1 on a regression")
+    args = parser.parse_args()
+
+    current = asyncio.run(benchmark(args.ticks, args.writes, args.latency, args.seed))
+
+    baseline = None
+    if os.path.exists(args.results):
+        with open(args.results, "r") as f:
+            baseline = json.load(f)
+    report(current, baseline)
+
+    regressions = compare(current, baseline or {}, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+
+    if args.save:
+        with open(args.results, "w") as f:
+            json.dump({key: value for key, value in current.items() if not key.startswith('_')}, f, indent=2)
+            f.write("\n")
+        print(f"Saved results to {args.results}")
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Per-span latency breakdown of an analysis tick, instrumentation overhead, and a one-tick profile.
+
+    python -m src.benchmarks.tick_profile --ticks 20 --latency 0.02
+
+Runs the same ticks as rpc_modes with instrumentation off and on, prints the
+span and contract call summaries, then profiles a single tick with cProfile
+and prints its top functions by cumulative time.
+"""
+import argparse
+import asyncio
+import io
+import logging
+import os
+import pstats
+import statistics
+import tempfile
+import time
+from eth_account import Account
+from web3 import Web3
+from src.benchmarks.fixtures import install_aave, install_vault, scratch_config
+from src.benchmarks.stub_rpc import StubRPCServer
+from src.instrumentation import metrics, profile
+from src.rpc.failover_provider import FailoverHTTPProvider
+from src.rpc.snapshot import MarketSnapshot
+
+
+def build_agent(sonic_stub: StubRPCServer, arb_stub: StubRPCServer):
+    # The agent needs a signer and an OpenAI key to construct; neither is used here
+    os.environ.setdefault("PRIVATE_KEY", Account.create().key.hex())
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+    from src.agent.smart_agent import SmartAgent
+    from src.vault.super_vault_manager import SuperVaultManager
+
+    sonic_web3 = Web3(FailoverHTTPProvider([sonic_stub.url]))
+    arb_web3 = Web3(FailoverHTTPProvider([arb_stub.url]))
+    vault_manager = SuperVaultManager(
+        sonic_web3,
+        "0x4BdE0740740b8dBb5f6Eb8c9ccB4Fc01171e953C",
+        snapshot=MarketSnapshot(sonic_web3, 'sonic')
+    )
+    return SmartAgent(sonic_web3, arb_web3, vault_manager, config=scratch_config())
+
+
+async def tick(agent, stubs):
+    for stub in stubs:
+        stub.advance()
+    await agent.prepare_cycle()
+    await agent.analyze_market_conditions()
+    await agent.check_rebalance_needed()
+
+
+async def run_ticks(agent, stubs, ticks: int):
+    durations = []
+    for _ in range(ticks):
+        start = time.perf_counter()
+        await tick(agent, stubs)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def print_summary(metric: str, title: str):
+    print(f"\n{title}")
+    print(f"{'labels':<60}{'count':>7}{'mean ms':>10}{'p95 ms':>9}")
+    for labels, info in sorted(metrics.summary(metric).items(), key=lambda item: -item[1]['mean']):
+        name = ', '.join(f"{key}={value}" for key, value in labels)
+        print(f"{name[:59]:<60}{info['count']:>7}{info['mean'] * 1000:>10.2f}{info['p95'] * 1000:>9.1f}")
+
+
+async def benchmark(ticks: int, latency: float):
+    with StubRPCServer(chain_id=146, latency=latency) as sonic_stub, \
+            StubRPCServer(chain_id=42161, latency=latency) as arb_stub:
+        install_vault(sonic_stub)
+        install_aave(arb_stub)
+        stubs = [sonic_stub, arb_stub]
+        agent = build_agent(sonic_stub, arb_stub)
+
+        await tick(agent, stubs)  # Warm up connections and caches
+        results = {}
+        for enabled in (False, True):
+            metrics.enabled = enabled
+            metrics.reset()
+            results['on' if enabled else 'off'] = await run_ticks(agent, stubs, ticks)
+
+        print(f"{ticks} ticks, {latency * 1000:.0f} ms injected latency per request")
+        print(f"{'instrumentation':<18}{'p50 ms':>10}{'mean ms':>10}{'max ms':>10}")
+        for mode, durations in results.items():
+            print(
+                f"{mode:<18}{statistics.median(durations) * 1000:>10.1f}"
+                f"{statistics.mean(durations) * 1000:>10.1f}{max(durations) * 1000:>10.1f}"
+            )
+
+        print_summary('agent_span_seconds', "Spans")
+        print_summary('contract_call_seconds', "Contract calls")
+        print_summary('rpc_request_seconds', "RPC requests")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tick.prof")
+            with profile(path):
+                await tick(agent, stubs)
+            output = io.StringIO()
+            pstats.Stats(path, stream=output).sort_stats('cumulative').print_stats(15)
+            print("\nOne tick under cProfile (top 15 by cumulative time)")
+            print(output.getvalue())
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(benchmark(args.ticks, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Reverted transactions, gas and waiting per cycle: send-and-see vs simulate-first.
+
+    python -m src.benchmarks.tx_simulation --block-time 0.5
+
+The stub vault has 5000 idle and reverts allocateToStrategy above that
+("Insufficient idle funds") and depositToPool into an unknown pool; sent
+transactions run through the same rules and are mined one block later, a
+block every --block-time seconds. Each setup allocates four amounts, two of
+which cannot succeed, then submits a plan whose deposit names a missing pool
+as one multicall, which is simulated as a whole. Without a simulator the
+doomed transactions are signed, mined as reverts (burning gas) and waited
+for; with one they fail before signing with the decoded reason.
+"""
+import argparse
+import contextlib
+import io
+import logging
+import threading
+import time
+from eth_abi import decode, encode
+from src.benchmarks.fixtures import install_aave, install_vault
+from src.benchmarks.rpc_modes import build_agent
+from src.benchmarks.stub_rpc import Revert, StubRPCServer
+from src.vault.plan_executor import ExecutionPlan
+from src.vault.simulator import TransactionSimulator
+
+IDLE = 5_000
+POOLS = ("AAVE", "SONIC")
+AMOUNTS = [1_000, 7_000, 2_000, 9_000]
+
+
+def install_vault_rules(stub: StubRPCServer):
+    def allocate(calldata):
+        _, amount = decode(['uint8', 'uint256'], calldata)
+        if amount > IDLE:
+            raise Revert("Insufficient idle funds")
+        return b''
+
+    def deposit(calldata):
+        pool, _ = decode(['string', 'uint256'], calldata)
+        if pool not in POOLS:
+            raise Revert(f"Pool {pool} not found")
+        return b''
+
+    def multicall(calldata):
+        (entries,) = decode(['bytes[]'], calldata)
+        # A reverting entry reverts the whole batch with its own data
+        return encode(['bytes[]'], [[stub._dispatch_call(entry) for entry in entries]])
+
+    stub.on_call("allocateToStrategy(uint8,uint256)", allocate)
+    stub.on_call("depositToPool(string,uint256)", deposit)
+    stub.on_call("withdrawFromStrategy(uint8,uint256)", lambda calldata: b'')
+    stub.on_call("multicall(bytes[])", multicall)
+    stub.execute_transactions = True
+
+
+def produce_blocks(stub: StubRPCServer, block_time: float, stop: threading.Event):
+    while not stop.wait(block_time):
+        stub.advance()
+
+
+def run(method, block_time: float):
+    with StubRPCServer(chain_id=146) as sonic_stub, StubRPCServer(chain_id=42161) as arb_stub:
+        install_vault(sonic_stub, total_assets=50_000)
+        install_vault_rules(sonic_stub)
+        install_aave(arb_stub)
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent = build_agent(sonic_stub, arb_stub)
+        vault = agent.vault_manager
+        vault.tx_pipeline.poll_interval = 0.05
+        agent.plan_executor.batching = 'multicall'
+        if method:
+            vault.simulator = TransactionSimulator(vault.web3, method=method, abi=vault.vault_abi)
+
+        stop = threading.Event()
+        threading.Thread(target=produce_blocks, args=(sonic_stub, block_time, stop), daemon=True).start()
+        sent_before = sonic_stub.method_counts.get('eth_sendRawTransaction', 0)
+        reasons = []
+        start = time.perf_counter()
+        for amount in AMOUNTS:
+            try:
+                vault.allocate_to_strategy(0, amount)
+            except Exception as e:
+                reasons.append(str(e))
+
+        # A plan on the agent's path: one good allocation, one deposit into a pool the vault lacks;
+        # the multicall is atomic, so the good allocation is not sent either
+        plan = ExecutionPlan()
+        plan.add('allocate', 0, 1_500)
+        plan.add('deposit', 'CURVE', 1_500)
+        submitted = agent.plan_executor.submit(plan)
+        for _, handle in submitted:
+            handle.result(timeout=60)
+        reasons += [simulation.revert_reason for _, simulation in agent.plan_executor.last_rejected]
+        reasons += [handle.revert_reason for _, handle in submitted if handle.revert_reason]
+        elapsed = time.perf_counter() - start
+        stop.set()
+        vault.tx_pipeline.stop()
+
+        sent = sonic_stub.method_counts.get('eth_sendRawTransaction', 0) - sent_before
+        reverted = sum(1 for status in sonic_stub._statuses.values() if status == 0)
+        gas_burnt = reverted * sonic_stub.gas_used
+        return elapsed, sent, reverted, gas_burnt, reasons
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--block-time", type=float, default=0.5)
+    args = parser.parse_args()
+    # Rejected and reverted transactions are logged as errors; the table reports them
+    logging.disable(logging.ERROR)
+
+    print(f"{len(AMOUNTS)} allocations (2 doomed) and a doomed 2-action multicall plan, block time {args.block_time} s")
+    print(f"{'setup':<26}{'seconds':>9}{'sent':>6}{'reverted':>10}{'gas burnt':>11}")
+    for name, method in (('send and wait', None), ('simulate, eth_call', 'eth_call'),
+                         ('simulate, debug_traceCall', 'debug_traceCall')):
+        elapsed, sent, reverted, gas_burnt, reasons = run(method, args.block_time)
+        print(f"{name:<26}{elapsed:>9.2f}{sent:>6}{reverted:>10}{gas_burnt:>11}")
+        for reason in dict.fromkeys(reasons):
+            print(f"{'':<4}{reason}")
+
+
+if __name__ == "__main__":
+    main()
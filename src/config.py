@@ -0,0 +1,307 @@
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import yaml
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+CONFIG_PATH = "configs/config.yaml"
+
+ADDRESS_PATTERN = r"^0x[0-9a-fA-F]{40}$"
+
+
+class Section(BaseModel):
+    """Base for config sections: immutable, unknown keys kept as attributes"""
+    model_config = ConfigDict(frozen=True, extra='allow')
+
+
+class NetworkConfig(Section):
+    rpc_url: str
+    rpc_urls: List[str] = []  # Extra endpoints for failover and hedging
+    chain_id: Optional[int] = None
+    private_key: Optional[str] = None
+
+    def endpoints(self) -> List[str]:
+        """Primary URL first, then the extra endpoints, without duplicates"""
+        return list(dict.fromkeys([self.rpc_url, *self.rpc_urls]))
+
+
+class RpcConfig(Section):
+    mode: str = Field('sync', pattern=r"^(sync|async)$")
+    pool_size: int = Field(20, gt=0)
+    timeout: float = Field(10, gt=0)
+    hedge: bool = True
+    hedge_min_delay: float = Field(0.02, ge=0)
+    failure_threshold: int = Field(3, gt=0)
+    cooldown: float = Field(30, gt=0)
+
+
+class ReadCacheConfig(Section):
+    max_entries: int = Field(1024, gt=0)
+    ttl: Dict[str, float] = {}
+
+
+class AaveContracts(Section):
+    lending_token: str = Field(pattern=ADDRESS_PATTERN)
+    pool: str = Field(pattern=ADDRESS_PATTERN)
+
+
+class ContractsConfig(Section):
+    supervault: str = Field(pattern=ADDRESS_PATTERN)
+    aave: AaveContracts
+    sonic: Dict[str, str] = {}
+    arbitrum: Dict[str, Any] = {}
+    wrapped_sonic: Optional[str] = None
+
+
+class StrategyConfig(Section):
+    min_apy: float = Field(0.05, ge=0)
+    max_allocation_percentage: float = Field(0.8, gt=0, le=1)
+    rebalance_threshold: float = Field(0.05, gt=0, le=1)
+    emergency_health_factor: float = Field(1.05, gt=0)
+    min_validator_performance: float = Field(0.95, ge=0, le=1)
+    emergency_withdrawal_percentage: float = Field(0.5, gt=0, le=1)
+    max_gas_price: int = Field(100_000_000_000, gt=0)
+    reinvest_threshold: float = Field(0.05, ge=0)
+    min_compound_reward: float = Field(0.01, ge=0)
+    rebalance_interval: float = Field(3600, gt=0)
+    check_interval: float = Field(60, gt=0)
+    emergency_check_interval: float = Field(5, gt=0)
+    compound_interval: float = Field(3600, gt=0)
+    arbitrage: Dict[str, float] = {}
+    aave_sonic_beefy: Dict[str, float] = {}
+    sonic_beefy_farm: Dict[str, float] = {}
+
+
+class EmergencyWatcherConfig(Section):
+    enabled: bool = False
+    ws_url: Optional[str] = None
+    heartbeat_blocks: int = Field(20, gt=0)
+    cooldown_blocks: int = Field(5, ge=0)
+
+
+class SchedulerConfig(Section):
+    jitter: float = Field(0.1, ge=0, le=1)
+    report_interval: float = Field(300, gt=0)
+
+
+class StartupConfig(Section):
+    defer_probes: bool = False
+
+
+class HotReloadConfig(Section):
+    enabled: bool = True
+    interval: float = Field(5, gt=0)
+
+
+class InstrumentationConfig(Section):
+    enabled: bool = True
+    metrics_port: int = Field(0, ge=0, le=65535)  # 0 disables the /metrics endpoint
+    dump_path: Optional[str] = "data/metrics.prom"
+    dump_interval: float = Field(60, gt=0)
+    profile_job: str = "monitor"
+    profile_engine: str = Field("cprofile", pattern=r"^(cprofile|pyinstrument)$")
+    profile_dir: str = "data/profiles"
+    profile_first_tick: bool = False
+    slow_span_log: int = Field(5, ge=0)
+
+
+class AdvisorConfig(Section):
+    enabled: bool = True
+    model: str = "gpt-4o"  # Structured mode needs a model with json_schema response_format support
+    base_url: Optional[str] = None  # OpenAI-compatible endpoint; OPENAI_BASE_URL also works
+    budget: float = Field(5.0, gt=0)
+    request_timeout: float = Field(30.0, gt=0)
+    cache_ttl: float = Field(600, gt=0)
+    quantization: Dict[str, float] = {}
+    structured: bool = True
+    max_tokens: int = Field(200, gt=0)
+
+
+class GasConfig(Section):
+    eip1559: bool = True
+    fee_history_blocks: int = Field(20, gt=0)
+    priority_percentile: float = Field(50, ge=0, le=100)
+    urgent_priority_percentile: float = Field(90, ge=0, le=100)
+    inclusion_blocks: int = Field(6, gt=0)
+    refresh_interval: float = Field(2, ge=0)
+    gas_limit_margin: float = Field(1.25, ge=1)
+    legacy_multiplier: float = Field(1.2, ge=1)
+
+
+class ExecutionConfig(Section):
+    batching: str = Field("auto", pattern=r"^(auto|multicall|sequential)$")
+    report_gas: bool = False
+    simulate: bool = True
+    simulation_method: str = Field("eth_call", pattern=r"^(eth_call|debug_traceCall)$")
+    simulation_block: str = "pending"
+
+
+class BackfillConfig(Section):
+    archive_path: str = "data/archive"
+    chunk_size: int = Field(2000, gt=0)
+    min_chunk_size: int = Field(1, gt=0)
+    max_chunk_size: int = Field(10000, gt=0)
+    concurrency: int = Field(8, gt=0)
+    timestamp_batch: int = Field(100, gt=0)
+    max_retries: int = Field(5, ge=0)
+
+
+class SweepConfig(Section):
+    run_path: str = "data/sweeps"
+    workers: Optional[int] = Field(None, gt=0)
+    chunk_size: int = Field(32, gt=0)
+    samples: Optional[int] = Field(None, gt=0)
+    seed: int = 0
+    space: Dict[str, Any] = {}
+
+
+class HistoryConfig(Section):
+    capacity: int = Field(10080, gt=0)
+    window: int = Field(24, gt=1)
+    ewma_alpha: float = Field(0.1, gt=0, le=1)
+
+
+class KnowledgeConfig(Section):
+    storage_path: str = "data/knowledge"
+    backend: str = Field("jsonl", pattern=r"^(jsonl|sqlite)$")
+
+
+class AgentConfig(Section):
+    address: str = Field(pattern=ADDRESS_PATTERN)
+
+
+class Settings(Section):
+    """The validated contents of config.yaml"""
+    networks: Dict[str, NetworkConfig]
+    contracts: ContractsConfig
+    strategy: StrategyConfig = StrategyConfig()
+    agent: AgentConfig
+    rpc: RpcConfig = RpcConfig()
+    read_cache: ReadCacheConfig = ReadCacheConfig()
+    emergency_watcher: EmergencyWatcherConfig = EmergencyWatcherConfig()
+    scheduler: SchedulerConfig = SchedulerConfig()
+    startup: StartupConfig = StartupConfig()
+    hot_reload: HotReloadConfig = HotReloadConfig()
+    instrumentation: InstrumentationConfig = InstrumentationConfig()
+    advisor: AdvisorConfig = AdvisorConfig()
+    gas: GasConfig = GasConfig()
+    execution: ExecutionConfig = ExecutionConfig()
+    backfill: BackfillConfig = BackfillConfig()
+    sweep: SweepConfig = SweepConfig()
+    history: HistoryConfig = HistoryConfig()
+    knowledge: KnowledgeConfig = KnowledgeConfig()
+
+
+# Sections that can change while the process runs; the rest need a restart
+RELOADABLE_SECTIONS = ('strategy',)
+
+
+class Config:
+    """Shared, validated configuration with hot reload of the strategy section
+
+    Sections are read as attributes of the current Settings snapshot
+    (config.strategy.rebalance_threshold). A reload validates the file and
+    swaps in a new immutable snapshot with a single reference assignment, so
+    readers never take a lock and never see a half-applied update.
+    """
+
+    def __init__(self, settings: Settings, path: str = None):
+        self.path = path
+        self.logger = logging.getLogger('Config')
+        self._settings = settings
+        self._file_state = self._stat() if path else None
+        self._reload_lock = threading.Lock()
+        self.reloads = 0
+
+    @classmethod
+    def from_file(cls, path: str = CONFIG_PATH) -> 'Config':
+        return cls(cls._parse(path), path)
+
+    @staticmethod
+    def _parse(path: str) -> Settings:
+        with open(path, "r") as f:
+            return Settings.model_validate(yaml.safe_load(f) or {})
+
+    @property
+    def settings(self) -> Settings:
+        return self._settings
+
+    def __getattr__(self, name: str):
+        # Only reached for names not set on the instance, i.e. config sections
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._settings, name)
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def reload_if_changed(self) -> bool:
+        """Re-read the file if it changed on disk and apply the reloadable sections"""
+        if not self.path:
+            return False
+        state = self._stat()
+        if state is None or state == self._file_state:
+            return False
+
+        with self._reload_lock:
+            if state == self._file_state:
+                return False
+            self._file_state = state
+            try:
+                new_settings = self._parse(self.path)
+            except (OSError, yaml.YAMLError, ValidationError) as e:
+                self.logger.error(f"Config reload rejected, keeping current settings: {e}")
+                return False
+            return self.apply(new_settings)
+
+    def apply(self, new_settings: Settings) -> bool:
+        """Swap in the reloadable sections of new_settings"""
+        current = self._settings
+        updates = {}
+        for section in RELOADABLE_SECTIONS:
+            old_values = getattr(current, section).model_dump()
+            new_values = getattr(new_settings, section).model_dump()
+            changed = {key for key in old_values.keys() | new_values.keys() if old_values.get(key) != new_values.get(key)}
+            if changed:
+                updates[section] = getattr(new_settings, section)
+                for key in sorted(changed):
+                    self.logger.info(f"Config {section}.{key}: {old_values.get(key)} -> {new_values.get(key)}")
+
+        ignored = [
+            name for name in type(current).model_fields
+            if name not in RELOADABLE_SECTIONS and getattr(current, name) != getattr(new_settings, name)
+        ]
+        if ignored:
+            self.logger.warning(f"Config changes to {', '.join(ignored)} need a restart to take effect")
+
+        if not updates:
+            return False
+        self._settings = current.model_copy(update=updates)
+        self.reloads += 1
+        return True
+
+
+_configs: Dict[str, Config] = {}
+_lock = threading.Lock()
+
+
+def load_config(path: str = CONFIG_PATH) -> Config:
+    """Parse and validate a config file once per process and share the result"""
+    config = _configs.get(path)
+    if config is not None:
+        return config
+    with _lock:
+        if path not in _configs:
+            _configs[path] = Config.from_file(path)
+        return _configs[path]
+
+
+def clear_config_cache():
+    """Force the next load_config() to re-read from disk"""
+    with _lock:
+        _configs.clear()
@@ -1,26 +1,34 @@
 from web3 import Web3
-import json
 import logging
+from src.rpc.snapshot import MarketSnapshot
+from src.rpc.contracts import registry
+from src.rpc.multicall import MulticallBatch
+from src.rpc.read_cache import ReadCache, cache_static_requests
 
 class AaveDataProvider:
-    def __init__(self, web3: Web3):
-        self.web3 = web3
+    def __init__(self, web3: Web3, snapshot: MarketSnapshot = None, cache: ReadCache = None):
+        self.web3 = cache_static_requests(web3)
+        self.snapshot = snapshot
+        # Pool reads all move with the block, so they default to the snapshot's per-block policy
+        self.cache = cache or ReadCache(snapshot)
         self.logger = logging.getLogger('AaveDataProvider')
         
-        # Load Aave Pool ABI
-        with open("src/abis/AavePool.json", "r") as f:
-            self.aave_pool_abi = json.load(f)
+        # Load Aave Pool ABI (parsed once per process)
+        self.aave_pool_abi = registry.abi('AavePool')
             
         # Initialize contract addresses
         self.AAVE_POOL = "0x794a61358D6845594F94dc1DB02A252b5b4814aD"
         self.LENDING_TOKEN = "0xFF970A61A04b1cA14834A43f5dE4533eBDDB5CC8"
         
         # Initialize contracts
-        self.aave_pool = self.web3.eth.contract(
-            address=self.AAVE_POOL,
-            abi=self.aave_pool_abi
+        self.aave_pool = registry.contract(
+            self.web3, 'AavePool', self.AAVE_POOL, getattr(snapshot, 'chain', 'arbitrum')
         )
 
+    def _read(self, contract_function):
+        """Run a contract read through the read cache (per-block reads go to the snapshot)"""
+        return self.cache.call(contract_function)
+
     def get_lending_token_address(self):
         """Get the lending token address (USDC)"""
         return self.LENDING_TOKEN
@@ -32,34 +40,80 @@ class AaveDataProvider:
     def get_user_data(self, user_address: str):
         """Get user account data from Aave"""
         try:
-            user_data = self.aave_pool.functions.getUserAccountData(user_address).call()
-            return {
-                'total_collateral_eth': user_data[0],
-                'total_debt_eth': user_data[1],
-                'available_borrow_eth': user_data[2],
-                'current_liquidation_threshold': user_data[3],
-                'ltv': user_data[4],
-                'health_factor': user_data[5]
-            }
+            user_data = self._read(self.aave_pool.functions.getUserAccountData(user_address))
+            return self._format_user_data(user_data)
         except Exception as e:
             self.logger.error(f"Error getting user data: {e}")
             return None
 
+    def get_health_factor(self, user_address: str):
+        """Get the user's Aave health factor (1e18-scaled on chain)"""
+        try:
+            user_data = self.get_user_data(user_address)
+            if not user_data:
+                raise Exception("Failed to get user data")
+            return user_data['health_factor'] / 1e18
+        except Exception as e:
+            self.logger.error(f"Error getting health factor: {e}")
+            return None
+
     def get_reserve_data(self, asset_address: str):
         """Get reserve data for an asset"""
         try:
-            reserve_data = self.aave_pool.functions.getReserveData(asset_address).call()
-            return {
-                'liquidity_rate': reserve_data[0],  # Supply APY
-                'variable_borrow_rate': reserve_data[1],
-                'stable_borrow_rate': reserve_data[2],
-                'liquidity_index': reserve_data[3],
-                'variable_borrow_index': reserve_data[4]
-            }
+            reserve_data = self._read(self.aave_pool.functions.getReserveData(asset_address))
+            return self._format_reserve_data(reserve_data)
         except Exception as e:
             self.logger.error(f"Error getting reserve data: {e}")
             return None
 
+    def get_batched_data(self, user_address: str = None, asset_address: str = None):
+        """Get reserve and user data for one cycle in a single multicall"""
+        batch, indexes = self._batched_data_batch(user_address, asset_address)
+        return self._format_batched_data(batch.execute(), indexes)
+
+    async def get_batched_data_async(self, async_web3, user_address: str = None, asset_address: str = None):
+        """Same as get_batched_data, issued over an AsyncWeb3 client"""
+        batch, indexes = self._batched_data_batch(user_address, asset_address)
+        return self._format_batched_data(await batch.execute_async(async_web3), indexes)
+
+    def _batched_data_batch(self, user_address, asset_address):
+        batch = MulticallBatch(self.web3, self.cache)
+        reserve_index = batch.add(self.aave_pool.functions.getReserveData(asset_address or self.LENDING_TOKEN))
+        user_index = None
+        if user_address:
+            user_index = batch.add(self.aave_pool.functions.getUserAccountData(user_address))
+        return batch, (reserve_index, user_index)
+
+    def _format_batched_data(self, results, indexes):
+        reserve_index, user_index = indexes
+        reserve_data = results[reserve_index]
+        user_data = results[user_index] if user_index is not None else None
+        return {
+            'reserve_data': self._format_reserve_data(reserve_data) if reserve_data else None,
+            'user_data': self._format_user_data(user_data) if user_data else None
+        }
+
+    @staticmethod
+    def _format_user_data(user_data):
+        return {
+            'total_collateral_eth': user_data[0],
+            'total_debt_eth': user_data[1],
+            'available_borrow_eth': user_data[2],
+            'current_liquidation_threshold': user_data[3],
+            'ltv': user_data[4],
+            'health_factor': user_data[5]
+        }
+
+    @staticmethod
+    def _format_reserve_data(reserve_data):
+        return {
+            'liquidity_rate': reserve_data[0],  # Supply APY
+            'variable_borrow_rate': reserve_data[1],
+            'stable_borrow_rate': reserve_data[2],
+            'liquidity_index': reserve_data[3],
+            'variable_borrow_index': reserve_data[4]
+        }
+
     def get_rewards(self):
         """Get current rewards APR for lending"""
         try:
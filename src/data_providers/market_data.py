@@ -1,12 +1,13 @@
 from src.data_providers.aave_provider import AaveDataProvider
-import pandas as pd
 import logging
+from datetime import datetime
 
 class MarketDataAggregator:
-    def __init__(self, web3):
+    def __init__(self, web3, aave: AaveDataProvider = None):
         self.logger = logging.getLogger('MarketDataAggregator')
         self.web3 = web3
-        self.aave = AaveDataProvider(web3)
+        # Share the caller's provider so both read through the same snapshot
+        self.aave = aave or AaveDataProvider(web3)
         
     def get_market_data(self):
         """Aggregate all market data into a DataFrame"""
@@ -26,7 +27,7 @@ class MarketDataAggregator:
                     'tvl': self._get_sonic_tvl(),
                     'volume_24h': self._get_sonic_volume()
                 },
-                'timestamp': pd.Timestamp.now()
+                'timestamp': datetime.now()
             }
         except Exception as e:
             self.logger.error(f"Error getting market data: {e}")
@@ -59,6 +60,18 @@ class MarketDataAggregator:
             self.logger.error(f"Error getting Sonic volume: {e}")
             return 0
             
+    def get_sonic_beefy_data(self):
+        """Get Sonic Beefy farm APY and validator performance"""
+        try:
+            # TODO: Implement real farm APY and validator performance fetch
+            return {
+                'farm_apy': 0.0,
+                'validator_performance': 1.0
+            }
+        except Exception as e:
+            self.logger.error(f"Error getting Sonic Beefy data: {e}")
+            return {}
+            
     def get_aave_data(self):
         """Get Aave specific data"""
         try:
@@ -1,12 +1,11 @@
 from .base_protocol import BaseProtocolProvider, ProtocolMetrics, ProtocolData, ProtocolCategory
 from web3 import Web3
-import yaml
+from src.config import Config, load_config
 
 class SiloFinanceProvider(BaseProtocolProvider):
-    def __init__(self, web3_instance: Web3):
+    def __init__(self, web3_instance: Web3, config: Config = None):
         self.web3 = web3_instance
-        with open("configs/config.yaml", "r") as f:
-            self.config = yaml.safe_load(f)
+        self.config = config or load_config()
             
     def get_protocol_metrics(self) -> ProtocolMetrics:
         # Implement Silo-specific metrics collection
@@ -27,10 +26,9 @@ class SiloFinanceProvider(BaseProtocolProvider):
         )
 
 class BeetsProvider(BaseProtocolProvider):
-    def __init__(self, web3_instance: Web3):
+    def __init__(self, web3_instance: Web3, config: Config = None):
         self.web3 = web3_instance
-        with open("configs/config.yaml", "r") as f:
-            self.config = yaml.safe_load(f)
+        self.config = config or load_config()
     
     def get_protocol_metrics(self) -> ProtocolMetrics:
         return ProtocolMetrics(
@@ -56,10 +54,9 @@ class ShadowExchangeProvider(BaseProtocolProvider):
     pass
 
 class OriginSonicProvider(BaseProtocolProvider):
-    def __init__(self, web3_instance: Web3):
+    def __init__(self, web3_instance: Web3, config: Config = None):
         self.web3 = web3_instance
-        with open("configs/config.yaml", "r") as f:
-            self.config = yaml.safe_load(f)
+        self.config = config or load_config()
     
     def get_protocol_metrics(self) -> ProtocolMetrics:
         return ProtocolMetrics(
@@ -1,12 +1,11 @@
 from web3 import Web3
-import yaml
+from src.config import Config, load_config
 import os
 
 class SonicDataProvider:
-    def __init__(self, web3_instance):
+    def __init__(self, web3_instance, config: Config = None):
         self.web3 = web3_instance
-        with open("configs/config.yaml", "r") as f:
-            self.config = yaml.safe_load(f)
+        self.config = config or load_config()
             
         # Initialize Sonic contracts here
         
@@ -0,0 +1,316 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+# Seconds; spans run from sub-millisecond cache hits to multi-second receipts
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+@dataclass
+class SpanRecord:
+    name: str
+    path: str
+    start: float
+    duration: float
+    error: bool
+
+
+_current_path = contextvars.ContextVar('span_path', default='')
+_current_trace = contextvars.ContextVar('span_trace', default=None)
+
+
+class Instrumentation:
+    """Process-wide spans, latency histograms and counters
+
+    span() times a block and records it under agent_span_seconds; observe()
+    and inc() feed any other histogram or counter. render_prometheus() returns
+    everything in the Prometheus text format for scraping or dumping to a file.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, enabled: bool = True):
+        self.buckets = buckets
+        self.enabled = enabled
+        self.logger = logging.getLogger('Instrumentation')
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[LabelSet, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelSet, float]] = {}
+        self._help: Dict[str, str] = {}
+
+    @staticmethod
+    def _labels(labels: Dict) -> LabelSet:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def describe(self, metric: str, text: str):
+        self._help[metric] = text
+
+    def observe(self, metric: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = self._labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(metric, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def inc(self, metric: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = self._labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(metric, {})
+            series[key] = series.get(key, 0) + value
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """Time a block as a span nested under the current one"""
+        if not self.enabled:
+            yield
+            return
+        parent = _current_path.get()
+        path = f"{parent}/{name}" if parent else name
+        token = _current_path.set(path)
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            _current_path.reset(token)
+            self.observe('agent_span_seconds', duration, span=name, **labels)
+            if error:
+                self.inc('agent_span_errors_total', span=name, **labels)
+            trace = _current_trace.get()
+            if trace is not None:
+                trace.append(SpanRecord(name, path, start, duration, error))
+
+    def traced(self, name: str = None):
+        """Decorator form of span() for sync and async functions"""
+        def decorator(func):
+            span_name = name or func.__name__
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def trace(self):
+        """Collect every span completed inside the block, e.g. for one tick"""
+        spans: List[SpanRecord] = []
+        token = _current_trace.set(spans)
+        try:
+            yield spans
+        finally:
+            _current_trace.reset(token)
+
+    def summary(self, metric: str = 'agent_span_seconds') -> Dict[LabelSet, Dict[str, float]]:
+        """Count, mean and approximate p50/p95 per label set"""
+        with self._lock:
+            return {
+                labels: {
+                    'count': h.count,
+                    'mean': h.sum / h.count if h.count else 0.0,
+                    'p50': h.quantile(0.5),
+                    'p95': h.quantile(0.95),
+                }
+                for labels, h in self._histograms.get(metric, {}).items()
+            }
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for metric, series in sorted(self._histograms.items()):
+                if metric in self._help:
+                    lines.append(f"# HELP {metric} {self._help[metric]}")
+                lines.append(f"# TYPE {metric} histogram")
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{metric}_bucket{_format_labels(labels, le=repr(bound))} {cumulative}")
+                    lines.append(f"{metric}_bucket{_format_labels(labels, le='+Inf')} {histogram.count}")
+                    lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+            for metric, series in sorted(self._counters.items()):
+                if metric in self._help:
+                    lines.append(f"# HELP {metric} {self._help[metric]}")
+                lines.append(f"# TYPE {metric} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str):
+        """Write the Prometheus text to a file (atomically, for node_exporter's textfile collector)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(self.render_prometheus())
+        os.replace(temp_path, path)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: LabelSet, **extra) -> str:
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+class MetricsServer:
+    """Serves /metrics in the Prometheus text format from a background thread"""
+
+    def __init__(self, instrumentation: Instrumentation, host: str = "0.0.0.0", port: int = 9108):
+        self.instrumentation = instrumentation
+        self.logger = logging.getLogger('MetricsServer')
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name='metrics-server')
+        self._thread.start()
+        self.logger.info(f"Serving metrics on port {self.port}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        instrumentation = self.instrumentation
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = instrumentation.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+@contextmanager
+def profile(path: str, engine: str = 'cprofile'):
+    """Profile the block and write the result to path (.prof for cProfile, .html for pyinstrument)"""
+    logger = logging.getLogger('Instrumentation')
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if engine == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("pyinstrument is not installed, falling back to cProfile")
+            engine = 'cprofile'
+        else:
+            profiler = Profiler(async_mode='enabled')
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(path, "w") as f:
+                    f.write(profiler.output_html())
+                logger.info(f"Wrote pyinstrument profile to {path}")
+            return
+
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        logger.info(f"Wrote cProfile stats to {path} (view with python -m pstats or snakeviz)")
+
+
+metrics = Instrumentation()
+metrics.describe('agent_span_seconds', "Duration of agent decision phases, RPC calls and transaction stages")
+metrics.describe('agent_span_errors_total', "Spans that ended with an exception")
+metrics.describe('contract_call_seconds', "eth_call latency per contract method")
+metrics.describe('rpc_request_seconds', "JSON-RPC request latency per method and endpoint")
+metrics.describe('rpc_request_errors_total', "Failed JSON-RPC requests per method and endpoint")
+metrics.describe('scheduler_job_seconds', "Scheduled job run time")
+metrics.describe('scheduler_lag_seconds', "Delay between a job's due time and its start")
+metrics.describe('tx_inclusion_seconds', "Time from submission to receipt (or timeout) per transaction")
+metrics.describe('plan_gas_saved', "Estimated gas saved by execution plans vs one transaction per action")
+metrics.describe('tx_simulations_total', "Transactions simulated before signing, by outcome (success, revert, error)")
+metrics.describe('backfill_requests_total', "eth_getLogs requests made by log backfills")
+metrics.describe('backfill_splits_total', "Backfill block ranges split in half after a provider rejected them")
+metrics.describe('backfill_rows_total', "Logs archived by backfills")
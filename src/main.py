@@ -1,18 +1,28 @@
 # from scripts.monitor_rewards import SmartRewardsMonitor
 # from scripts.arbitrage_manager import ArbitrageManager
+import time
+# Startup timeline origin: taken before the heavy imports below
+_STARTED = time.perf_counter()
 from web3 import Web3
-import yaml
 import asyncio
 import logging
+from typing import List, Tuple
 from dotenv import load_dotenv
 import os
+import signal
+from src.config import Config, load_config
+from src.instrumentation import MetricsServer, metrics as instrumentation, profile
 from src.agent.smart_agent import SmartAgent
-from src.vault.super_vault_manager import SuperVaultManager, StrategyType
-from src.data_providers.market_data import MarketDataAggregator
-from src.data_providers.aave_provider import AaveDataProvider
+from src.vault.super_vault_manager import READ_POLICIES, SuperVaultManager, StrategyType
+from src.vault.gas_engine import GasEngine
+from src.vault.simulator import TransactionSimulator
+from src.rpc.failover_provider import FailoverHTTPProvider
+from src.rpc.snapshot import MarketSnapshot
+from src.rpc.read_cache import TTL, ReadCache
+from src.scheduler import TaskScheduler
 
 class StrategyOrchestrator:
-    def __init__(self):
+    def __init__(self, config: Config = None):
         # Setup logging
         logging.basicConfig(
             level=logging.INFO,
@@ -20,86 +30,254 @@ class StrategyOrchestrator:
         )
         self.logger = logging.getLogger('StrategyOrchestrator')
         
-        # Load configuration
+        # (phase, seconds since process start) for each startup step
+        self.startup_timeline: List[Tuple[str, float]] = []
+        self._mark('imports')
+        
+        # Load configuration (parsed once and shared with every component)
         load_dotenv()
-        with open("configs/config.yaml", "r") as f:
-            self.config = yaml.safe_load(f)
+        self.config = config or load_config()
+        # Connectivity probes run concurrently from run() instead of one by one in the constructors
+        self.defer_probes = self.config.startup.defer_probes
+        instrumentation.enabled = self.config.instrumentation.enabled
+        # Armed by SIGUSR1 (or profile_first_tick): the next run of profile_job is profiled
+        self._profile_next = self.config.instrumentation.profile_first_tick
+        self.metrics_server = None
+        self._mark('config')
             
+        # Each chain gets a pool of endpoints with failover, hedged reads and circuit breaking
+        rpc_config = self.config.rpc
+        
         # Setup Sonic connection
-        sonic_rpc_url = self.config["networks"]["sonic"]["rpc_url"]
-        self.logger.info(f"Connecting to Sonic network at {sonic_rpc_url[:30]}...")
-        self.sonic_web3 = Web3(Web3.HTTPProvider(sonic_rpc_url))
+        sonic_rpc_urls = self.config.networks['sonic'].endpoints()
+        self.logger.info(f"Connecting to Sonic network at {sonic_rpc_urls[0][:30]}... ({len(sonic_rpc_urls)} endpoints)")
+        self.sonic_web3 = Web3(self._provider(sonic_rpc_urls))
         
         # Setup Arbitrum connection
         arb_rpc_key = os.getenv("ARB_RPC_KEY", "6e80267c45670aebab0033a4eb5f354f96475310")
-        arb_rpc_url = self.config["networks"]["arbitrum"]["rpc_url"].replace("${ARB_RPC_KEY}", arb_rpc_key)
-        self.logger.info(f"Connecting to Arbitrum network at {arb_rpc_url[:30]}...")
-        self.arb_web3 = Web3(Web3.HTTPProvider(arb_rpc_url))
+        arb_rpc_urls = [url.replace("${ARB_RPC_KEY}", arb_rpc_key) for url in self.config.networks['arbitrum'].endpoints()]
+        self.logger.info(f"Connecting to Arbitrum network at {arb_rpc_urls[0][:30]}... ({len(arb_rpc_urls)} endpoints)")
+        self.arb_web3 = Web3(self._provider(arb_rpc_urls))
+        self._mark('connections')
         
         # Initialize managers with appropriate Web3 instances
+        # Rarely changing vault reads are cached by TTL; the rest are per-block
+        sonic_snapshot = MarketSnapshot(self.sonic_web3, 'sonic')
+        cache_config = self.config.read_cache
+        read_policies = {
+            **READ_POLICIES,
+            **{name: (TTL, ttl) for name, ttl in cache_config.ttl.items()}
+        }
         self.vault_manager = SuperVaultManager(
             self.sonic_web3,  # SuperVault is on Sonic
-            self.config["contracts"]["supervault"]
+            self.config.contracts.supervault,
+            snapshot=sonic_snapshot,
+            cache=ReadCache(sonic_snapshot, cache_config.max_entries, read_policies),
+            probe=not self.defer_probes,
+            # max_gas_price is read per transaction so hot reloads apply
+            gas_engine=GasEngine(
+                self.sonic_web3,
+                snapshot=sonic_snapshot,
+                max_gas_price=lambda: self.config.strategy.max_gas_price,
+                **self.config.gas.model_dump()
+            )
         )
+        execution_config = self.config.execution
+        if execution_config.simulate:
+            self.vault_manager.simulator = TransactionSimulator(
+                self.sonic_web3,
+                method=execution_config.simulation_method,
+                block=execution_config.simulation_block,
+                abi=self.vault_manager.vault_abi
+            )
+        self._mark('vault_manager')
         
         self.agent = SmartAgent(
             self.sonic_web3,  # Primary Web3 for vault
             self.arb_web3,    # Secondary Web3 for Aave
-            self.vault_manager
+            self.vault_manager,
+            probe=not self.defer_probes,
+            config=self.config
         )
+        self._mark('agent')
+        
+        # Async mode serves the cycle's reads from AsyncWeb3 instead of blocking the loop
+        self.rpc_mode = rpc_config.mode
+        self.async_rpc = None
+        if self.rpc_mode == 'async':
+            from src.rpc.async_provider import AsyncRPCPool
+            self.async_rpc = AsyncRPCPool(
+                {'sonic': sonic_rpc_urls, 'arbitrum': arb_rpc_urls},
+                pool_size=rpc_config.pool_size,
+                timeout=rpc_config.timeout,
+                hedge=rpc_config.hedge,
+                hedge_min_delay=rpc_config.hedge_min_delay,
+                failure_threshold=rpc_config.failure_threshold,
+                cooldown=rpc_config.cooldown
+            )
+            self.agent.async_rpc = self.async_rpc
+        self.logger.info(f"RPC mode: {self.rpc_mode}")
         
-        self.last_strategy_check = 0
+        # Websocket fast path for the Aave health factor; the scheduled check stays as a backstop
+        watcher_config = self.config.emergency_watcher
+        self.emergency_watcher = None
+        if watcher_config.enabled:
+            from src.agent.emergency_watcher import EmergencyWatcher
+            ws_url = os.getenv("ARB_WS_URL") or watcher_config.ws_url
+            # The position whose health factor matters is the Aave strategy's, not the agent's EOA
+            self.emergency_watcher = EmergencyWatcher(
+                ws_url,
+                self.agent.STRATEGY_1,
+                self.config.strategy.emergency_health_factor,
+                self.agent.handle_health_factor_emergency,
+                pool_address=self.agent.aave.get_aave_pool_address(),
+                reserves=[self.agent.aave.get_lending_token_address()],
+                heartbeat_blocks=watcher_config.heartbeat_blocks,
+                cooldown_blocks=watcher_config.cooldown_blocks
+            )
+        
+        self.scheduler = None
+        self._mark('orchestrator')
+
+    def _provider(self, urls):
+        """Build the failover HTTP provider for one chain's endpoints"""
+        rpc_config = self.config.rpc
+        return FailoverHTTPProvider(
+            urls,
+            pool_size=rpc_config.pool_size,
+            timeout=rpc_config.timeout,
+            hedge=rpc_config.hedge,
+            hedge_min_delay=rpc_config.hedge_min_delay,
+            failure_threshold=rpc_config.failure_threshold,
+            cooldown=rpc_config.cooldown
+        )
+
+    def _mark(self, phase: str):
+        """Record a startup phase against the process start time"""
+        self.startup_timeline.append((phase, time.perf_counter() - _STARTED))
+
+    def report_startup(self):
+        """Log how long each startup phase took"""
+        previous = 0.0
+        phases = []
+        for phase, elapsed in self.startup_timeline:
+            phases.append(f"{phase} {(elapsed - previous) * 1000:.0f} ms")
+            previous = elapsed
+        self.logger.info(f"Startup timeline: {', '.join(phases)} (total {previous * 1000:.0f} ms)")
+
+    async def run_probes(self):
+        """Run the deferred connectivity probes concurrently"""
+        probes = {
+            'vault_contract': self.vault_manager.verify_contract,
+            'agent_balance': self.agent.probe,
+        }
+        results = await asyncio.gather(
+            *(asyncio.to_thread(probe) for probe in probes.values()),
+            return_exceptions=True
+        )
+        failures = [(name, result) for name, result in zip(probes, results) if isinstance(result, Exception)]
+        for name, error in failures:
+            self.logger.error(f"Startup probe {name} failed: {error}")
+        if failures:
+            raise failures[0][1]
+
+    async def check_emergency(self):
+        """Fast path: check health and validator conditions on fresh state"""
+        self.agent.emergency_snapshot.refresh()
+        emergency_actions = await self.agent.check_emergency_conditions()
+        if emergency_actions:
+            self.logger.warning("Emergency conditions detected! Executing emergency actions...")
+            for action in emergency_actions:
+                await self.agent.execute_emergency_action(action)
 
     async def check_strategy_execution(self):
-        """Check and execute strategy if needed"""
+        """Analyze strategies and submit rebalancing transactions"""
         try:
-            current_time = asyncio.get_event_loop().time()
+            self.logger.info("Analyzing market conditions...")
+            await self.agent.prepare_cycle()
             
-            # Check if it's time for strategy evaluation
-            if current_time - self.last_strategy_check > self.config['strategy']['rebalance_interval']:
-                self.logger.info("Analyzing market conditions...")
-                
-                # First check for emergency conditions
-                emergency_actions = await self.agent.check_emergency_conditions()
-                if emergency_actions:
-                    self.logger.warning("Emergency conditions detected! Executing emergency actions...")
-                    for action in emergency_actions:
-                        await self.agent.execute_strategy(action)
-                    return
-                
-                # Regular strategy analysis
-                analysis = await self.agent.analyze_strategies()
-                if analysis:
-                    self.logger.info(f"Strategy recommendations: {analysis}")
-                    for strategy in analysis:
-                        self.logger.info(f"Executing strategy: {strategy}")
-                        success = await self.agent.execute_strategy(strategy)
-                        if success:
-                            self.logger.info("Strategy executed successfully")
-                        else:
-                            self.logger.error("Strategy execution failed")
-                
-                self.last_strategy_check = current_time
+            analysis = await self.agent.analyze_strategies()
+            if analysis:
+                self.logger.info(f"Strategy recommendations: {analysis}")
+                # All of the cycle's recommendations go out as one plan
+                success = await self.agent.execute_plan(analysis)
+                if success:
+                    self.logger.info("Strategy plan submitted")
+                else:
+                    self.logger.error("Strategy plan execution failed")
             
         except Exception as e:
             self.logger.error(f"Error in strategy execution: {e}")
 
+    async def reload_config(self):
+        """Apply edits to the strategy section of config.yaml without a restart"""
+        if self.config.reload_if_changed():
+            self.logger.info(f"Reloaded strategy config (reload #{self.config.reloads})")
+            if self.emergency_watcher:
+                self.emergency_watcher.threshold = self.config.strategy.emergency_health_factor
+
+    def request_profile(self):
+        """Profile the next run of the configured job"""
+        self._profile_next = True
+        self.logger.info(f"Profiling the next {self.config.instrumentation.profile_job} tick")
+
+    def _instrumented(self, name: str, job):
+        """Wrap a scheduled job in a traced span, profiling it when a profile was requested"""
+        instrumentation_config = self.config.instrumentation
+
+        async def run_job():
+            with instrumentation.trace() as spans:
+                if self._profile_next and name == instrumentation_config.profile_job:
+                    self._profile_next = False
+                    extension = 'html' if instrumentation_config.profile_engine == 'pyinstrument' else 'prof'
+                    path = os.path.join(
+                        instrumentation_config.profile_dir, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.{extension}"
+                    )
+                    with profile(path, instrumentation_config.profile_engine), instrumentation.span(f"tick.{name}"):
+                        await job()
+                else:
+                    with instrumentation.span(f"tick.{name}"):
+                        await job()
+            if spans and instrumentation_config.slow_span_log:
+                slowest = sorted(spans, key=lambda span: span.duration, reverse=True)
+                self.logger.debug(f"{name} tick slowest spans: " + ', '.join(
+                    f"{span.path} {span.duration * 1000:.1f} ms"
+                    for span in slowest[:instrumentation_config.slow_span_log]
+                ))
+
+        return run_job
+
+    async def dump_metrics(self):
+        """Write the Prometheus text file for node_exporter's textfile collector"""
+        try:
+            instrumentation.dump(self.config.instrumentation.dump_path)
+        except OSError as e:
+            self.logger.error(f"Error writing metrics to {self.config.instrumentation.dump_path}: {e}")
+
+    async def report_schedule(self):
+        """Log per-job schedule lag and overruns"""
+        for name, metrics in self.scheduler.metrics().items():
+            self.logger.info(
+                f"Job {name}: {metrics['runs']} runs, lag mean {metrics['mean_lag'] * 1000:.0f} ms "
+                f"/ max {metrics['max_lag'] * 1000:.0f} ms, {metrics['overruns']} overruns, "
+                f"{metrics['skipped']} skipped, {metrics['failures']} failures"
+            )
+
     async def monitor_balances(self):
         """Monitor balances and execute strategies"""
         try:
-            total_assets = self.vault_manager.get_total_assets()
+            await self.agent.prepare_cycle()
+            
+            # Served from the multicall issued by prepare_cycle
+            vault_state = self.vault_manager.get_vault_state([
+                (StrategyType.STRATEGY_1.value, self.config.contracts.aave.lending_token),
+                (StrategyType.STRATEGY_2.value, self.config.contracts.sonic['wrapped_sonic'])
+            ])
+            total_assets = vault_state['total_assets']
             self.logger.info(f"Total assets: {total_assets}")
             
-            # Get strategy balances
-            strategy1_balance = self.vault_manager.get_pool_balance(
-                StrategyType.STRATEGY_1.value,
-                self.config['contracts']['aave']['lending_token']
-            )
-            
-            strategy2_balance = self.vault_manager.get_pool_balance(
-                StrategyType.STRATEGY_2.value,
-                self.config['contracts']['sonic']['wrapped_sonic']
-            )
+            strategy1_balance = vault_state['pool_balances'][StrategyType.STRATEGY_1.value]
+            strategy2_balance = vault_state['pool_balances'][StrategyType.STRATEGY_2.value]
             
             self.logger.info(f"Strategy 1 balance: {strategy1_balance}")
             self.logger.info(f"Strategy 2 balance: {strategy2_balance}")
@@ -107,19 +285,108 @@ class StrategyOrchestrator:
             # Properly await the async call
             await self.agent.rebalance_if_needed()
             
+            # Receipts resolve in the background; record whatever confirmed since the last tick
+            for outcome in self.agent.collect_confirmations():
+                self.logger.info(f"Transaction confirmed: {outcome}")
+            
+            for stats in self.agent.snapshot_stats():
+                self.logger.info(
+                    f"{stats['chain']} snapshot @ block {stats['block_number']}: "
+                    f"{stats['reads']} reads, {stats['deduplicated']} deduplicated"
+                )
+            for chain, web3 in (('sonic', self.sonic_web3), ('arbitrum', self.arb_web3)):
+                stats = web3.provider.stats()
+                endpoints = ', '.join(
+                    f"{url[:30]} {info['state']} ewma {(info['ewma_latency'] or 0) * 1000:.0f} ms"
+                    for url, info in stats['endpoints'].items()
+                )
+                self.logger.info(
+                    f"{chain} RPC: {endpoints}; {stats['hedged']} hedged ({stats['hedge_wins']} won), "
+                    f"{stats['failovers']} failovers"
+                )
+            for name, stats in self.agent.cache_stats().items():
+                self.logger.info(
+                    f"{name} read cache: {stats['hits']} hits, {stats['misses']} misses, "
+                    f"{stats['entries']} entries, {stats['evictions']} evictions"
+                )
+            
         except Exception as e:
             self.logger.error(f"Error monitoring balances: {e}")
 
     async def run(self):
-        """Main loop"""
+        """Main loop: each job runs on its own cadence"""
+        scheduler_config = self.config.scheduler
+        jitter = scheduler_config.jitter
+        
+        self.scheduler = TaskScheduler()
+        # Runs on a worker thread so blocking reads elsewhere cannot delay it
+        # Strategy intervals and the timeout are read per slot, so a hot reload changes them
+        self.scheduler.add_job(
+            'emergency', self.check_emergency,
+            interval=lambda: self.config.strategy.emergency_check_interval,
+            timeout=lambda: self.config.strategy.emergency_check_interval * 4,
+            offload=True
+        )
+        self.scheduler.add_job(
+            'monitor', self._instrumented('monitor', self.monitor_balances),
+            interval=lambda: self.config.strategy.check_interval,
+            jitter=jitter
+        )
+        self.scheduler.add_job(
+            'rebalance', self._instrumented('rebalance', self.check_strategy_execution),
+            interval=lambda: self.config.strategy.rebalance_interval,
+            jitter=jitter
+        )
+        self.scheduler.add_job(
+            'schedule_report', self.report_schedule,
+            interval=scheduler_config.report_interval
+        )
+        if self.config.hot_reload.enabled:
+            # Strategy thresholds are read per decision, so edits apply from the next tick
+            self.scheduler.add_job(
+                'config_reload', self.reload_config,
+                interval=self.config.hot_reload.interval
+            )
+        
+        instrumentation_config = self.config.instrumentation
+        if instrumentation_config.enabled:
+            if instrumentation_config.dump_path:
+                self.scheduler.add_job(
+                    'metrics_dump', self.dump_metrics,
+                    interval=instrumentation_config.dump_interval
+                )
+            if instrumentation_config.metrics_port:
+                self.metrics_server = MetricsServer(instrumentation, port=instrumentation_config.metrics_port).start()
+            if hasattr(signal, 'SIGUSR1'):
+                try:
+                    asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, self.request_profile)
+                # Event loops without Unix signal support (e.g. Windows) raise NotImplementedError
+                except (NotImplementedError, RuntimeError):
+                    self.logger.warning("SIGUSR1 profiling is not available on this platform")
+        
+        watcher_thread = None
+        if self.emergency_watcher:
+            # Own thread and loop: the handler's withdrawal and the blocking jobs here cannot delay each other
+            watcher_thread = self.emergency_watcher.start()
+        
         try:
-            check_interval = self.config.get('check_interval', 60)  # Default 60 seconds
-            while True:
-                await self.monitor_balances()
-                await asyncio.sleep(check_interval)
+            if self.defer_probes:
+                await self.run_probes()
+                self._mark('probes')
+            self.report_startup()
+            await self.scheduler.run()
                 
         except Exception as e:
             self.logger.error(f"Error in main loop: {e}")
+        finally:
+            if watcher_thread:
+                self.emergency_watcher.stop()
+                await asyncio.to_thread(watcher_thread.join)
+            self.vault_manager.tx_pipeline.stop()
+            if self.metrics_server:
+                self.metrics_server.stop()
+            if self.async_rpc:
+                await self.async_rpc.close()
 
 def main():
     try:
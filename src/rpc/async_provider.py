@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Union
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from web3 import AsyncWeb3
+from src.rpc.failover_provider import AsyncFailoverHTTPProvider
+from src.rpc.read_cache import cache_static_requests
+
+
+class AsyncRPCPool:
+    """AsyncWeb3 clients per chain backed by one pooled keep-alive aiohttp session
+
+    Each chain can list several endpoints; requests are spread, hedged and
+    failed over between them by an AsyncFailoverHTTPProvider.
+    """
+
+    def __init__(self, rpc_urls: Dict[str, Union[str, List[str]]], pool_size: int = 20, timeout: float = 10,
+                 hedge: bool = True, hedge_min_delay: float = 0.02, failure_threshold: int = 3,
+                 cooldown: float = 30.0):
+        self.rpc_urls = {chain: [urls] if isinstance(urls, str) else list(urls) for chain, urls in rpc_urls.items()}
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.logger = logging.getLogger('AsyncRPCPool')
+
+        self._session: Optional[ClientSession] = None
+        self._clients: Dict[str, AsyncWeb3] = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, chain: str) -> AsyncWeb3:
+        """Get the AsyncWeb3 client for a chain, opening the shared session on first use"""
+        client = self._clients.get(chain)
+        if client:
+            return client
+
+        async with self._lock:
+            if chain in self._clients:
+                return self._clients[chain]
+
+            if self._session is None or self._session.closed:
+                self._session = ClientSession(
+                    connector=TCPConnector(limit=self.pool_size, keepalive_timeout=60),
+                    timeout=ClientTimeout(total=self.timeout)
+                )
+
+            provider = AsyncFailoverHTTPProvider(
+                self.rpc_urls[chain],
+                timeout=self.timeout,
+                hedge=self.hedge,
+                hedge_min_delay=self.hedge_min_delay,
+                failure_threshold=self.failure_threshold,
+                cooldown=self.cooldown
+            )
+            await provider.cache_async_session(self._session)
+            client = cache_static_requests(AsyncWeb3(provider))
+            self._clients[chain] = client
+            self.logger.info(f"Opened async RPC client for {chain}")
+            return client
+
+    async def block_numbers(self, *chains: str) -> Dict[str, int]:
+        """Fetch the latest block on several chains concurrently"""
+        clients = await asyncio.gather(*[self.get(chain) for chain in chains])
+        numbers = await asyncio.gather(*[client.eth.block_number for client in clients])
+        return dict(zip(chains, numbers))
+
+    def stats(self) -> Dict[str, Dict]:
+        """Endpoint health and hedging counters per chain"""
+        return {chain: client.provider.stats() for chain, client in self._clients.items()}
+
+    async def close(self):
+        """Close the shared session and drop all clients"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._clients.clear()
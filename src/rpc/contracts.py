@@ -0,0 +1,204 @@
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from eth_abi import decode, encode
+from eth_utils import function_signature_to_4byte_selector
+from eth_utils.abi import get_abi_input_types, get_abi_output_types
+from web3 import Web3
+from src.instrumentation import metrics
+
+ABI_DIR = "src/abis"
+
+
+@dataclass(frozen=True)
+class FunctionSpec:
+    """Selector and argument types for one ABI function, computed once"""
+    name: str
+    selector: bytes
+    input_types: Tuple[str, ...]
+    output_types: Tuple[str, ...]
+
+
+class AbiSpec:
+    """A parsed ABI with per-function selectors and types precomputed"""
+
+    def __init__(self, name: str, abi: List[Dict]):
+        self.name = name
+        self.abi = abi
+        self.functions: Dict[str, FunctionSpec] = {}
+        self.selectors: Dict[bytes, FunctionSpec] = {}
+
+        overloaded = set()
+        for element in abi:
+            if element.get('type') != 'function':
+                continue
+            input_types = tuple(get_abi_input_types(element))
+            spec = FunctionSpec(
+                name=element['name'],
+                selector=function_signature_to_4byte_selector(f"{element['name']}({','.join(input_types)})"),
+                input_types=input_types,
+                output_types=tuple(get_abi_output_types(element))
+            )
+            self.selectors[spec.selector] = spec
+            if spec.name in self.functions:
+                overloaded.add(spec.name)
+            self.functions[spec.name] = spec
+
+        # Overloads need web3's argument matching; leave them to the slow path
+        for name in overloaded:
+            del self.functions[name]
+
+
+def normalize_output(abi_type: str, value):
+    """Match the values ContractFunction.call() returns for common output types"""
+    if abi_type == 'address':
+        return Web3.to_checksum_address(value)
+    if abi_type == 'address[]':
+        return [Web3.to_checksum_address(v) for v in value]
+    if abi_type.endswith('[]'):
+        return list(value)
+    return value
+
+
+class ContractRegistry:
+    """Process-wide cache of parsed ABIs and contract objects
+
+    Each ABI file is parsed once. Contract objects are shared per (chain, address)
+    and web3 client, and calls on registered contracts are encoded and decoded
+    with the precomputed selectors instead of web3's per-call ABI matching.
+    """
+
+    def __init__(self, abi_dir: str = ABI_DIR):
+        self.abi_dir = abi_dir
+        self.logger = logging.getLogger('ContractRegistry')
+        self._lock = threading.RLock()
+        self._specs: Dict[str, AbiSpec] = {}
+        self._contracts: Dict[Tuple, object] = {}
+        self._address_specs: Dict[str, AbiSpec] = {}
+
+        self.fast_calls = 0
+        self.fallback_calls = 0
+
+    def register_abi(self, name: str, abi: List[Dict]) -> AbiSpec:
+        """Register an ABI that is not a file under abi_dir (e.g. Multicall3)"""
+        with self._lock:
+            spec = self._specs.get(name)
+            if spec is None:
+                spec = self._specs[name] = AbiSpec(name, abi)
+            return spec
+
+    def spec(self, name: str) -> AbiSpec:
+        """Get the parsed ABI for src/abis/<name>.json, loading it on first use"""
+        spec = self._specs.get(name)
+        if spec is not None:
+            return spec
+        with self._lock:
+            if name not in self._specs:
+                with open(os.path.join(self.abi_dir, f"{name}.json"), "r") as f:
+                    abi = json.load(f)
+                # Some ABI files are Hardhat artifacts with the ABI under 'abi'
+                if isinstance(abi, dict):
+                    abi = abi.get('abi', [])
+                self._specs[name] = AbiSpec(name, abi)
+            return self._specs[name]
+
+    def abi(self, name: str) -> List[Dict]:
+        return self.spec(name).abi
+
+    def contract(self, web3, abi_name: str, address: str, chain: str = None):
+        """Get the shared contract object for an address on a chain"""
+        # Look up the address as given first to skip the checksum hash on repeat calls
+        contract = self._contracts.get((chain, address, id(web3)))
+        if contract is not None:
+            return contract
+
+        spec = self.spec(abi_name)
+        checksum_address = Web3.to_checksum_address(address)
+        key = (chain, checksum_address, id(web3))
+        with self._lock:
+            contract = self._contracts.get(key)
+            if contract is None:
+                # The contract holds a reference to web3, so id(web3) cannot be reused while cached
+                contract = self._contracts[key] = web3.eth.contract(address=checksum_address, abi=spec.abi)
+                self._address_specs[checksum_address] = spec
+            self._contracts[(chain, address, id(web3))] = contract
+            return contract
+
+    def function_spec(self, contract_function) -> Optional[FunctionSpec]:
+        spec = self._address_specs.get(contract_function.address)
+        if spec is None:
+            return None
+        return spec.functions.get(contract_function.fn_name)
+
+    def encode_call(self, contract_function) -> bytes:
+        """Calldata for a bound ContractFunction"""
+        function = self.function_spec(contract_function)
+        if function is not None and not contract_function.kwargs:
+            try:
+                calldata = function.selector + encode(function.input_types, contract_function.args)
+                self.fast_calls += 1
+                return calldata
+            except Exception:
+                # Arguments web3 would normalize first (ENS names, enums, ...)
+                pass
+        self.fallback_calls += 1
+        return Web3.to_bytes(hexstr=contract_function._encode_transaction_data())
+
+    def decode_output(self, contract_function, return_data: bytes):
+        """Decode return data the same way ContractFunction.call() does"""
+        function = self.function_spec(contract_function)
+        output_types = function.output_types if function else get_abi_output_types(contract_function.abi)
+        decoded = [
+            normalize_output(abi_type, value)
+            for abi_type, value in zip(output_types, decode(output_types, return_data))
+        ]
+        return decoded[0] if len(decoded) == 1 else decoded
+
+    def _contract_name(self, contract_function) -> str:
+        spec = self._address_specs.get(contract_function.address)
+        return spec.name if spec else contract_function.address
+
+    def call(self, contract_function, block_identifier=None):
+        """eth_call a bound ContractFunction using the precomputed encoder and decoder"""
+        start = time.perf_counter()
+        try:
+            if self.function_spec(contract_function) is None:
+                self.fallback_calls += 1
+                return contract_function.call(block_identifier=block_identifier)
+
+            tx = {'to': contract_function.address, 'data': self.encode_call(contract_function)}
+            return_data = contract_function.w3.eth.call(tx, block_identifier or 'latest')
+            return self.decode_output(contract_function, return_data)
+        finally:
+            metrics.observe('contract_call_seconds', time.perf_counter() - start,
+                            contract=self._contract_name(contract_function), method=contract_function.fn_name)
+
+    async def call_async(self, contract_function, block_identifier=None):
+        """Same as call(), for a ContractFunction bound to an AsyncWeb3 client"""
+        start = time.perf_counter()
+        try:
+            if self.function_spec(contract_function) is None:
+                self.fallback_calls += 1
+                return await contract_function.call(block_identifier=block_identifier)
+
+            tx = {'to': contract_function.address, 'data': self.encode_call(contract_function)}
+            return_data = await contract_function.w3.eth.call(tx, block_identifier or 'latest')
+            return self.decode_output(contract_function, return_data)
+        finally:
+            metrics.observe('contract_call_seconds', time.perf_counter() - start,
+                            contract=self._contract_name(contract_function), method=contract_function.fn_name)
+
+    def stats(self) -> Dict:
+        return {
+            'abis': len(self._specs),
+            'contracts': len({id(contract) for contract in self._contracts.values()}),
+            'fast_calls': self.fast_calls,
+            'fallback_calls': self.fallback_calls,
+        }
+
+
+registry = ContractRegistry()
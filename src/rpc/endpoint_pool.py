@@ -0,0 +1,145 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+CLOSED = 'closed'        # Healthy; takes traffic
+OPEN = 'open'            # Tripped; skipped until the cooldown ends
+HALF_OPEN = 'half_open'  # Cooldown over; one trial request decides
+
+
+class Endpoint:
+    """Latency and failure tracking for one RPC URL"""
+
+    def __init__(self, url: str, window: int = 200, ewma_alpha: float = 0.2):
+        self.url = url
+        self.ewma_alpha = ewma_alpha
+        self.latencies = deque(maxlen=window)
+        self.ewma_latency: Optional[float] = None
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+        self.requests = 0
+        self.failures = 0
+        self.trips = 0
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < 5:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+
+class EndpointPool:
+    """Picks RPC endpoints by observed latency and trips a circuit on failing ones
+
+    Endpoints are chosen with probability proportional to 1 / EWMA latency, so a
+    slow node still gets some traffic and its estimate stays current. After
+    failure_threshold consecutive failures an endpoint is skipped for cooldown
+    seconds, then a single trial request closes or re-opens the circuit.
+    """
+
+    def __init__(self, urls: Iterable[str], failure_threshold: int = 3, cooldown: float = 30.0,
+                 default_latency: float = 0.2):
+        self.endpoints: List[Endpoint] = [Endpoint(url) for url in dict.fromkeys(urls)]
+        if not self.endpoints:
+            raise ValueError("EndpointPool needs at least one URL")
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.default_latency = default_latency
+        self.logger = logging.getLogger('EndpointPool')
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def _available(self, endpoint: Endpoint, now: float) -> bool:
+        if endpoint.state == CLOSED:
+            return True
+        if endpoint.state == OPEN and now - endpoint.opened_at >= self.cooldown:
+            endpoint.state = HALF_OPEN
+            endpoint.trial_in_flight = False
+        return endpoint.state == HALF_OPEN and not endpoint.trial_in_flight
+
+    def _latency_estimate(self, endpoint: Endpoint) -> float:
+        if endpoint.ewma_latency is not None:
+            return endpoint.ewma_latency
+        # Untried endpoints look as fast as the best known one so they get sampled
+        known = [e.ewma_latency for e in self.endpoints if e.ewma_latency is not None]
+        return min(known) if known else self.default_latency
+
+    def choose(self, exclude: Iterable[Endpoint] = ()) -> Optional[Endpoint]:
+        """Pick an endpoint for the next request, or None if every candidate is excluded"""
+        excluded = set(id(e) for e in exclude)
+        with self._lock:
+            now = time.monotonic()
+            candidates = [e for e in self.endpoints if id(e) not in excluded and self._available(e, now)]
+            if not candidates:
+                # Every circuit is open: try the one whose cooldown ends first rather than fail outright
+                tripped = [e for e in self.endpoints if id(e) not in excluded]
+                if not tripped:
+                    return None
+                return min(tripped, key=lambda e: e.opened_at)
+
+            weights = [1.0 / max(self._latency_estimate(e), 1e-4) for e in candidates]
+            endpoint = random.choices(candidates, weights=weights)[0]
+            if endpoint.state == HALF_OPEN:
+                endpoint.trial_in_flight = True
+            return endpoint
+
+    def hedge_delay(self, endpoint: Endpoint, minimum: float = 0.01, maximum: float = 2.0) -> float:
+        """How long to wait on an endpoint before sending the same request elsewhere"""
+        p95 = endpoint.p95()
+        if p95 is None:
+            p95 = self._latency_estimate(endpoint) * 2
+        return min(max(p95, minimum), maximum)
+
+    def record_success(self, endpoint: Endpoint, latency: float):
+        with self._lock:
+            endpoint.requests += 1
+            endpoint.latencies.append(latency)
+            if endpoint.ewma_latency is None:
+                endpoint.ewma_latency = latency
+            else:
+                endpoint.ewma_latency += endpoint.ewma_alpha * (latency - endpoint.ewma_latency)
+            endpoint.consecutive_failures = 0
+            if endpoint.state != CLOSED:
+                self.logger.info(f"Endpoint {endpoint.url} recovered")
+            endpoint.state = CLOSED
+            endpoint.trial_in_flight = False
+
+    def record_failure(self, endpoint: Endpoint, error: Exception = None):
+        with self._lock:
+            endpoint.requests += 1
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            endpoint.trial_in_flight = False
+            if endpoint.state == HALF_OPEN or endpoint.consecutive_failures >= self.failure_threshold:
+                if endpoint.state != OPEN:
+                    endpoint.trips += 1
+                    self.logger.warning(
+                        f"Endpoint {endpoint.url} tripped after {endpoint.consecutive_failures} failures: {error}"
+                    )
+                endpoint.state = OPEN
+                endpoint.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-endpoint latency, failure and circuit state"""
+        with self._lock:
+            return {
+                e.url: {
+                    'state': e.state,
+                    'requests': e.requests,
+                    'failures': e.failures,
+                    'trips': e.trips,
+                    'ewma_latency': e.ewma_latency,
+                    'p95_latency': e.p95(),
+                }
+                for e in self.endpoints
+            }
+
@@ -0,0 +1,262 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import requests
+from aiohttp import ClientSession, ClientTimeout
+from requests.adapters import HTTPAdapter
+from web3._utils.batching import sort_batch_response_by_response_ids
+from web3.providers.rpc import AsyncHTTPProvider, HTTPProvider
+from src.instrumentation import metrics
+from src.rpc.endpoint_pool import Endpoint, EndpointPool
+
+# Sending these twice is not harmless, so they fail over but are never hedged
+NON_IDEMPOTENT_METHODS = {'eth_sendRawTransaction', 'eth_sendTransaction'}
+
+
+def _record(method: str, endpoint: Endpoint, latency: float, error: Exception = None):
+    """Per method and endpoint host latency; the host keeps API keys in URL paths out of labels"""
+    host = urlparse(endpoint.url).netloc
+    if error is None:
+        metrics.observe('rpc_request_seconds', latency, method=method, endpoint=host)
+    else:
+        metrics.inc('rpc_request_errors_total', method=method, endpoint=host)
+
+
+class FailoverHTTPProvider(HTTPProvider):
+    """HTTPProvider over several endpoints with pooled sessions, failover, hedging and circuit breaking
+
+    Each request goes to an endpoint picked by the EndpointPool. With hedging on,
+    a read that has not answered within the endpoint's p95 latency is also sent
+    to a second endpoint and the first response wins. Without a spare endpoint
+    this behaves like a plain HTTPProvider on keep-alive sessions.
+    """
+
+    def __init__(self, endpoint_uris: List[str], pool_size: int = 20, timeout: float = 10,
+                 hedge: bool = True, hedge_min_delay: float = 0.02,
+                 failure_threshold: int = 3, cooldown: float = 30.0):
+        super().__init__(endpoint_uris[0], exception_retry_configuration=None)
+        self.pool = EndpointPool(endpoint_uris, failure_threshold, cooldown)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.hedge_min_delay = hedge_min_delay
+        self.logger = logging.getLogger('FailoverHTTPProvider')
+
+        self._sessions: Dict[str, requests.Session] = {}
+        self._sessions_lock = threading.Lock()
+        self._executor = None
+        if hedge and len(self.pool) > 1:
+            self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='rpc-hedge')
+
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def __str__(self) -> str:
+        return f"RPC connection pool {[e.url for e in self.pool.endpoints]}"
+
+    def _session(self, url: str) -> requests.Session:
+        session = self._sessions.get(url)
+        if session is None:
+            with self._sessions_lock:
+                session = self._sessions.get(url)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._sessions[url] = session
+        return session
+
+    def _post(self, endpoint: Endpoint, request_data: bytes, method: str) -> bytes:
+        start = time.perf_counter()
+        try:
+            response = self._session(endpoint.url).post(
+                endpoint.url, data=request_data, timeout=self.timeout, **self.get_request_kwargs()
+            )
+            response.raise_for_status()
+            content = response.content
+        except Exception as e:
+            self.pool.record_failure(endpoint, e)
+            _record(method, endpoint, time.perf_counter() - start, e)
+            raise
+        latency = time.perf_counter() - start
+        self.pool.record_success(endpoint, latency)
+        _record(method, endpoint, latency)
+        return content
+
+    def _make_request(self, method, request_data: bytes) -> bytes:
+        if self._executor is not None and method not in NON_IDEMPOTENT_METHODS:
+            return self._hedged_request(request_data, method)
+        return self._failover_request(request_data, method)
+
+    def _failover_request(self, request_data: bytes, method: str) -> bytes:
+        """Try endpoints one at a time until one answers"""
+        tried = []
+        last_error = None
+        while True:
+            endpoint = self.pool.choose(exclude=tried)
+            if endpoint is None:
+                raise last_error
+            if tried:
+                self.failovers += 1
+            tried.append(endpoint)
+            try:
+                return self._post(endpoint, request_data, method)
+            except Exception as e:
+                self.logger.warning(f"RPC request to {endpoint.url} failed: {e}")
+                last_error = e
+
+    def _hedged_request(self, request_data: bytes, method: str) -> bytes:
+        """Send to one endpoint, and to another if the first is slow or fails"""
+        primary = self.pool.choose()
+        tried = [primary]
+        pending = {self._executor.submit(self._post, primary, request_data, method)}
+        hedges = set()
+        done, pending = wait(pending, timeout=self.pool.hedge_delay(primary, self.hedge_min_delay))
+        last_error = None
+        while True:
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if future in hedges:
+                    self.hedge_wins += 1
+                return result
+
+            endpoint = self.pool.choose(exclude=tried)
+            if endpoint is not None:
+                tried.append(endpoint)
+                future = self._executor.submit(self._post, endpoint, request_data, method)
+                if pending:
+                    self.hedged += 1
+                    hedges.add(future)
+                else:
+                    self.failovers += 1
+                pending.add(future)
+            if not pending:
+                raise last_error
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+    def make_batch_request(self, batch_requests: List[Tuple[str, Any]]):
+        request_data = self.encode_batch_rpc_request(batch_requests)
+        response = self.decode_rpc_response(self._make_request('batch', request_data))
+        if not isinstance(response, list):
+            # RPC errors return only one response with the error object
+            return response
+        return sort_batch_response_by_response_ids(response)
+
+    def stats(self) -> Dict:
+        return {
+            'endpoints': self.pool.stats(),
+            'hedged': self.hedged,
+            'hedge_wins': self.hedge_wins,
+            'failovers': self.failovers,
+        }
+
+
+class AsyncFailoverHTTPProvider(AsyncHTTPProvider):
+    """AsyncHTTPProvider counterpart of FailoverHTTPProvider on a shared aiohttp session"""
+
+    def __init__(self, endpoint_uris: List[str], timeout: float = 10, hedge: bool = True,
+                 hedge_min_delay: float = 0.02, failure_threshold: int = 3, cooldown: float = 30.0):
+        super().__init__(endpoint_uris[0], exception_retry_configuration=None)
+        self.pool = EndpointPool(endpoint_uris, failure_threshold, cooldown)
+        self.timeout = timeout
+        self.hedge = hedge and len(self.pool) > 1
+        self.hedge_min_delay = hedge_min_delay
+        self.logger = logging.getLogger('AsyncFailoverHTTPProvider')
+        self._session: Optional[ClientSession] = None
+
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def __str__(self) -> str:
+        return f"Async RPC connection pool {[e.url for e in self.pool.endpoints]}"
+
+    async def cache_async_session(self, session: ClientSession) -> ClientSession:
+        """Use a caller-owned session for every endpoint"""
+        self._session = session
+        return session
+
+    async def _post(self, endpoint: Endpoint, request_data: bytes, method: str) -> bytes:
+        if self._session is None:
+            self._session = ClientSession(timeout=ClientTimeout(total=self.timeout))
+        start = time.perf_counter()
+        try:
+            async with self._session.post(
+                endpoint.url, data=request_data, headers=self.get_request_headers()
+            ) as response:
+                response.raise_for_status()
+                content = await response.read()
+        except asyncio.CancelledError:
+            # Lost a hedge race; not the endpoint's fault
+            raise
+        except Exception as e:
+            self.pool.record_failure(endpoint, e)
+            _record(method, endpoint, time.perf_counter() - start, e)
+            raise
+        latency = time.perf_counter() - start
+        self.pool.record_success(endpoint, latency)
+        _record(method, endpoint, latency)
+        return content
+
+    async def _make_request(self, method, request_data: bytes) -> bytes:
+        hedge = self.hedge and method not in NON_IDEMPOTENT_METHODS
+        primary = self.pool.choose()
+        tried = [primary]
+        pending = {asyncio.ensure_future(self._post(primary, request_data, method))}
+        hedges = set()
+        timeout = self.pool.hedge_delay(primary, self.hedge_min_delay) if hedge else None
+        done, pending = await asyncio.wait(pending, timeout=timeout)
+        last_error = None
+        try:
+            while True:
+                for task in done:
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        self.logger.warning(f"RPC request failed: {last_error}")
+                        continue
+                    if task in hedges:
+                        self.hedge_wins += 1
+                    return task.result()
+
+                # Only hedge reads; anything else waits for its first endpoint before failing over
+                endpoint = self.pool.choose(exclude=tried) if hedge or not pending else None
+                if endpoint is not None:
+                    tried.append(endpoint)
+                    task = asyncio.ensure_future(self._post(endpoint, request_data, method))
+                    if pending:
+                        self.hedged += 1
+                        hedges.add(task)
+                    else:
+                        self.failovers += 1
+                    pending.add(task)
+                if not pending:
+                    raise last_error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def make_batch_request(self, batch_requests: List[Tuple[str, Any]]):
+        request_data = self.encode_batch_rpc_request(batch_requests)
+        response = self.decode_rpc_response(await self._make_request('batch', request_data))
+        if not isinstance(response, list):
+            # RPC errors return only one response with the error object
+            return response
+        return sort_batch_response_by_response_ids(response)
+
+    def stats(self) -> Dict:
+        return {
+            'endpoints': self.pool.stats(),
+            'hedged': self.hedged,
+            'hedge_wins': self.hedge_wins,
+            'failovers': self.failovers,
+        }
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+from web3 import Web3
+from src.rpc.contracts import registry
+from src.rpc.snapshot import MarketSnapshot
+
+# Multicall3 is deployed at the same address on Sonic, Arbitrum and most EVM chains
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Call3[]",
+                "name": "calls",
+                "type": "tuple[]"
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]"
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    }
+]
+
+registry.register_abi('Multicall3', MULTICALL3_ABI)
+
+
+class MulticallBatch:
+    """Collects view calls for one chain and resolves them with a single aggregate3 call"""
+
+    def __init__(self, web3: Web3, snapshot: MarketSnapshot = None, address: str = MULTICALL3_ADDRESS):
+        self.web3 = web3
+        # A MarketSnapshot or a ReadCache; both expose contains/prime/call
+        self.snapshot = snapshot
+        self.logger = logging.getLogger('MulticallBatch')
+        self.chain = getattr(snapshot, 'chain', None)
+        self.multicall = registry.contract(self.web3, 'Multicall3', address, self.chain)
+        self._calls = []
+
+    def add(self, contract_function) -> int:
+        """Queue a view call and return its index in the results"""
+        self._calls.append(contract_function)
+        return len(self._calls) - 1
+
+    def __len__(self):
+        return len(self._calls)
+
+    def execute(self) -> List:
+        """Resolve all queued calls, falling back to individual calls on failure"""
+        results, pending = self._split_cached()
+        if not pending:
+            return results
+
+        failed = list(pending)
+        try:
+            aggregate = self.multicall.functions.aggregate3(self._call_args(pending))
+            if self.snapshot:
+                if self.snapshot.block_number is None:
+                    self.snapshot.refresh()
+                responses = registry.call(aggregate, self.snapshot.block_number)
+            else:
+                responses = registry.call(aggregate)
+            failed = self._apply(pending, responses, results)
+        except Exception as e:
+            self.logger.warning(f"aggregate3 failed, falling back to individual calls: {e}")
+
+        for index in failed:
+            results[index] = self._call_single(pending[index])
+
+        return results
+
+    async def execute_async(self, async_web3) -> List:
+        """Resolve all queued calls over an AsyncWeb3 client without blocking the loop"""
+        results, pending = self._split_cached()
+        if not pending:
+            return results
+
+        block_identifier = self.snapshot.block_number if self.snapshot else None
+        if block_identifier is None:
+            block_identifier = 'latest'
+
+        failed = list(pending)
+        try:
+            multicall = registry.contract(async_web3, 'Multicall3', self.multicall.address, self.chain)
+            responses = await registry.call_async(
+                multicall.functions.aggregate3(self._call_args(pending)),
+                block_identifier
+            )
+            failed = self._apply(pending, responses, results)
+        except Exception as e:
+            self.logger.warning(f"aggregate3 failed, falling back to individual calls: {e}")
+
+        if failed:
+            fallbacks = await asyncio.gather(*[
+                self._call_single_async(async_web3, pending[index], block_identifier)
+                for index in failed
+            ])
+            for index, result in zip(failed, fallbacks):
+                results[index] = result
+
+        return results
+
+    def _split_cached(self) -> Tuple[List, Dict[int, object]]:
+        """Serve calls the snapshot already holds and return the rest as pending"""
+        results: List = [None] * len(self._calls)
+        pending: Dict[int, object] = {}
+
+        for index, contract_function in enumerate(self._calls):
+            if self.snapshot and self.snapshot.contains(contract_function):
+                results[index] = self.snapshot.call(contract_function)
+            else:
+                pending[index] = contract_function
+
+        return results, pending
+
+    @staticmethod
+    def _call_args(pending: Dict[int, object]) -> List[Tuple]:
+        return [
+            (fn.address, True, registry.encode_call(fn))
+            for fn in pending.values()
+        ]
+
+    def _apply(self, pending: Dict[int, object], responses, results: List) -> List[int]:
+        """Decode aggregate3 responses into results and return the indexes that failed"""
+        failed = []
+        for (index, contract_function), (success, return_data) in zip(pending.items(), responses):
+            if not success or not return_data:
+                failed.append(index)
+                continue
+            try:
+                result = self._decode(contract_function, return_data)
+            except Exception as e:
+                self.logger.warning(f"Could not decode {contract_function.fn_name}: {e}")
+                failed.append(index)
+                continue
+            if self.snapshot:
+                self.snapshot.prime(contract_function, result)
+            results[index] = result
+
+        self.logger.debug(f"aggregate3 resolved {len(pending) - len(failed)}/{len(pending)} calls")
+        return failed
+
+    def _call_single(self, contract_function) -> Optional[object]:
+        """Fallback path for a call the multicall could not resolve"""
+        try:
+            if self.snapshot:
+                return self.snapshot.call(contract_function)
+            return registry.call(contract_function)
+        except Exception as e:
+            self.logger.error(f"Error calling {contract_function.fn_name}: {e}")
+            return None
+
+    async def _call_single_async(self, async_web3, contract_function, block_identifier) -> Optional[object]:
+        """Async fallback path for a call the multicall could not resolve"""
+        try:
+            return_data = await async_web3.eth.call({
+                'to': contract_function.address,
+                'data': registry.encode_call(contract_function)
+            }, block_identifier)
+            result = self._decode(contract_function, return_data)
+            if self.snapshot:
+                self.snapshot.prime(contract_function, result)
+            return result
+        except Exception as e:
+            self.logger.error(f"Error calling {contract_function.fn_name}: {e}")
+            return None
+
+    @staticmethod
+    def _decode(contract_function, return_data: bytes):
+        """Decode return data the same way ContractFunction.call() does"""
+        return registry.decode_output(contract_function, return_data)
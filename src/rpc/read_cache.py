@@ -0,0 +1,185 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+from src.rpc.contracts import registry
+from src.rpc.snapshot import MarketSnapshot
+
+IMMUTABLE = 'immutable'  # Cached until evicted
+PER_BLOCK = 'block'      # Served by the MarketSnapshot for the pinned block
+TTL = 'ttl'              # Cached for a number of seconds
+
+# Provider-level requests whose answer never changes for a connection
+STATIC_REQUESTS = {'eth_chainId', 'net_version'}
+
+
+def cache_static_requests(web3):
+    """Answer eth_chainId/net_version from the provider's request cache after the first call
+
+    web3's validation middleware asks for the chain id before every eth_call and
+    transaction, which otherwise costs an extra round trip each time.
+    """
+    provider = web3.provider
+    provider.cache_allowed_requests = True
+    provider.cacheable_requests = set(getattr(provider, 'cacheable_requests', None) or ()) | STATIC_REQUESTS
+    return web3
+
+
+class ReadCache:
+    """LRU cache for contract reads with an immutable, per-block or TTL policy per method
+
+    Methods without a policy default to per-block. The cache exposes the same
+    contains/prime/call interface as MarketSnapshot, so it can be handed to a
+    MulticallBatch in place of the snapshot.
+    """
+
+    def __init__(self, snapshot: MarketSnapshot = None, max_entries: int = 1024,
+                 policies: Dict[str, Tuple[str, Optional[float]]] = None):
+        self.snapshot = snapshot
+        self.max_entries = max_entries
+        self.policies: Dict[str, Tuple[str, Optional[float]]] = {}
+        self.logger = logging.getLogger('ReadCache')
+
+        # key -> (value, expires_at or None)
+        self._entries: "OrderedDict[Hashable, Tuple[object, Optional[float]]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        for name, (policy, ttl) in (policies or {}).items():
+            self.set_policy(name, policy, ttl)
+
+    def set_policy(self, name: str, policy: str, ttl: Optional[float] = None):
+        """Set the policy for a contract method name or a get() key name"""
+        if policy not in (IMMUTABLE, PER_BLOCK, TTL):
+            raise ValueError(f"Unknown cache policy '{policy}'")
+        if policy == TTL and not ttl:
+            raise ValueError(f"TTL policy for '{name}' needs a ttl in seconds")
+        self.policies[name] = (policy, ttl)
+
+    def policy(self, name: str) -> Tuple[str, Optional[float]]:
+        return self.policies.get(name, (PER_BLOCK, None))
+
+    @property
+    def chain(self) -> Optional[str]:
+        return self.snapshot.chain if self.snapshot else None
+
+    @property
+    def block_number(self) -> Optional[int]:
+        return self.snapshot.block_number if self.snapshot else None
+
+    def refresh(self) -> Optional[int]:
+        return self.snapshot.refresh() if self.snapshot else None
+
+    @staticmethod
+    def _key(contract_function) -> Tuple:
+        return MarketSnapshot._key(contract_function)
+
+    def _lookup(self, key: Hashable):
+        """Return (True, value) for a live entry, marking it most recently used"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key: Hashable, value, policy: str, ttl: Optional[float]):
+        expires_at = time.monotonic() + ttl if policy == TTL else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, name: str, loader: Callable[[], object], key: Hashable = None):
+        """Get a non-contract value (e.g. gas price) under the policy registered for name"""
+        policy, ttl = self.policy(name)
+        key = (name, key)
+        with self._lock:
+            if policy != PER_BLOCK:
+                found, value = self._lookup(key)
+                if found:
+                    self.hits += 1
+                    return value
+            self.misses += 1
+
+        value = loader()
+        if policy != PER_BLOCK:
+            with self._lock:
+                self._store(key, value, policy, ttl)
+        return value
+
+    def contains(self, contract_function) -> bool:
+        policy, _ = self.policy(contract_function.fn_name)
+        if policy == PER_BLOCK:
+            return bool(self.snapshot and self.snapshot.contains(contract_function))
+        with self._lock:
+            return self._lookup(self._key(contract_function))[0]
+
+    def prime(self, contract_function, result):
+        """Store a result fetched elsewhere (e.g. a multicall) under the method's policy"""
+        policy, ttl = self.policy(contract_function.fn_name)
+        if policy == PER_BLOCK:
+            if self.snapshot:
+                self.snapshot.prime(contract_function, result)
+            return
+        with self._lock:
+            self._store(self._key(contract_function), result, policy, ttl)
+
+    def call(self, contract_function):
+        """Run a contract read, serving it from the cache when its policy allows"""
+        policy, ttl = self.policy(contract_function.fn_name)
+        if policy == PER_BLOCK:
+            if not self.snapshot:
+                with self._lock:
+                    self.misses += 1
+                return registry.call(contract_function)
+            cached = self.snapshot.contains(contract_function)
+            with self._lock:
+                if cached:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            return self.snapshot.call(contract_function)
+
+        key = self._key(contract_function)
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        result = registry.call(contract_function)
+        with self._lock:
+            self._store(key, result, policy, ttl)
+        return result
+
+    def invalidate(self, name: str = None):
+        """Drop every entry, or only those for one method/key name"""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == name or (len(k) > 1 and k[1] == name)]:
+                del self._entries[key]
+
+    def stats(self) -> Dict:
+        """Get hit/miss counters and the current size"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+            }
@@ -0,0 +1,98 @@
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+from src.rpc.contracts import registry
+
+
+class MarketSnapshot:
+    """Block-scoped cache of contract reads shared across one decision cycle"""
+
+    def __init__(self, web3, chain: str):
+        self.web3 = web3
+        self.chain = chain
+        self.logger = logging.getLogger('MarketSnapshot')
+
+        self.block_number: Optional[int] = None
+        self._reads: Dict[Tuple, object] = {}
+        # Jobs offloaded to worker threads share the snapshot with the event loop
+        self._lock = threading.RLock()
+
+        # Counters for the current block and for the lifetime of the snapshot
+        self.reads = 0
+        self.deduplicated = 0
+        self.total_reads = 0
+        self.total_deduplicated = 0
+
+    def refresh(self) -> int:
+        """Pin the snapshot to the latest block, dropping reads from older blocks"""
+        return self.pin(self.web3.eth.block_number)
+
+    def pin(self, block_number: int) -> int:
+        """Pin the snapshot to a block number fetched by the caller"""
+        with self._lock:
+            return self._pin(block_number)
+
+    def _pin(self, block_number: int) -> int:
+        if block_number != self.block_number:
+            if self.block_number is not None:
+                self.logger.debug(
+                    f"{self.chain} block {self.block_number}: {self.reads} reads, "
+                    f"{self.deduplicated} deduplicated"
+                )
+            self.block_number = block_number
+            self._reads.clear()
+            self.reads = 0
+            self.deduplicated = 0
+        return block_number
+
+    @staticmethod
+    def _key(contract_function) -> Tuple:
+        return (
+            contract_function.address,
+            contract_function.fn_name,
+            repr(contract_function.args),
+            repr(contract_function.kwargs),
+        )
+
+    def contains(self, contract_function) -> bool:
+        """Check whether a read is already cached for the pinned block"""
+        with self._lock:
+            return self._key(contract_function) in self._reads
+
+    def prime(self, contract_function, result):
+        """Store a result fetched elsewhere (e.g. a multicall) for the pinned block"""
+        with self._lock:
+            self._reads[self._key(contract_function)] = result
+            self.reads += 1
+            self.total_reads += 1
+
+    def call(self, contract_function):
+        """Run a contract read once per block and replay the result on repeats"""
+        if self.block_number is None:
+            self.refresh()
+
+        key = self._key(contract_function)
+        with self._lock:
+            if key in self._reads:
+                self.deduplicated += 1
+                self.total_deduplicated += 1
+                return self._reads[key]
+            block_number = self.block_number
+
+        result = registry.call(contract_function, block_number)
+        with self._lock:
+            # Drop the result if another thread moved the snapshot to a newer block meanwhile
+            if block_number == self.block_number:
+                self.prime(contract_function, result)
+        return result
+
+    def stats(self) -> Dict:
+        """Get read and deduplication counts for the pinned block"""
+        return {
+            'chain': self.chain,
+            'block_number': self.block_number,
+            'reads': self.reads,
+            'deduplicated': self.deduplicated,
+            'total_reads': self.total_reads,
+            'total_deduplicated': self.total_deduplicated,
+        }
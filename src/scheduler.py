@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import random
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+from src.instrumentation import metrics as instrumentation
+
+
+@dataclass
+class JobStats:
+    runs: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    overruns: int = 0
+    skipped: int = 0
+    last_lag: float = 0.0
+    max_lag: float = 0.0
+    total_lag: float = 0.0
+    last_duration: float = 0.0
+    max_duration: float = 0.0
+
+    @property
+    def mean_lag(self) -> float:
+        return self.total_lag / self.runs if self.runs else 0.0
+
+
+@dataclass
+class ScheduledJob:
+    name: str
+    func: Callable[[], Awaitable]
+    interval: float
+    jitter: float = 0.0  # Fraction of the interval added as random delay
+    timeout: Optional[float] = None
+    offload: bool = False  # Run on a worker thread with its own event loop
+    # Re-read at the start of every slot so a config reload changes the cadence
+    interval_source: Optional[Callable[[], float]] = None
+    # Re-read before every run
+    timeout_source: Optional[Callable[[], float]] = None
+    stats: JobStats = field(default_factory=JobStats)
+    # The offloaded run's thread; a timeout stops waiting for it but cannot stop the thread
+    running: Optional[asyncio.Future] = None
+
+
+class TaskScheduler:
+    """Runs each job on its own asyncio task at its own cadence
+
+    Jobs never overlap themselves. A run that takes longer than its interval is
+    counted as an overrun and the missed slots are skipped rather than replayed,
+    so one slow job cannot queue up work or hold back the others. An offloaded
+    run that timed out keeps its thread; slots are skipped until it finishes.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger('TaskScheduler')
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+
+    def add_job(self, name: str, func: Callable[[], Awaitable], interval: Union[float, Callable[[], float]],
+                jitter: float = 0.0, timeout: Union[float, Callable[[], float], None] = None,
+                offload: bool = False) -> ScheduledJob:
+        """Schedule func every interval seconds; a callable interval is re-read each slot, a callable timeout each run"""
+        job = ScheduledJob(
+            name, func,
+            interval() if callable(interval) else interval,
+            jitter,
+            timeout() if callable(timeout) else timeout,
+            offload,
+            interval_source=interval if callable(interval) else None,
+            timeout_source=timeout if callable(timeout) else None
+        )
+        self.jobs[name] = job
+        return job
+
+    async def run(self):
+        """Run all jobs until stop() is called or a job task crashes"""
+        self._stopping.clear()
+        self._tasks = [
+            asyncio.create_task(self._run_job(job), name=f"job:{job.name}")
+            for job in self.jobs.values()
+        ]
+        self.logger.info(
+            "Scheduler started: " + ", ".join(f"{job.name} every {job.interval}s" for job in self.jobs.values())
+        )
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stop(self):
+        self._stopping.set()
+
+    async def _run_job(self, job: ScheduledJob):
+        loop = asyncio.get_running_loop()
+        due = loop.time()
+
+        while not self._stopping.is_set():
+            if job.interval_source:
+                interval = job.interval_source()
+                if interval != job.interval:
+                    # Move the pending slot onto the new cadence
+                    self.logger.info(f"Job {job.name} interval {job.interval}s -> {interval}s")
+                    due += interval - job.interval
+                    job.interval = interval
+            target = due
+            if job.jitter:
+                target += random.uniform(0, job.jitter * job.interval)
+            delay = target - loop.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+
+            if job.running and not job.running.done():
+                job.stats.skipped += 1
+                self.logger.warning(f"Job {job.name} skipped: its timed-out run is still in progress")
+            else:
+                started = loop.time()
+                lag = max(0.0, started - target)
+                if job.timeout_source:
+                    job.timeout = job.timeout_source()
+                await self._execute(job)
+                duration = loop.time() - started
+                self._record(job, lag, duration)
+
+            # Fixed-rate schedule; slots missed during an overrun are dropped
+            due += job.interval
+            now = loop.time()
+            if now >= due:
+                missed = int((now - due) // job.interval) + 1
+                job.stats.skipped += missed
+                due += missed * job.interval
+
+    async def _execute(self, job: ScheduledJob):
+        try:
+            if job.offload:
+                job.running = asyncio.ensure_future(asyncio.to_thread(lambda: asyncio.run(job.func())))
+                # Retrieve the outcome even when nobody awaits it any more after a timeout
+                job.running.add_done_callback(lambda future: future.cancelled() or future.exception())
+                # Shielded so a timeout leaves job.running tracking the thread until it returns
+                coro = asyncio.shield(job.running)
+            else:
+                coro = job.func()
+            await asyncio.wait_for(coro, timeout=job.timeout)
+        except asyncio.TimeoutError:
+            job.stats.timeouts += 1
+            self.logger.error(f"Job {job.name} timed out after {job.timeout}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.stats.failures += 1
+            self.logger.error(f"Job {job.name} failed: {e}")
+
+    def _record(self, job: ScheduledJob, lag: float, duration: float):
+        stats = job.stats
+        stats.runs += 1
+        stats.last_lag = lag
+        stats.max_lag = max(stats.max_lag, lag)
+        stats.total_lag += lag
+        stats.last_duration = duration
+        stats.max_duration = max(stats.max_duration, duration)
+        instrumentation.observe('scheduler_job_seconds', duration, job=job.name)
+        instrumentation.observe('scheduler_lag_seconds', lag, job=job.name)
+        if duration > job.interval:
+            stats.overruns += 1
+            self.logger.warning(f"Job {job.name} overran its {job.interval}s interval ({duration:.2f}s)")
+
+    def metrics(self) -> Dict[str, Dict]:
+        """Get per-job run counts, schedule lag and durations"""
+        return {
+            name: {
+                'interval': job.interval,
+                'runs': job.stats.runs,
+                'failures': job.stats.failures,
+                'timeouts': job.stats.timeouts,
+                'overruns': job.stats.overruns,
+                'skipped': job.stats.skipped,
+                'last_lag': job.stats.last_lag,
+                'mean_lag': job.stats.mean_lag,
+                'max_lag': job.stats.max_lag,
+                'last_duration': job.stats.last_duration,
+                'max_duration': job.stats.max_duration,
+            }
+            for name, job in self.jobs.items()
+        }
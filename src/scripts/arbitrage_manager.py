@@ -1,18 +1,17 @@
 from web3 import Web3
-import yaml
+from src.config import Config, load_config
 from data_providers.market_data import MarketDataAggregator
 from web3.sonic import estimate_gas_cost
 
 class ArbitrageManager:
-    def __init__(self, arb_web3, sonic_web3, vault_percentage=0.05):
+    def __init__(self, arb_web3, sonic_web3, vault_percentage=0.05, config: Config = None):
         self.arb_web3 = arb_web3
         self.sonic_web3 = sonic_web3
         self.vault_percentage = vault_percentage  # Percentage of vault to use for arbitrage
         self.market_data = MarketDataAggregator(arb_web3, sonic_web3)
         
-        # Load config
-        with open("configs/config.yaml", "r") as f:
-            self.config = yaml.safe_load(f)
+        # Shared config
+        self.config = config or load_config()
             
     def find_arbitrage_opportunities(self):
         """Find price differences between Sonic and Arbitrum"""
@@ -1,6 +1,6 @@
 from web3 import Web3
-from ..vault.super_vault_manager import SuperVaultManager, StrategyType
-import yaml
+from src.vault.super_vault_manager import SuperVaultManager, StrategyType
+from src.config import Config, load_config
 import os
 import logging
 from typing import Dict, Optional
@@ -9,22 +9,27 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class AutoCompounder:
-    def __init__(self):
-        # Load Config
-        with open("configs/config.yaml", "r") as f:
-            self.config = yaml.safe_load(f)
+    def __init__(self, web3: Web3 = None, vault_manager: SuperVaultManager = None, config: Config = None):
+        # Shared config
+        self.config = config or load_config()
 
-        # Initialize Web3
-        self.web3 = Web3(Web3.HTTPProvider(self.config["networks"]["arbitrum"]["rpc_url"]))
+        # The orchestrator injects its own connection and vault manager
+        if vault_manager is not None:
+            self.web3 = web3 or vault_manager.web3
+            self.vault_manager = vault_manager
+            return
+
+        # Initialize Web3; SuperVault is on Sonic
+        self.web3 = Web3(Web3.HTTPProvider(self.config.networks['sonic'].rpc_url))
         
         # Setup account
-        self.private_key = os.getenv("PRIVATE_KEY") or self.config["networks"]["arbitrum"]["private_key"]
+        self.private_key = os.getenv("PRIVATE_KEY") or self.config.networks['sonic'].private_key
         self.account = self.web3.eth.account.from_key(self.private_key)
         
         # Initialize vault manager
         self.vault_manager = SuperVaultManager(
             self.web3,
-            self.config["contracts"]["arbitrum"]["super_vault"]
+            self.config.contracts.supervault
         )
 
     async def check_compound_opportunity(self) -> Optional[Dict]:
@@ -37,7 +42,7 @@ class AutoCompounder:
             for pool_name in pool_list:
                 pool_balance = self.vault_manager.get_pool_balance(
                     pool_name,
-                    self.config["contracts"]["arbitrum"]["aave"]["tokens"]["eth"]
+                    self.config.contracts.arbitrum['aave']['tokens']['eth']
                 )
                 if pool_balance > 0:
                     # Calculate rewards for this pool
@@ -45,7 +50,7 @@ class AutoCompounder:
                     total_rewards += rewards
             
             # Check if rewards meet minimum threshold
-            min_reward = self.config["strategy"].get("min_compound_reward", 0.01)
+            min_reward = self.config.strategy.min_compound_reward
             
             if total_rewards > min_reward:
                 return {
@@ -71,8 +76,8 @@ class AutoCompounder:
             
             logger.info(f"Found compounding opportunity. Rewards: {opportunity['total_rewards']} ETH")
             
-            # Get current gas price
-            gas_price = self.web3.eth.gas_price
+            # Expected per-gas price (base fee plus tip) from the vault manager's gas engine
+            gas_price = self.vault_manager.get_gas_price()
             
             # Estimate total gas cost
             gas_cost = gas_price * opportunity['estimated_gas']
@@ -86,10 +91,11 @@ class AutoCompounder:
             # Execute compounding through vault manager
             logger.info("Executing compound transaction...")
             
-            # Compound rewards back into the strategy
-            await self.vault_manager.allocate_to_strategy(
+            # Compound rewards back into the strategy; the receipt resolves in the background
+            self.vault_manager.allocate_to_strategy(
                 StrategyType.AAVE,
-                self.web3.to_wei(opportunity['total_rewards'], 'ether')
+                self.web3.to_wei(opportunity['total_rewards'], 'ether'),
+                wait=False
             )
             
             logger.info("Successfully compounded rewards")
@@ -100,8 +106,7 @@ class AutoCompounder:
     def _calculate_pool_rewards(self, pool_name: str, balance: int) -> float:
         """Calculate unclaimed rewards for a specific pool"""
         # Implementation will depend on specific pool reward calculation
-        # This is a placeholder that should be implemented based on the specific pool
-        pass
+        raise NotImplementedError("Pool reward reading is not implemented")
 
 if __name__ == "__main__":
     import asyncio
@@ -0,0 +1,61 @@
+"""Backfill historical Aave and SuperVault logs into the columnar archive.
+
+    python -m src.scripts.backfill_logs --source aave --from-block 200000000
+    python -m src.scripts.backfill_logs --source vault --from-block 1000000 --to-block 2000000
+
+Reruns resume from the archive's last committed block.
+"""
+import argparse
+import asyncio
+import json
+import logging
+from src.backtest.backfill import LogBackfill, aave_reserve_source, vault_source
+from src.config import load_config
+from src.rpc.async_provider import AsyncRPCPool
+
+logging.basicConfig(level=logging.INFO)
+
+# Chain each source's contract lives on
+CHAINS = {'aave': 'arbitrum', 'vault': 'sonic'}
+
+
+async def backfill(source_name: str, from_block: int, to_block: int = None):
+    config = load_config()
+    chain = CHAINS[source_name]
+    if source_name == 'aave':
+        source = aave_reserve_source(config.contracts.arbitrum['aave']['pool'])
+    else:
+        source = vault_source(config.contracts.supervault)
+
+    rpc_config = config.rpc
+    # No hedging: a duplicated eth_getLogs over thousands of blocks is expensive
+    rpc = AsyncRPCPool(
+        {chain: config.networks[chain].endpoints()},
+        pool_size=rpc_config.pool_size,
+        timeout=rpc_config.timeout,
+        hedge=False,
+        failure_threshold=rpc_config.failure_threshold,
+        cooldown=rpc_config.cooldown
+    )
+    try:
+        web3 = await rpc.get(chain)
+        options = config.backfill.model_dump()
+        archive_path = options.pop('archive_path')
+        backfiller = LogBackfill(web3, archive_path=f"{archive_path}/{chain}", **options)
+        return await backfiller.run(source, from_block, to_block)
+    finally:
+        await rpc.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", choices=sorted(CHAINS), required=True)
+    parser.add_argument("--from-block", type=int, required=True)
+    parser.add_argument("--to-block", type=int, default=None, help="Default: latest block")
+    args = parser.parse_args()
+    stats = asyncio.run(backfill(args.source, args.from_block, args.to_block))
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
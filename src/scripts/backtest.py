@@ -0,0 +1,84 @@
+"""Backtest the strategy parameters, or a sweep over them, against recorded history.
+
+    python -m src.scripts.backtest --source knowledge
+    python -m src.scripts.backtest --source archive --reserve 0xaf88d065e77c8cC2239327C5EDb3A432268e5831 \\
+        --min-apy 0.02,0.04,0.06 --rebalance-threshold 0.02,0.05,0.1 --max-allocation 0.6,0.8,1.0
+    python -m src.scripts.backtest --source knowledge --run apr-tuning --samples 10000
+
+Unswept parameters come from the strategy section of config.yaml. With --run,
+the search space is the sweep section's, and results are checkpointed under
+its run_path: rerunning the same command resumes an interrupted sweep.
+"""
+import argparse
+import logging
+from src.agent.knowledge_store import create_store
+from src.backtest.archive import ColumnArchive
+from src.backtest.engine import History, results_table, to_pandas
+from src.backtest.sweep import SearchSpace, SweepRunner, sweep
+from src.config import load_config
+
+logging.basicConfig(level=logging.INFO)
+
+
+def values(text: str):
+    return [float(value) for value in text.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", choices=['knowledge', 'archive'], default='knowledge',
+                        help="market_patterns from the knowledge store, or archived Aave ReserveDataUpdated logs")
+    parser.add_argument("--reserve", help="Aave reserve to replay (archive source)")
+    parser.add_argument("--interval", type=float, default=60, help="Seconds per tick (archive source)")
+    parser.add_argument("--sonic-apy", type=float, default=0.0, help="Strategy 2 APY (archive source)")
+    parser.add_argument("--min-apy", type=values)
+    parser.add_argument("--rebalance-threshold", type=values)
+    parser.add_argument("--max-allocation", type=values)
+    parser.add_argument("--initial-assets", type=float, default=100_000)
+    parser.add_argument("--run", help="Name of a checkpointed sweep over the sweep section's search space")
+    parser.add_argument("--samples", type=int, help="Random search with this many points (--run)")
+    parser.add_argument("--seed", type=int, help="Random search seed (--run)")
+    parser.add_argument("--workers", type=int, default=None, help="Default: one per core")
+    parser.add_argument("--sort-by", default='net_return')
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--output", help="Write every result to this CSV file")
+    args = parser.parse_args()
+
+    config = load_config()
+    if args.source == 'knowledge':
+        history = History.from_knowledge(create_store(config.knowledge.storage_path, config.knowledge.backend))
+    else:
+        if not args.reserve:
+            parser.error("--reserve is required with --source archive")
+        archive = ColumnArchive(f"{config.backfill.archive_path}/arbitrum/aave_reserve_data")
+        history = History.from_archive(archive, args.reserve, interval=args.interval, sonic_apy=args.sonic_apy)
+    if len(history) < 2:
+        parser.error(f"Not enough history to backtest ({len(history)} ticks)")
+
+    axes = {
+        'min_apy': args.min_apy,
+        'rebalance_threshold': args.rebalance_threshold,
+        'max_allocation_percentage': args.max_allocation,
+    }
+    axes = {name: axis for name, axis in axes.items() if axis}
+    if args.run:
+        sweep_config = config.sweep
+        space = SearchSpace({**sweep_config.space, **axes})
+        points = space.points(args.samples or sweep_config.samples, sweep_config.seed if args.seed is None else args.seed)
+        runner = SweepRunner(
+            f"{sweep_config.run_path}/{args.run}", config.strategy, workers=args.workers or sweep_config.workers,
+            chunk_size=sweep_config.chunk_size, initial_assets=args.initial_assets
+        )
+        results = runner.run(history, points)
+        print(f"{len(history)} ticks, {len(points)} parameter sets, results in {runner.run_path}")
+    else:
+        points = SearchSpace(axes).grid()
+        results = sweep(history, points, config.strategy, workers=args.workers, initial_assets=args.initial_assets)
+        print(f"{len(history)} ticks, {len(points)} parameter sets")
+    print(results_table(results, sort_by=args.sort_by, limit=args.limit))
+    if args.output:
+        to_pandas(results).to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
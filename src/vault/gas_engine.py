@@ -0,0 +1,237 @@
+import logging
+import math
+import statistics
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Optional, Tuple, Union
+from src.rpc.contracts import registry
+
+# EIP-1559: the base fee moves at most 12.5% per block, towards a 50% gas target
+BASE_FEE_MAX_CHANGE = 0.125
+
+
+class GasEngine:
+    """Transaction fees from eth_feeHistory and gas limits learned per function
+
+    Fee history is fetched incrementally: each refresh only asks for blocks newer
+    than the last one seen, and a rolling window of base fees, gas used ratios
+    and priority fee percentiles is kept. Transactions are type 2, with
+    maxFeePerGas covering the base fee rising in each of inclusion_blocks
+    blocks, so a base fee spike does not leave them stuck in front of the nonce
+    queue; only base fee plus tip is paid. Without fee history (or on a chain
+    with no base fee) fees fall back to gasPrice * legacy_multiplier.
+
+    Gas limits come from eth_estimateGas once per (contract, selector, calldata
+    length) and are then replaced by the largest gasUsed seen in receipts,
+    times gas_limit_margin.
+    """
+
+    def __init__(self, web3, snapshot=None, max_gas_price: Union[int, Callable[[], int], None] = None,
+                 eip1559: bool = True, fee_history_blocks: int = 20, priority_percentile: float = 50,
+                 urgent_priority_percentile: float = 90, inclusion_blocks: int = 6, refresh_interval: float = 2.0,
+                 gas_limit_margin: float = 1.25, legacy_multiplier: float = 1.2, default_gas_limit: int = 1_000_000,
+                 max_entries: int = 256):
+        self.web3 = web3
+        self.snapshot = snapshot
+        self.max_gas_price = max_gas_price
+        self.eip1559 = eip1559
+        self.fee_history_blocks = fee_history_blocks
+        self.priority_percentile = priority_percentile
+        self.urgent_priority_percentile = urgent_priority_percentile
+        self.percentiles = sorted({priority_percentile, urgent_priority_percentile})
+        self.inclusion_blocks = inclusion_blocks
+        self.refresh_interval = refresh_interval
+        self.gas_limit_margin = gas_limit_margin
+        self.legacy_multiplier = legacy_multiplier
+        self.default_gas_limit = default_gas_limit
+        self.max_entries = max_entries
+        self.logger = logging.getLogger('GasEngine')
+
+        self._lock = threading.RLock()
+        self._refreshed_at = None
+        # (block number, base fee, gas used ratio, priority fee per percentile)
+        self._blocks = deque(maxlen=fee_history_blocks)
+        self._newest_block: Optional[int] = None
+        self._next_base_fee: Optional[int] = None
+        self._gas_price: Optional[int] = None
+        self._fallback_tip: Optional[int] = None
+
+        # (contract, selector, calldata length) -> estimate, and -> recent gasUsed
+        self._estimates: OrderedDict = OrderedDict()
+        self._gas_used: Dict[Tuple, deque] = {}
+
+        self.fee_history_requests = 0
+        self.estimates = 0
+        self.learned_hits = 0
+
+    @property
+    def cap(self) -> Optional[int]:
+        return self.max_gas_price() if callable(self.max_gas_price) else self.max_gas_price
+
+    def refresh(self, force: bool = False):
+        """Fetch fee history for blocks since the last refresh (at most every refresh_interval seconds)"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+                return
+            self._refreshed_at = now
+
+            if self.eip1559:
+                try:
+                    self._update_fee_history()
+                    if self._next_base_fee:
+                        return
+                except Exception as e:
+                    self.logger.warning(f"Fee history unavailable, using legacy gas price: {e}")
+                self._next_base_fee = None
+
+            self._gas_price = self.web3.eth.gas_price
+
+    def _update_fee_history(self):
+        latest = getattr(self.snapshot, 'block_number', None)
+        if self._newest_block is None or latest is None:
+            count = self.fee_history_blocks
+        else:
+            count = min(self.fee_history_blocks, max(1, latest - self._newest_block))
+
+        history = self.web3.eth.fee_history(count, 'latest', self.percentiles)
+        self.fee_history_requests += 1
+        oldest = history['oldestBlock']
+        base_fees = history['baseFeePerGas']
+        rewards = history.get('reward') or []
+        for i, ratio in enumerate(history['gasUsedRatio']):
+            block = oldest + i
+            if self._newest_block is not None and block <= self._newest_block:
+                continue
+            reward = rewards[i] if i < len(rewards) else [0] * len(self.percentiles)
+            self._blocks.append((block, base_fees[i], ratio, reward))
+            self._newest_block = block
+
+        # The last entry is the base fee of the next block, which is already known
+        self._next_base_fee = base_fees[-1] if base_fees else None
+
+    def priority_fee(self, urgent: bool = False) -> int:
+        """Median over the window of the blocks' priority fee percentile"""
+        self.refresh()
+        return self._priority_fee(urgent)
+
+    def _priority_fee(self, urgent: bool) -> int:
+        index = self.percentiles.index(self.urgent_priority_percentile if urgent else self.priority_percentile)
+        with self._lock:
+            # Empty blocks report 0 for every percentile
+            tips = [reward[index] for _, _, _, reward in self._blocks if reward[index] > 0]
+        if tips:
+            return int(statistics.median(tips))
+        if self._fallback_tip is None:
+            self._fallback_tip = self.web3.eth.max_priority_fee
+        return self._fallback_tip
+
+    def predicted_base_fee(self, blocks: int = 1) -> Optional[int]:
+        """Base fee expected in the given number of blocks, following the window's average congestion"""
+        self.refresh()
+        return self._predicted_base_fee(blocks)
+
+    def _predicted_base_fee(self, blocks: int) -> Optional[int]:
+        with self._lock:
+            if self._next_base_fee is None:
+                return None
+            if not self._blocks:
+                return self._next_base_fee
+            ratio = statistics.fmean(ratio for _, _, ratio, _ in self._blocks)
+            change = 1 + BASE_FEE_MAX_CHANGE * (min(max(ratio, 0.0), 1.0) - 0.5) / 0.5
+            return int(self._next_base_fee * change ** (blocks - 1))
+
+    def expected_gas_price(self) -> int:
+        """Per-gas price a transaction sent now is expected to pay"""
+        self.refresh()
+        return self._expected_gas_price()
+
+    def _expected_gas_price(self, urgent: bool = False) -> int:
+        if self._next_base_fee is None:
+            return self._gas_price
+        return self._predicted_base_fee(1) + self._priority_fee(urgent)
+
+    def fee_params(self, urgent: bool = False) -> Dict[str, int]:
+        """Fee fields for a transaction; urgent ones (emergency withdrawals) ignore max_gas_price"""
+        self.refresh()
+        cap = None if urgent else self.cap
+        expected = self._expected_gas_price(urgent)
+        if cap is not None and expected > cap:
+            raise ValueError(f"Gas price {expected} above max_gas_price {cap}")
+
+        if self._next_base_fee is None:
+            gas_price = int(self._gas_price * self.legacy_multiplier)
+            return {'gasPrice': min(gas_price, cap) if cap else gas_price}
+
+        tip = self._priority_fee(urgent)
+        # Worst case: the base fee rises in every block until inclusion
+        max_fee = math.ceil(self._next_base_fee * (1 + BASE_FEE_MAX_CHANGE) ** (self.inclusion_blocks - 1)) + tip
+        return {
+            'maxFeePerGas': min(max_fee, cap) if cap else max_fee,
+            'maxPriorityFeePerGas': tip,
+        }
+
+    @staticmethod
+    def _key(function_call) -> Tuple:
+        calldata = registry.encode_call(function_call)
+        return function_call.address, calldata[:4], len(calldata), calldata
+
+    def gas_limit(self, function_call, sender: str) -> int:
+        """Gas limit from receipts of the same call shape, or from a cached estimate"""
+        address, selector, size, calldata = self._key(function_call)
+        key = (address, selector, size)
+        with self._lock:
+            used = self._gas_used.get(key)
+            if used:
+                self.learned_hits += 1
+                return int(max(used) * self.gas_limit_margin)
+            estimate = self._estimates.get(key)
+            if estimate is not None:
+                self._estimates.move_to_end(key)
+
+        if estimate is None:
+            try:
+                estimate = self.web3.eth.estimate_gas({'from': sender, 'to': address, 'data': calldata})
+                self.estimates += 1
+            except Exception as e:
+                self.logger.warning(f"Gas estimate failed for {function_call.fn_name}, using {self.default_gas_limit}: {e}")
+                return self.default_gas_limit
+            with self._lock:
+                self._estimates[key] = estimate
+                while len(self._estimates) > self.max_entries:
+                    self._estimates.popitem(last=False)
+        return int(estimate * self.gas_limit_margin)
+
+    def track(self, function_call, handle):
+        """Learn the call's gas limit from the handle's receipt when it resolves"""
+        address, selector, size, _ = self._key(function_call)
+        handle.future.add_done_callback(lambda future: self._observe((address, selector, size), handle, future))
+
+    def _observe(self, key: Tuple, handle, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        receipt = future.result()
+        with self._lock:
+            if receipt['status'] == 1:
+                if key not in self._gas_used and len(self._gas_used) >= self.max_entries:
+                    self._gas_used.pop(next(iter(self._gas_used)))
+                self._gas_used.setdefault(key, deque(maxlen=20)).append(receipt['gasUsed'])
+            elif receipt['gasUsed'] >= handle.tx['gas']:
+                # Out of gas: forget what was learned so the next call is estimated again
+                self._gas_used.pop(key, None)
+                self._estimates.pop(key, None)
+                self.logger.warning(f"{handle.description} ran out of gas at limit {handle.tx['gas']}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'type2': self._next_base_fee is not None,
+                'next_base_fee': self._next_base_fee,
+                'gas_price': self._gas_price,
+                'history_blocks': len(self._blocks),
+                'fee_history_requests': self.fee_history_requests,
+                'estimates': self.estimates,
+                'learned_hits': self.learned_hits,
+                'learned_calls': len(self._gas_used),
+            }
@@ -0,0 +1,235 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from web3 import Web3
+from src.instrumentation import metrics
+from src.rpc.contracts import registry
+from src.vault.simulator import Simulation
+from src.vault.tx_pipeline import TransactionHandle
+
+# OpenZeppelin Multicall: each entry is delegatecalled, so msg.sender (and the agent role) is preserved
+MULTICALL_ABI = [{
+    'type': 'function',
+    'name': 'multicall',
+    'stateMutability': 'nonpayable',
+    'inputs': [{'name': 'data', 'type': 'bytes[]'}],
+    'outputs': [{'name': 'results', 'type': 'bytes[]'}],
+}]
+
+# Vault function per action kind, in execution order: withdrawals free funds before allocations
+ACTIONS = {
+    'withdraw': 'withdrawFromStrategy',
+    'withdraw_pool': 'withdrawFromPool',
+    'allocate': 'allocateToStrategy',
+    'deposit': 'depositToPool',
+}
+
+# Opposite actions on the same strategy or pool net against each other
+OPPOSITES = {'allocate': 'withdraw', 'deposit': 'withdraw_pool'}
+
+
+@dataclass
+class PlanAction:
+    kind: str
+    target: object  # Strategy type value or pool name
+    amount: int
+    sources: List = field(default_factory=list)
+
+    @property
+    def description(self) -> str:
+        return f"{ACTIONS[self.kind]}({self.target}, {self.amount})"
+
+
+class ExecutionPlan:
+    """Vault actions decided in one cycle, submitted together"""
+
+    def __init__(self):
+        self.actions: List[PlanAction] = []
+
+    def __len__(self):
+        return len(self.actions)
+
+    def add(self, kind: str, target, amount, source=None):
+        if kind not in ACTIONS:
+            raise ValueError(f"Unknown plan action: {kind}")
+        amount = int(amount)
+        if amount > 0:
+            self.actions.append(PlanAction(kind, target, amount, [source] if source is not None else []))
+
+    def compile(self) -> List[PlanAction]:
+        """Merge actions per target, net opposite ones and put withdrawals first"""
+        merged: Dict[Tuple, PlanAction] = {}
+        for action in self.actions:
+            key = (action.kind, action.target)
+            if key in merged:
+                merged[key].amount += action.amount
+                merged[key].sources.extend(action.sources)
+            else:
+                merged[key] = PlanAction(action.kind, action.target, action.amount, list(action.sources))
+
+        for kind, opposite in OPPOSITES.items():
+            for key in [key for key in merged if key[0] == kind]:
+                other = merged.get((opposite, key[1]))
+                if other is None:
+                    continue
+                action = merged.pop(key)
+                del merged[(opposite, key[1])]
+                net = action.amount - other.amount
+                if net:
+                    net_kind = kind if net > 0 else opposite
+                    merged[(net_kind, key[1])] = PlanAction(net_kind, key[1], abs(net), action.sources + other.sources)
+
+        order = list(ACTIONS)
+        return sorted(merged.values(), key=lambda action: order.index(action.kind))
+
+    def total(self, kind: str) -> int:
+        return sum(action.amount for action in self.compile() if action.kind == kind)
+
+
+class PlanExecutor:
+    """Submits an ExecutionPlan as one vault multicall transaction
+
+    A batched plan costs one signature, one nonce and one receipt wait. The vault
+    must expose multicall(bytes[]) (OpenZeppelin Multicall); executeFunction cannot
+    batch vault actions because its external call drops the agent's msg.sender.
+    With batching "auto" the vault is probed once, and without multicall each
+    compiled action is its own transaction on consecutive nonces, submitted
+    without waiting for the previous receipt.
+
+    When the vault manager has a simulator, the plan's first transaction is
+    simulated before any is signed: a multicall plan as a whole, a sequential
+    one up to its first step, since later steps may only succeed after the
+    earlier ones are mined. If it would revert, nothing of the plan is sent
+    and last_rejected holds it with its revert reason.
+    """
+
+    def __init__(self, vault_manager, batching: str = "auto", report_gas: bool = False):
+        self.vault_manager = vault_manager
+        self.batching = batching
+        self.report_gas = report_gas
+        self.logger = logging.getLogger('PlanExecutor')
+
+        self._multicall = None
+        self._multicall_supported = None
+        self.last_report: Dict = {}
+        self.last_rejected: List[Tuple[List[PlanAction], Simulation]] = []
+
+    @property
+    def multicall(self):
+        if self._multicall is None:
+            # Bound directly rather than through registry.contract, which keys contracts by address
+            spec = registry.register_abi('VaultMulticall', MULTICALL_ABI)
+            self._multicall = self.vault_manager.web3.eth.contract(
+                address=Web3.to_checksum_address(self.vault_manager.vault_address), abi=spec.abi
+            )
+        return self._multicall
+
+    def supports_multicall(self) -> bool:
+        if self.batching != 'auto':
+            return self.batching == 'multicall'
+        if self._multicall_supported is None:
+            try:
+                # An empty batch decodes to [] only if the vault really implements multicall
+                result = self.multicall.functions.multicall([]).call({'from': self.vault_manager.address})
+                self._multicall_supported = result == []
+            except Exception as e:
+                self._multicall_supported = False
+                self.logger.info(f"Vault has no multicall, submitting plan actions as separate transactions: {e}")
+        return self._multicall_supported
+
+    def calls(self, actions: List[PlanAction]) -> List:
+        functions = self.vault_manager.vault_contract.functions
+        return [getattr(functions, ACTIONS[action.kind])(action.target, action.amount) for action in actions]
+
+    def batch_call(self, actions: List[PlanAction]):
+        vault = self.vault_manager.vault_contract
+        return self.multicall.functions.multicall([
+            Web3.to_bytes(hexstr=vault.encode_abi(ACTIONS[action.kind], args=[action.target, action.amount]))
+            for action in actions
+        ])
+
+    def submit(self, plan: ExecutionPlan) -> List[Tuple[List[PlanAction], TransactionHandle]]:
+        """Submit a plan without waiting for receipts; returns (actions, handle) per transaction"""
+        self.last_rejected = []
+        actions = plan.compile()
+        if not actions:
+            return []
+
+        batched = len(actions) > 1 and self.supports_multicall()
+        if batched:
+            transactions = [(
+                actions,
+                f"multicall[{', '.join(action.description for action in actions)}]",
+                self.batch_call(actions)
+            )]
+        else:
+            transactions = [
+                ([action], action.description, call) for action, call in zip(actions, self.calls(actions))
+            ]
+
+        simulated = self.simulate(transactions[:1])
+        if simulated is not None and simulated[0].reverted:
+            # Later steps were planned on top of this one
+            self.last_rejected = [(transactions[0][0], simulated[0])]
+            if len(transactions) > 1:
+                self.logger.warning(f"Not sending the plan's {len(transactions) - 1} later transaction(s) either")
+            return []
+
+        if self.report_gas and len(plan) > 1:
+            self.last_report = self.gas_report(plan, actions, batched)
+
+        submitted = []
+        with metrics.span('plan.submit', mode='multicall' if batched else 'sequential'):
+            for tx_actions, description, call in transactions:
+                # The first was simulated above; later ones depend on it being mined
+                handle = self.vault_manager._build_and_send_transaction(
+                    call, wait=False, description=description, simulate=False
+                )
+                submitted.append((tx_actions, handle))
+        return submitted
+
+    def simulate(self, transactions: List[Tuple]) -> Optional[List[Simulation]]:
+        """Simulate (actions, description, call) transactions in one batch, each against the current state
+
+        None without a simulator.
+        """
+        simulator = getattr(self.vault_manager, 'simulator', None)
+        if simulator is None:
+            return None
+        simulations = simulator.simulate(
+            [(description, call) for _, description, call in transactions], self.vault_manager.address
+        )
+        rejected = sum(simulation.reverted for simulation in simulations)
+        if rejected:
+            self.logger.warning(f"{rejected} of {len(transactions)} plan transaction(s) would revert")
+        return simulations
+
+    def gas_report(self, plan: ExecutionPlan, actions: List[PlanAction], batched: bool) -> Dict:
+        """Estimated gas of the compiled plan vs one transaction per planned action"""
+        try:
+            sender = {'from': self.vault_manager.address}
+            # Each estimate runs against the current state, not after the preceding actions
+            sequential_gas = sum(call.estimate_gas(sender) for call in self.calls(plan.actions))
+            if batched:
+                plan_gas = self.batch_call(actions).estimate_gas(sender)
+            else:
+                plan_gas = sum(call.estimate_gas(sender) for call in self.calls(actions))
+
+            report = {
+                'mode': 'multicall' if batched else 'sequential',
+                'actions': len(plan),
+                'transactions': 1 if batched else len(actions),
+                'sequential_gas': sequential_gas,
+                'plan_gas': plan_gas,
+                'gas_saved': sequential_gas - plan_gas,
+            }
+            metrics.inc('plan_gas_saved', report['gas_saved'], mode=report['mode'])
+            self.logger.info(
+                f"Plan of {len(plan)} actions in {report['transactions']} transaction(s): "
+                f"~{plan_gas} gas vs ~{sequential_gas} one transaction per action ({report['gas_saved']} saved)"
+            )
+            return report
+
+        except Exception as e:
+            self.logger.warning(f"Could not estimate plan gas: {e}")
+            return {}
@@ -0,0 +1,188 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+from eth_abi import decode
+from eth_utils import function_abi_to_4byte_selector
+from web3 import Web3
+from web3.types import RPCEndpoint
+from src.instrumentation import metrics
+from src.rpc.contracts import registry
+
+# Solidity's built-in revert payloads: require/revert messages and panics
+ERROR_SELECTOR = bytes.fromhex('08c379a0')  # Error(string)
+PANIC_SELECTOR = bytes.fromhex('4e487b71')  # Panic(uint256)
+PANIC_CODES = {
+    0x00: 'generic panic',
+    0x01: 'assertion failed',
+    0x11: 'arithmetic overflow or underflow',
+    0x12: 'division or modulo by zero',
+    0x21: 'invalid enum value',
+    0x22: 'invalid storage byte array',
+    0x31: 'pop on an empty array',
+    0x32: 'array index out of bounds',
+    0x41: 'out of memory',
+    0x51: 'call to an uninitialized function',
+}
+
+
+def custom_errors(abi: Sequence[Dict]) -> Dict[bytes, Tuple[str, List[str]]]:
+    """Selector -> (name, input types) for the custom errors declared in an ABI"""
+    errors = {}
+    for entry in abi:
+        if entry.get('type') == 'error':
+            types = [item['type'] for item in entry.get('inputs', [])]
+            errors[function_abi_to_4byte_selector(entry)] = (entry['name'], types)
+    return errors
+
+
+def decode_revert(data: bytes, errors: Dict[bytes, Tuple[str, List[str]]] = None) -> Optional[str]:
+    """Human-readable reason from revert data, or None if there is none to decode"""
+    if not data:
+        return None
+    selector, payload = data[:4], data[4:]
+    try:
+        if selector == ERROR_SELECTOR:
+            return decode(['string'], payload)[0]
+        if selector == PANIC_SELECTOR:
+            code = decode(['uint256'], payload)[0]
+            return f"panic: {PANIC_CODES.get(code, 'unknown code')} (0x{code:02x})"
+        if errors and selector in errors:
+            name, types = errors[selector]
+            return f"{name}({', '.join(str(value) for value in decode(types, payload))})"
+    except Exception:
+        pass
+    return f"0x{data.hex()}"
+
+
+@dataclass
+class Simulation:
+    """Outcome of running one planned transaction against pending state"""
+    description: str
+    tx: Dict
+    success: bool
+    revert_reason: Optional[str] = None
+    gas_used: Optional[int] = None
+    # Set when the node could not simulate (unsupported method, RPC failure); success is then unknown
+    error: Optional[str] = None
+
+    @property
+    def reverted(self) -> bool:
+        return not self.success and self.error is None
+
+
+class SimulationReverted(Exception):
+    """A planned transaction would revert, so it was not signed or sent"""
+
+    def __init__(self, simulation: Simulation):
+        self.simulation = simulation
+        super().__init__(f"{simulation.description} would revert: {simulation.revert_reason}")
+
+
+class TransactionSimulator:
+    """Runs planned transactions through eth_call or debug_traceCall before they are signed
+
+    All transactions of a plan go out in one JSON-RPC batch against the
+    pending block, so checking n transactions costs one round trip. A revert
+    is decoded (Error(string), Panic(uint256), or a custom error of the given
+    ABI) and the transaction is not submitted, saving the gas a reverted
+    transaction burns and the receipt wait before the failure shows. Each
+    transaction is simulated on its own against the current state; one that
+    only succeeds after an earlier transaction is mined would be reported as
+    a revert, so PlanExecutor only simulates a plan's first transaction.
+
+    When the node cannot simulate at all, the result carries the error and
+    is not treated as a revert: a simulation outage must not block an
+    emergency withdrawal.
+    """
+
+    def __init__(self, web3: Web3, method: str = "eth_call", block: str = "pending", abi: Sequence[Dict] = ()):
+        if method not in ('eth_call', 'debug_traceCall'):
+            raise ValueError(f"Unknown simulation method {method}, expected eth_call or debug_traceCall")
+        self.web3 = web3
+        self.method = method
+        self.block = block
+        self.errors = custom_errors(abi)
+        self.logger = logging.getLogger('TransactionSimulator')
+
+    def transaction(self, function_call, sender: str) -> Dict:
+        """The call a function_call's transaction would make, without nonce or fees"""
+        return {
+            'from': sender,
+            'to': function_call.address,
+            'data': '0x' + registry.encode_call(function_call).hex(),
+        }
+
+    def simulate(self, calls: List[Tuple[str, object]], sender: str) -> List[Simulation]:
+        """Simulate (description, function_call) pairs in one batch; results are in the same order"""
+        txs = [(description, self.transaction(function_call, sender)) for description, function_call in calls]
+        if not txs:
+            return []
+        params = [self._params(tx) for _, tx in txs]
+        with metrics.span('tx.simulate', method=self.method):
+            try:
+                if len(params) == 1:
+                    responses = [self.web3.provider.make_request(RPCEndpoint(self.method), params[0])]
+                else:
+                    responses = self.web3.provider.make_batch_request(
+                        [(RPCEndpoint(self.method), param) for param in params]
+                    )
+                    if isinstance(responses, dict):
+                        # Some nodes answer a batch they reject with a single error object
+                        responses = [responses] * len(params)
+            except Exception as e:
+                responses = [{'error': {'message': f"simulation request failed: {e}"}}] * len(params)
+
+        simulations = [self._result(description, tx, response) for (description, tx), response in zip(txs, responses)]
+        for simulation in simulations:
+            outcome = 'error' if simulation.error else 'success' if simulation.success else 'revert'
+            metrics.inc('tx_simulations_total', outcome=outcome)
+            if simulation.reverted:
+                self.logger.warning(f"{simulation.description} would revert: {simulation.revert_reason}")
+            elif simulation.error:
+                self.logger.warning(f"Could not simulate {simulation.description}: {simulation.error}")
+        return simulations
+
+    def _params(self, tx: Dict) -> List:
+        if self.method == 'debug_traceCall':
+            return [tx, self.block, {'tracer': 'callTracer', 'tracerConfig': {'onlyTopCall': True}}]
+        return [tx, self.block]
+
+    def _result(self, description: str, tx: Dict, response: Dict) -> Simulation:
+        error = response.get('error')
+        if error:
+            message = str(error.get('message', error))
+            data = error.get('data')
+            if isinstance(data, dict):
+                data = data.get('data')
+            # Geth answers reverts with code 3 and the revert data; other errors mean nothing was simulated
+            if error.get('code') == 3 or 'revert' in message.lower():
+                reason = decode_revert(self._bytes(data), self.errors) if isinstance(data, str) else None
+                return Simulation(description, tx, False, reason or self._message_reason(message))
+            return Simulation(description, tx, False, error=message)
+
+        result = response.get('result')
+        if self.method == 'eth_call':
+            return Simulation(description, tx, True)
+
+        # callTracer frame: error is set when the top call reverted, output holds the revert data
+        gas_used = int(result['gasUsed'], 16) if result.get('gasUsed') else None
+        if result.get('error'):
+            reason = decode_revert(self._bytes(result.get('output')), self.errors) or result.get('revertReason')
+            return Simulation(description, tx, False, reason or result['error'], gas_used)
+        return Simulation(description, tx, True, gas_used=gas_used)
+
+    @staticmethod
+    def _bytes(data: Optional[str]) -> bytes:
+        if not data or not isinstance(data, str) or not data.startswith('0x'):
+            return b''
+        try:
+            return bytes.fromhex(data[2:])
+        except ValueError:
+            return b''
+
+    @staticmethod
+    def _message_reason(message: str) -> str:
+        prefix = 'execution reverted'
+        if message.lower().startswith(prefix):
+            return message[len(prefix):].lstrip(': ') or 'reverted without a reason'
+        return message
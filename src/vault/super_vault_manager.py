@@ -2,53 +2,93 @@ from web3 import Web3
 from enum import Enum
 from typing import List, Tuple
 import yaml
-import json
 import logging
 import os
 from eth_account import Account
 import eth_account
+from src.rpc.snapshot import MarketSnapshot
+from src.rpc.contracts import registry
+from src.instrumentation import metrics
+from src.rpc.multicall import MulticallBatch
+from src.rpc.read_cache import IMMUTABLE, TTL, ReadCache, cache_static_requests
+from src.vault.gas_engine import GasEngine
+from src.vault.simulator import SimulationReverted, TransactionSimulator
+from src.vault.tx_pipeline import TransactionPipeline
 
 class StrategyType(Enum):
     AAVE = 0
     BALANCER = 1
     STRATEGY_2 = 2
+    # The agent's name for slot 1 (Aave-Sonic-Beefy); an alias of BALANCER
+    STRATEGY_1 = 1
+
+def pool_name(strategy_type: int) -> str:
+    """Pool name the vault uses for a strategy type"""
+    return f"STRATEGY_{strategy_type}" if strategy_type > 0 else "AAVE"
+
+# Cache policies for values that change rarely or never; everything else is per-block
+READ_POLICIES = {
+    'AGENT_ROLE': (IMMUTABLE, None),
+    'getStrategyAddress': (TTL, 600),
+    'getPoolList': (TTL, 600),
+    'getPoolAddress': (TTL, 600),
+}
+
+# allocate_to_strategy always allocates to the AAVE strategy, whatever type it is given
+ALLOCATION_STRATEGY = 0
 
 class SuperVaultManager:
-    def __init__(self, web3: Web3, vault_address: str):
-        self.web3 = web3
+    def __init__(self, web3: Web3, vault_address: str, snapshot: MarketSnapshot = None, cache: ReadCache = None,
+                 probe: bool = True, gas_engine: GasEngine = None):
+        self.web3 = cache_static_requests(web3)
         self.vault_address = vault_address
+        self.snapshot = snapshot
+        self.cache = cache or ReadCache(snapshot, policies=READ_POLICIES)
         self.logger = logging.getLogger('SuperVaultManager')
         
         try:
-            # Check if contract exists at address
             checksum_address = Web3.to_checksum_address(vault_address)
-            code = self.web3.eth.get_code(checksum_address)
-            if code == b'':
-                raise Exception(f"No contract found at address {vault_address}")
+            # The orchestrator passes probe=False and runs the probes concurrently after construction
+            if probe:
+                self.verify_contract()
             
-            # Load SuperVault ABI
-            with open("src/abis/SuperVault.json", "r") as f:
-                self.vault_abi = json.load(f)
+            # Parsed once per process and shared with the agent
+            self.vault_abi = registry.abi('SuperVault')
             
             # Store private key properly
-            self.private_key = ''
+            self.private_key = os.getenv("PRIVATE_KEY", "")
             
             # Set up account
             account = Account.from_key(self.private_key)
             self.address = account.address
             
             # Initialize contract
-            self.vault_contract = self.web3.eth.contract(
-                address=checksum_address,
-                abi=self.vault_abi
+            self.vault_contract = registry.contract(
+                self.web3, 'SuperVault', checksum_address, getattr(snapshot, 'chain', 'sonic')
             )
             
+            # Nonces and chain id are tracked locally; receipts resolve on a background poller
+            self.tx_pipeline = TransactionPipeline(self.web3, self.address, self.private_key)
+            
+            # Fees from eth_feeHistory and gas limits learned per function
+            self.gas = gas_engine or GasEngine(self.web3, snapshot=snapshot)
+            
+            # Set by the orchestrator to eth_call each transaction before signing it
+            self.simulator: Optional[TransactionSimulator] = None
+            
             self.logger.info(f"Using account address: {self.address}")
             
         except Exception as e:
             self.logger.error(f"Failed to initialize vault: {e}")
             raise
 
+    def verify_contract(self):
+        """Connectivity check: make sure the vault has code at its address"""
+        code = self.web3.eth.get_code(Web3.to_checksum_address(self.vault_address))
+        if code == b'':
+            raise Exception(f"No contract found at address {self.vault_address}")
+        return True
+
     def _get_address_from_private_key(self, private_key: str) -> str:
         """Helper function to get the address from a private key"""
         try:
@@ -75,6 +115,10 @@ class SuperVaultManager:
             self.logger.error(f"Error deriving address from private key: {e}")
             raise
 
+    def _read(self, contract_function):
+        """Run a view call through the read cache (per-block reads go to the snapshot)"""
+        return self.cache.call(contract_function)
+
     def get_vault_abi(self):
         """Get the vault ABI"""
         return self.vault_contract.functions.abi
@@ -82,7 +126,7 @@ class SuperVaultManager:
     def get_total_assets(self):
         """Get total assets in the vault"""
         try:
-            return self.vault_contract.functions.totalAssets().call()
+            return self._read(self.vault_contract.functions.totalAssets())
         except Exception as e:
             self.logger.error(f"Error getting total assets: {e}")
             return 0
@@ -91,21 +135,64 @@ class SuperVaultManager:
         """Get balance of a specific pool"""
         try:
             # Convert strategy type to string name
-            strategy_name = f"STRATEGY_{strategy_type}" if strategy_type > 0 else "AAVE"
+            strategy_name = pool_name(strategy_type)
             
-            return self.vault_contract.functions.getPoolBalance(
+            return self._read(self.vault_contract.functions.getPoolBalance(
                 strategy_name,  # Pass string name instead of int
                 Web3.to_checksum_address(token_address)
-            ).call()
+            ))
         except Exception as e:
             self.logger.error(f"Error getting pool balance: {e}")
             return 0
 
+    def get_vault_state(self, pool_tokens: List[Tuple[int, str]], strategy_types: List[int] = ()):
+        """Get total assets, pool balances and strategy addresses in a single multicall"""
+        batch, indexes = self._vault_state_batch(pool_tokens, strategy_types)
+        return self._format_vault_state(batch.execute(), indexes)
+
+    async def get_vault_state_async(self, async_web3, pool_tokens: List[Tuple[int, str]], strategy_types: List[int] = ()):
+        """Same as get_vault_state, issued over an AsyncWeb3 client"""
+        batch, indexes = self._vault_state_batch(pool_tokens, strategy_types)
+        return self._format_vault_state(await batch.execute_async(async_web3), indexes)
+
+    def _vault_state_batch(self, pool_tokens, strategy_types):
+        batch = MulticallBatch(self.web3, self.cache)
+        total_index = batch.add(self.vault_contract.functions.totalAssets())
+        
+        balance_indexes = {}
+        for strategy_type, token_address in pool_tokens:
+            strategy_name = pool_name(strategy_type)
+            balance_indexes[strategy_type] = batch.add(self.vault_contract.functions.getPoolBalance(
+                strategy_name,
+                Web3.to_checksum_address(token_address)
+            ))
+            
+        address_indexes = {
+            strategy_type: batch.add(self.vault_contract.functions.getStrategyAddress(strategy_type))
+            for strategy_type in strategy_types
+        }
+        return batch, (total_index, balance_indexes, address_indexes)
+
+    @staticmethod
+    def _format_vault_state(results, indexes):
+        total_index, balance_indexes, address_indexes = indexes
+        return {
+            'total_assets': results[total_index] or 0,
+            'pool_balances': {
+                strategy_type: results[index] or 0
+                for strategy_type, index in balance_indexes.items()
+            },
+            'strategy_addresses': {
+                strategy_type: results[index]
+                for strategy_type, index in address_indexes.items()
+            }
+        }
+
     def _check_agent_role(self):
         """Check if current account has AGENT_ROLE"""
         try:
             # Get the AGENT_ROLE bytes32 value
-            AGENT_ROLE = self.vault_contract.functions.AGENT_ROLE().call()
+            AGENT_ROLE = self._read(self.vault_contract.functions.AGENT_ROLE())
             self.logger.info(f"AGENT_ROLE identifier: {AGENT_ROLE.hex()}")
             
             try:
@@ -137,13 +224,13 @@ class SuperVaultManager:
             self.logger.error(f"Error checking agent role: {e}")
             return False
 
-    def allocate_to_strategy(self, strategy_type, amount):
-        """Allocate funds to a strategy"""
+    def allocate_to_strategy(self, strategy_type, amount, wait: bool = True):
+        """Allocate funds to a strategy (returns a TransactionHandle when wait is False)"""
         try:
             self.logger.info(f"Current address: {self.address}")
             
             # Always use AAVE strategy (type 0)
-            strategy_value = 0  # AAVE strategy
+            strategy_value = ALLOCATION_STRATEGY
             self.logger.info(f"Using AAVE strategy (type {strategy_value})")
             
             # Check total assets first
@@ -154,7 +241,7 @@ class SuperVaultManager:
                 raise Exception(f"Insufficient assets in vault. Have {total_assets}, need {amount}")
             
             # Get strategy address
-            strategy_address = self.vault_contract.functions.getStrategyAddress(strategy_value).call()
+            strategy_address = self._read(self.vault_contract.functions.getStrategyAddress(strategy_value))
             if strategy_address == '0x0000000000000000000000000000000000000000':
                 raise Exception(f"Strategy {strategy_value} not found")
             
@@ -168,7 +255,9 @@ class SuperVaultManager:
             )
             
             # Send transaction
-            receipt = self._build_and_send_transaction(function_call)
+            receipt = self._build_and_send_transaction(function_call, wait=wait)
+            if not wait:
+                return receipt
             
             if receipt['status'] == 0:
                 raise Exception("Transaction reverted")
@@ -179,56 +268,67 @@ class SuperVaultManager:
             self.logger.error(f"Failed to allocate to strategy: {str(e)}")
             raise
     
-    def withdraw_from_strategy(self, strategy_type: StrategyType, amount: int):
-        """Withdraw funds from a strategy"""
-        return self.vault_contract.functions.withdrawFromStrategy(
-            strategy_type.value,
-            amount
-        ).transact()
+    def withdraw_from_strategy(self, strategy_type: StrategyType, amount: int, wait: bool = True,
+                               urgent: bool = False):
+        """Withdraw funds from a strategy (urgent ones are not held back by max_gas_price)"""
+        return self._build_and_send_transaction(
+            self.vault_contract.functions.withdrawFromStrategy(
+                strategy_type.value,
+                amount
+            ),
+            wait=wait,
+            urgent=urgent
+        )
     
-    def deposit_to_pool(self, pool_name: str, amount: int):
+    def deposit_to_pool(self, pool_name: str, amount: int, wait: bool = True):
         """Deposit funds to a specific lending pool"""
-        return self.vault_contract.functions.depositToPool(
-            pool_name,
-            amount
-        ).transact()
+        return self._build_and_send_transaction(
+            self.vault_contract.functions.depositToPool(
+                pool_name,
+                amount
+            ),
+            wait=wait
+        )
     
-    def withdraw_from_pool(self, pool_name: str, amount: int):
+    def withdraw_from_pool(self, pool_name: str, amount: int, wait: bool = True):
         """Withdraw funds from a specific lending pool"""
-        return self.vault_contract.functions.withdrawFromPool(
-            pool_name,
-            amount
-        ).transact()
+        return self._build_and_send_transaction(
+            self.vault_contract.functions.withdrawFromPool(
+                pool_name,
+                amount
+            ),
+            wait=wait
+        )
     
     def get_pool_address(self, pool_name: str) -> str:
         """Get address of a specific pool"""
-        return self.vault_contract.functions.getPoolAddress(pool_name).call()
+        return self._read(self.vault_contract.functions.getPoolAddress(pool_name))
     
     def get_pool_list(self) -> List[str]:
         """Get list of all pools"""
-        return self.vault_contract.functions.getPoolList().call()
+        return self._read(self.vault_contract.functions.getPoolList())
     
     def get_strategy_address(self, strategy_type: StrategyType) -> str:
         """Get address of a specific strategy"""
-        return self.vault_contract.functions.getStrategyAddress(
+        return self._read(self.vault_contract.functions.getStrategyAddress(
             strategy_type.value
-        ).call()
+        ))
     
-    def deposit(self, amount: int):
+    def deposit(self, amount: int, wait: bool = True):
         """Deposit assets into the vault"""
-        return self.vault_contract.functions.deposit(amount).transact()
+        return self._build_and_send_transaction(self.vault_contract.functions.deposit(amount), wait=wait)
     
-    def withdraw(self, shares: int):
+    def withdraw(self, shares: int, wait: bool = True):
         """Withdraw assets from the vault"""
-        return self.vault_contract.functions.withdraw(shares).transact()
+        return self._build_and_send_transaction(self.vault_contract.functions.withdraw(shares), wait=wait)
     
-    def set_agent(self, new_agent: str):
+    def set_agent(self, new_agent: str, wait: bool = True):
         """Set new agent address"""
-        return self.vault_contract.functions.setAgent(new_agent).transact()
+        return self._build_and_send_transaction(self.vault_contract.functions.setAgent(new_agent), wait=wait)
     
-    def set_admin(self, new_admin: str):
+    def set_admin(self, new_admin: str, wait: bool = True):
         """Set new admin address"""
-        return self.vault_contract.functions.setAdmin(new_admin).transact()
+        return self._build_and_send_transaction(self.vault_contract.functions.setAdmin(new_admin), wait=wait)
 
     def execute_function(self, target: str, data: bytes) -> Tuple[bool, bytes]:
         """Execute arbitrary function through vault (requires AGENT_ROLE)"""
@@ -274,42 +374,47 @@ class SuperVaultManager:
         
         return adjustments
 
-    def _build_and_send_transaction(self, function_call):
-        """Helper method to build and send transactions"""
+    def get_gas_price(self) -> int:
+        """Get the per-gas price a transaction sent now is expected to pay, in wei"""
+        return self.gas.expected_gas_price()
+
+    def _build_and_send_transaction(self, function_call, wait: bool = True, gas: int = None,
+                                    description: str = None, urgent: bool = False, simulate: bool = True):
+        """Helper method to build and send transactions
+        
+        With wait=False the TransactionHandle is returned as soon as the node accepts
+        the transaction; its receipt resolves on the pipeline's background poller.
+        With a simulator, a transaction that would revert raises SimulationReverted
+        before it is signed (simulate=False when the caller already simulated it).
+        """
         try:
-            # Get current gas price and add 20% buffer
-            gas_price = int(self.web3.eth.gas_price * 1.2)
+            # Type-2 fees from fee history; raises above max_gas_price unless urgent
+            with metrics.span('tx.gas_price'):
+                fees = self.gas.fee_params(urgent=urgent)
             
-            # Build transaction with higher gas limit
-            tx = function_call.build_transaction({
-                'from': self.address,
-                'nonce': self.web3.eth.get_transaction_count(self.address),
-                'gas': 1000000,  # Increased gas limit
-                'gasPrice': gas_price,
-                'chainId': self.web3.eth.chain_id
-            })
+            if simulate and self.simulator:
+                (simulation,) = self.simulator.simulate(
+                    [(description or function_call.fn_name, function_call)], self.address
+                )
+                if simulation.reverted:
+                    raise SimulationReverted(simulation)
             
-            self.logger.info(f"Transaction params: gas={tx['gas']}, gasPrice={tx['gasPrice']}")
+            with metrics.span('tx.gas_limit'):
+                gas = gas or self.gas.gas_limit(function_call, self.address)
             
-            # Sign and send
-            signed_tx = self.web3.eth.account.sign_transaction(tx, self.private_key)
-            tx_hash = self.web3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            with metrics.span('tx.submit'):
+                handle = self.tx_pipeline.submit(function_call, {'gas': gas, **fees}, description)
+            self.gas.track(function_call, handle)
             
-            self.logger.info(f"Transaction sent with hash: {tx_hash.hex()}")
+            self.logger.info(f"Transaction params: gas={handle.tx['gas']}, fees={fees}")
             
-            # Wait for receipt with longer timeout
-            receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash, timeout=60)
+            if not wait:
+                return handle
             
-            if receipt['status'] == 0:
-                # Get revert reason if possible
-                try:
-                    tx_details = self.web3.eth.call(tx)
-                    self.logger.error(f"Transaction reverted with: {tx_details}")
-                except Exception as e:
-                    self.logger.error(f"Could not get revert reason: {str(e)}")
-            
-            return receipt
+            # Wait for receipt with longer timeout
+            with metrics.span('tx.receipt'):
+                return handle.result(timeout=60)
             
         except Exception as e:
             self.logger.error(f"Transaction failed: {str(e)}")
-            raise
\ No newline at end of file
+            raise
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from web3 import Web3
+from web3.exceptions import TimeExhausted, TransactionNotFound
+from src.instrumentation import metrics
+from src.vault.simulator import decode_revert
+
+
+@dataclass
+class TransactionHandle:
+    """A submitted transaction whose receipt resolves in the background"""
+    tx_hash: bytes
+    nonce: int
+    description: str
+    tx: Dict
+    future: Future = field(default_factory=Future)
+    submitted_at: float = field(default_factory=time.monotonic)
+    revert_reason: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: float = None):
+        """Block until the receipt arrives"""
+        return self.future.result(timeout)
+
+    async def wait(self):
+        """Await the receipt without blocking the event loop"""
+        return await asyncio.wrap_future(self.future)
+
+
+class NonceManager:
+    """Hands out nonces locally instead of asking the node before every send"""
+
+    def __init__(self, web3: Web3, address: str):
+        self.web3 = web3
+        self.address = address
+        self._lock = threading.Lock()
+        self._next_nonce: Optional[int] = None
+
+    def next(self) -> int:
+        with self._lock:
+            if self._next_nonce is None:
+                self._next_nonce = self.web3.eth.get_transaction_count(self.address, 'pending')
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            return nonce
+
+    def resync(self):
+        """Re-read the nonce from the node on the next send (after a failed or dropped tx)"""
+        with self._lock:
+            self._next_nonce = None
+
+
+class TransactionPipeline:
+    """Signs and submits transactions, resolving receipts on a background poller"""
+
+    def __init__(self, web3: Web3, address: str, private_key: str,
+                 poll_interval: float = 1.0, receipt_timeout: float = 120):
+        self.web3 = web3
+        self.address = address
+        self.private_key = private_key
+        self.poll_interval = poll_interval
+        self.receipt_timeout = receipt_timeout
+        self.logger = logging.getLogger('TransactionPipeline')
+
+        self.nonces = NonceManager(web3, address)
+        self._chain_id: Optional[int] = None
+
+        self._send_lock = threading.Lock()
+        self._pending: Dict[bytes, TransactionHandle] = {}
+        self._pending_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._poller: Optional[threading.Thread] = None
+
+    @property
+    def chain_id(self) -> int:
+        if self._chain_id is None:
+            self._chain_id = self.web3.eth.chain_id
+        return self._chain_id
+
+    def submit(self, function_call, tx_params: Dict, description: str = None) -> TransactionHandle:
+        """Sign and send a transaction, returning as soon as the node accepts it"""
+        description = description or function_call.fn_name
+
+        # Hold the lock across nonce assignment and send so nonces reach the node in order
+        with self._send_lock:
+            nonce = self.nonces.next()
+            try:
+                # build_transaction estimates gas when none is given; a failed estimate must free the nonce too
+                with metrics.span('tx.build'):
+                    tx = function_call.build_transaction({
+                        'from': self.address,
+                        'nonce': nonce,
+                        'chainId': self.chain_id,
+                        **tx_params
+                    })
+                with metrics.span('tx.sign'):
+                    signed_tx = self.web3.eth.account.sign_transaction(tx, self.private_key)
+                with metrics.span('tx.send'):
+                    tx_hash = self.web3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            except Exception:
+                self.nonces.resync()
+                raise
+
+        handle = TransactionHandle(tx_hash=tx_hash, nonce=nonce, description=description, tx=tx)
+        with self._pending_lock:
+            self._pending[tx_hash] = handle
+        self._ensure_poller()
+
+        self.logger.info(f"Submitted {description} (nonce {nonce}): {tx_hash.hex()}")
+        return handle
+
+    def pending(self) -> List[TransactionHandle]:
+        """Get transactions still waiting for a receipt"""
+        with self._pending_lock:
+            return list(self._pending.values())
+
+    def stop(self):
+        """Stop the receipt poller; unresolved handles stay pending"""
+        self._stop.set()
+        if self._poller:
+            self._poller.join(timeout=self.poll_interval * 2)
+            self._poller = None
+
+    def _ensure_poller(self):
+        if self._poller and self._poller.is_alive():
+            return
+        self._stop.clear()
+        self._poller = threading.Thread(target=self._poll_receipts, name='receipt-poller', daemon=True)
+        self._poller.start()
+
+    def _poll_receipts(self):
+        while not self._stop.is_set():
+            for handle in self.pending():
+                try:
+                    receipt = self.web3.eth.get_transaction_receipt(handle.tx_hash)
+                except TransactionNotFound:
+                    if time.monotonic() - handle.submitted_at > self.receipt_timeout:
+                        self._resolve(handle, error=TimeExhausted(
+                            f"{handle.description} ({handle.tx_hash.hex()}) not mined after "
+                            f"{self.receipt_timeout} seconds"
+                        ))
+                        self.nonces.resync()
+                    continue
+                except Exception as e:
+                    self.logger.warning(f"Error polling receipt for {handle.tx_hash.hex()}: {e}")
+                    continue
+
+                if receipt['status'] == 0:
+                    handle.revert_reason = self._revert_reason(handle, receipt['blockNumber'])
+                    self.logger.error(f"{handle.description} reverted: {handle.revert_reason}")
+                else:
+                    self.logger.info(f"{handle.description} confirmed in block {receipt['blockNumber']}")
+                self._resolve(handle, receipt=receipt)
+
+            self._stop.wait(self.poll_interval)
+
+    def _resolve(self, handle: TransactionHandle, receipt=None, error: Exception = None):
+        with self._pending_lock:
+            self._pending.pop(handle.tx_hash, None)
+        metrics.observe('tx_inclusion_seconds', time.monotonic() - handle.submitted_at,
+                        outcome='error' if error else 'mined')
+        if error:
+            handle.future.set_exception(error)
+        else:
+            handle.future.set_result(receipt)
+
+    def _revert_reason(self, handle: TransactionHandle, block_number: int) -> str:
+        # Replay on the state before the block it was mined in; eth_call at block_number itself
+        # would see the state after the whole block
+        try:
+            self.web3.eth.call(handle.tx, block_number - 1)
+            return "unknown"
+        except Exception as e:
+            # ContractLogicError carries the revert data when the node returns it
+            data = getattr(e, 'data', None)
+            if isinstance(data, str) and data.startswith('0x'):
+                return decode_revert(bytes.fromhex(data[2:])) or str(e)
+            return str(e)
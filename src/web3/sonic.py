@@ -1,6 +1,7 @@
 import yaml
 from web3 import Web3
 import os
+import time
 from dotenv import load_dotenv
 from abis.sonic import SONIC_VAULT_ABI, SONIC_ORACLE_ABI, SONIC_ZAPPER_ABI
 from abis.debridge import DEBRIDGE_ABI
@@ -73,21 +74,32 @@ def get_rewards():
     rewards = sonic_farm.functions.getPendingRewards().call()
     return web3.from_wei(rewards, "ether")
 
-def estimate_gas_cost(web3, transaction):
-    """Updated to take web3 instance as parameter"""
+# ETH price from the oracle, re-read at most once a minute
+ETH_PRICE_TTL = 60
+_eth_price = {'value': None, 'fetched_at': 0.0}
+
+def get_eth_price():
+    """Oracle ETH price, cached for ETH_PRICE_TTL seconds"""
+    if _eth_price['value'] is None or time.monotonic() - _eth_price['fetched_at'] > ETH_PRICE_TTL:
+        _eth_price['value'] = eth_sonic_oracle.functions.getAssetPrice("ETH").call()
+        _eth_price['fetched_at'] = time.monotonic()
+    return _eth_price['value']
+
+def estimate_gas_cost(web3, transaction, gas_engine=None):
+    """Updated to take web3 instance as parameter (and a GasEngine for base fee plus tip pricing)"""
     try:
         # Get gas estimate
         gas_estimate = web3.eth.estimate_gas(transaction)
         
         # Get current gas price
-        gas_price = web3.eth.gas_price
+        gas_price = gas_engine.expected_gas_price() if gas_engine else web3.eth.gas_price
         
         # Calculate cost in ETH
         cost_in_wei = gas_estimate * gas_price
         cost_in_eth = web3.from_wei(cost_in_wei, 'ether')
         
         # Get ETH price from Oracle
-        eth_price = eth_sonic_oracle.functions.getAssetPrice("ETH").call()
+        eth_price = get_eth_price()
         cost_in_usd = cost_in_eth * web3.from_wei(eth_price, 'ether')
         
         return {